@@ -0,0 +1,242 @@
+"""
+Composite Benchmark
+
+Times the CPU compositor's alpha blend (renderer._blend_into) against the
+gather/scatter masked blend it replaced, per alpha pattern and resolution,
+plus a full renderer.composite_cpu() call (main + float, letterboxed to
+--target when given) at each --threads band count, and with --target also
+blend-then-resize against resize-then-blend (RESIZE_BEFORE_BLEND), so
+changes to the no-GL path can be checked on the device that runs it.
+
+Alpha patterns:
+  float        - soft-edged blob over ~20% of the frame, rest transparent (typical 255_ layer)
+  mixed        - horizontal ramp 0..255 (every pixel needs the arithmetic)
+  opaque       - all 255 (main layers)
+  transparent  - all 0 (rest sections)
+
+Reports p50/p95 per call, frames per second and the speedup over the masked
+blend, as a table and optionally as JSON:
+
+    python benchmarks/composite_bench.py -r 854x480,1920x1080,3840x2160 --json out.json
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+# --- 1. SETUP PATHS ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import renderer
+
+PATTERNS = ("float", "mixed", "opaque", "transparent")
+
+
+def setup_logging(log_level: str = "INFO") -> None:
+    """Setup logging configuration."""
+    numeric_level = getattr(logging, log_level.upper(), None)
+    if not isinstance(numeric_level, int):
+        raise ValueError(f"Invalid log level: {log_level}")
+
+    logging.basicConfig(
+        level=numeric_level,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[logging.StreamHandler()]
+    )
+
+
+# -----------------------------------------------------------------------------
+# SAMPLE GENERATION
+# -----------------------------------------------------------------------------
+
+def make_alpha(pattern: str, w: int, h: int) -> np.ndarray:
+    if pattern == "opaque":
+        return np.full((h, w), 255, dtype=np.uint8)
+    if pattern == "transparent":
+        return np.zeros((h, w), dtype=np.uint8)
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    if pattern == "mixed":
+        return (x / max(1, w - 1) * 255).astype(np.uint8)
+    if pattern == "float":
+        # Ellipse covering ~20% of the frame, soft 10% edge
+        r = np.hypot((x - w * 0.6) / (w * 0.28), (y - h * 0.5) / (h * 0.28))
+        return (np.clip((1.0 - r) / 0.1, 0.0, 1.0) * 255).astype(np.uint8)
+    raise ValueError(f"Unknown pattern: {pattern}")
+
+
+def make_rgb(w: int, h: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 256, (h, w, 3), dtype=np.uint8)
+
+
+# -----------------------------------------------------------------------------
+# BLENDS
+# -----------------------------------------------------------------------------
+
+def masked_blend(dst: np.ndarray, src: np.ndarray, alpha: np.ndarray) -> None:
+    """The gather/scatter blend composite_cpu used before _blend_into."""
+    mask = alpha > 0
+    if np.any(mask):
+        a = alpha[mask][:, None].astype(np.uint16)
+        s = src[mask].astype(np.uint16)
+        d = dst[mask].astype(np.uint16)
+        dst[mask] = ((s * a + d * (255 - a)) // 255).astype(np.uint8)
+
+
+def time_calls(fn: Callable[[], None], repeat: int) -> np.ndarray:
+    fn()  # Warm-up (scratch allocation, page faults)
+    out = np.empty(repeat)
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out[i] = time.perf_counter() - t0
+    return out * 1000.0
+
+
+def summarize(ms: np.ndarray) -> dict:
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "fps": float(1000.0 / ms.mean()) if ms.mean() > 0 else 0.0,
+    }
+
+
+def run_case(w: int, h: int, pattern: str, repeat: int) -> Dict[str, dict]:
+    src = make_rgb(w, h, 1)
+    base = make_rgb(w, h, 2)
+    alpha = make_alpha(pattern, w, h)
+    dst = base.copy()
+    scratch = renderer._BlendScratch()
+
+    def run_masked():
+        np.copyto(dst, base)
+        masked_blend(dst, src, alpha)
+
+    def run_full():
+        np.copyto(dst, base)
+        renderer._blend_into(dst, src, alpha, scratch)
+
+    # Same output check before timing anything
+    run_masked()
+    expected = dst.copy()
+    run_full()
+    max_diff = int(np.abs(dst.astype(np.int16) - expected.astype(np.int16)).max())
+
+    return {
+        "masked": summarize(time_calls(run_masked, repeat)),
+        "full_frame": summarize(time_calls(run_full, repeat)),
+        "max_diff": max_diff,
+    }
+
+
+def run_composite(w: int, h: int, target: Tuple[int, int], repeat: int, threads: int,
+                  resize_first: bool = False) -> dict:
+    main = np.dstack([make_rgb(w, h, 3), make_alpha("opaque", w, h)])
+    float_img = np.dstack([make_rgb(w, h, 4), make_alpha("float", w, h)])
+    renderer.CPU_COMPOSITE_THREADS = threads
+    renderer.RESIZE_BEFORE_BLEND = resize_first
+
+    def run():
+        renderer.release_output(renderer.composite_cpu(main, float_img, target_size=target))
+
+    row = summarize(time_calls(run, repeat))
+    row["bands"] = renderer._band_count(h, w)
+    return row
+
+
+def print_table(results: List[dict]) -> None:
+    header = f"{'res':>10} {'alpha':<12} {'masked ms':>10} {'full ms':>9} {'speedup':>8} {'diff':>5}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        if r["pattern"] == "composite":
+            order = "resize first" if r['resize_first'] else "blend first"
+            print(f"{r['resolution']:>10} {'composite':<12} {'':>10} {r['p50_ms']:>9.2f} {'':>8} {'':>5}"
+                  f"  ({r['fps']:.1f} fps -> {r['target']}, {r['bands']} band(s), {order})")
+            continue
+        m, f = r["masked"], r["full_frame"]
+        speedup = m["p50_ms"] / f["p50_ms"] if f["p50_ms"] > 0 else float("inf")
+        print(f"{r['resolution']:>10} {r['pattern']:<12} {m['p50_ms']:>10.2f} {f['p50_ms']:>9.2f} "
+              f"{speedup:>7.1f}x {r['max_diff']:>5}")
+
+
+def parse_resolutions(text: str) -> List[Tuple[int, int]]:
+    out = []
+    for item in text.split(','):
+        w, h = map(int, item.lower().split('x'))
+        out.append((w, h))
+    return out
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the CPU compositor's alpha blend across resolutions and alpha patterns."
+    )
+    parser.add_argument("-r", "--resolutions", type=str, default="854x480,1920x1080,3840x2160",
+                        help="Comma-separated WxH list (default: 854x480,1920x1080,3840x2160)")
+    parser.add_argument("-p", "--patterns", type=str, default=",".join(PATTERNS),
+                        help=f"Comma-separated alpha patterns (default: {','.join(PATTERNS)})")
+    parser.add_argument("-t", "--threads", type=str, default=f"1,{os.cpu_count() or 1}",
+                        help="Comma-separated CPU_COMPOSITE_THREADS values for the composite rows "
+                             "(default: 1,cpu_count)")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed calls per case (default: 20)")
+    parser.add_argument("--target", type=str, default=None,
+                        help="Letterbox target WxH for the composite_cpu row (default: source size)")
+    parser.add_argument("--json", type=str, default=None, help="Write results to this JSON file ('-' for stdout)")
+    parser.add_argument("--log-level", type=str, default="INFO",
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+                        help="Logging level (default: INFO)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Main entry point."""
+    args = parse_arguments()
+    setup_logging(args.log_level)
+    patterns = [p for p in args.patterns.split(',') if p in PATTERNS]
+
+    results = []
+    for w, h in parse_resolutions(args.resolutions):
+        res = f"{w}x{h}"
+        for pattern in patterns:
+            logging.info(f"{res} {pattern} ...")
+            results.append({"resolution": res, "pattern": pattern, **run_case(w, h, pattern, args.repeat)})
+        target = parse_resolutions(args.target)[0] if args.target else None
+        for threads in sorted({int(t) for t in args.threads.split(',') if t.strip()}):
+            logging.info(f"{res} composite x{threads} ...")
+            row = {"resolution": res, "pattern": "composite", "target": args.target or res, "threads": threads,
+                   "resize_first": False}
+            row.update(run_composite(w, h, target, args.repeat, threads))
+            results.append(row)
+        if target is not None:
+            logging.info(f"{res} composite, resize first ...")
+            row = {"resolution": res, "pattern": "composite", "target": args.target, "threads": 1,
+                   "resize_first": True}
+            row.update(run_composite(w, h, target, args.repeat, 1, resize_first=True))
+            results.append(row)
+
+    print_table(results)
+    if args.json:
+        report = {
+            "host": {"cpu_count": os.cpu_count(), "platform": sys.platform},
+            "settings": {"repeat": args.repeat, "target": args.target},
+            "results": results,
+        }
+        if args.json == "-":
+            json.dump(report, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
+            logging.info(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
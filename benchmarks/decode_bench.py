@@ -0,0 +1,356 @@
+"""
+Decode Benchmark
+
+Times ImageLoader.read_image for every supported asset format at several
+resolutions and thread counts, so the asset format for a deployment target
+can be picked from numbers measured on that device, and decode regressions
+show up before they reach a kiosk.
+
+Formats: .webp, .jpg (SBS colour | mask), .spy (raw memmap), .spz / .npz
+(compressed archives) and .npy ASCII stacks. Without --input, sample frames
+are generated (smooth gradients plus noise, so they compress like real
+footage); with --input, the files already in that folder are grouped by
+extension and measured at their own resolution.
+
+Reports p50/p95/p99 latency per read, throughput in decoded MB/s and file
+MB/s, and peak RSS during each run, as a table and optionally as JSON:
+
+    python benchmarks/decode_bench.py -r 854x480,1920x1080 -t 1,2,4 --json out.json
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+try:
+    import psutil
+except ImportError:  # Peak RSS falls back to ru_maxrss (process lifetime peak)
+    psutil = None
+
+# --- 1. SETUP PATHS ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import turbojpeg_loader
+
+try:
+    turbojpeg_loader.get_turbojpeg()
+except RuntimeError:  # No libturbojpeg: the .jpg rows report the error instead
+    turbojpeg_loader.get_turbojpeg = lambda: None
+
+from image_loader import ImageLoader
+
+FORMATS = ("webp", "jpg", "spy", "spz", "npz", "npy")
+ASCII_CELL = (8, 16)  # Pixels per ASCII character (w, h) when sizing .npy stacks
+
+
+def setup_logging(log_level: str = "INFO") -> None:
+    """Setup logging configuration."""
+    numeric_level = getattr(logging, log_level.upper(), None)
+    if not isinstance(numeric_level, int):
+        raise ValueError(f"Invalid log level: {log_level}")
+
+    logging.basicConfig(
+        level=numeric_level,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[logging.StreamHandler()]
+    )
+
+
+# -----------------------------------------------------------------------------
+# SAMPLE GENERATION
+# -----------------------------------------------------------------------------
+
+def make_frame(w: int, h: int, seed: int) -> np.ndarray:
+    """RGBA frame with gradients, a soft alpha edge and mild noise."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    img = np.empty((h, w, 4), dtype=np.uint8)
+    img[..., 0] = (x / max(1, w - 1) * 255 + seed * 7) % 256
+    img[..., 1] = (y / max(1, h - 1) * 255 + seed * 3) % 256
+    img[..., 2] = ((x + y) / max(1, w + h - 2) * 255) % 256
+    img[..., 3] = np.clip((x - w * 0.3) / max(1.0, w * 0.1) * 255, 0, 255)
+    noise = rng.integers(-8, 9, size=(h, w, 3), dtype=np.int16)
+    img[..., :3] = np.clip(img[..., :3].astype(np.int16) + noise, 0, 255)
+    return img
+
+
+def write_sample(fmt: str, path: str, frame: np.ndarray) -> None:
+    h, w = frame.shape[:2]
+    if fmt == "webp":
+        Image.fromarray(frame, "RGBA").save(path, "WEBP", quality=90)
+    elif fmt == "jpg":
+        # Same layout the loader expects: colour on the left, alpha as grey on the right
+        sbs = np.empty((h, w * 2, 3), dtype=np.uint8)
+        sbs[:, :w] = frame[..., :3]
+        sbs[:, w:] = frame[..., 3:4]
+        Image.fromarray(sbs, "RGB").save(path, "JPEG", quality=90)
+    elif fmt == "spy":
+        with open(path, "wb") as f:
+            np.save(f, frame)
+    elif fmt in ("spz", "npz"):
+        with open(path, "wb") as f:
+            np.savez_compressed(f, image=frame)
+    elif fmt == "npy":
+        cols, rows = max(1, w // ASCII_CELL[0]), max(1, h // ASCII_CELL[1])
+        stack = np.empty((2, rows, cols), dtype=np.uint8)
+        stack[0] = np.frombuffer(b" .:-=+*#%@", dtype=np.uint8)[frame[::ASCII_CELL[1], ::ASCII_CELL[0], 1][:rows, :cols] // 26]
+        stack[1] = frame[::ASCII_CELL[1], ::ASCII_CELL[0], 0][:rows, :cols]
+        np.save(path, stack)
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+
+
+def generate_samples(root: str, formats: List[str], resolutions: List[Tuple[int, int]],
+                     frames: int) -> Dict[Tuple[str, str], List[str]]:
+    """Write `frames` distinct files per (format, resolution); returns their paths."""
+    samples = {}
+    for w, h in resolutions:
+        base = [make_frame(w, h, i) for i in range(frames)]
+        for fmt in formats:
+            folder = os.path.join(root, f"{w}x{h}", fmt)
+            os.makedirs(folder, exist_ok=True)
+            paths = []
+            for i, frame in enumerate(base):
+                path = os.path.join(folder, f"{i:04d}.{fmt}")
+                if not os.path.exists(path):
+                    write_sample(fmt, path, frame)
+                paths.append(path)
+            samples[(fmt, f"{w}x{h}")] = paths
+    return samples
+
+
+def collect_input(folder: str, formats: List[str]) -> Dict[Tuple[str, str], List[str]]:
+    """Group an existing folder's files by extension (resolution reported as 'input')."""
+    samples = {}
+    for name in sorted(os.listdir(folder)):
+        ext = name.rsplit('.', 1)[-1].lower()
+        ext = "jpg" if ext == "jpeg" else ext
+        if ext in formats:
+            samples.setdefault((ext, "input"), []).append(os.path.join(folder, name))
+    return samples
+
+
+# -----------------------------------------------------------------------------
+# MEASUREMENT
+# -----------------------------------------------------------------------------
+
+class RssSampler:
+    """Polls this process's RSS on a background thread and keeps the peak."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if psutil is not None:
+            proc = psutil.Process()
+            self.peak = proc.memory_info().rss
+
+            def poll():
+                while not self._stop.wait(self.interval):
+                    self.peak = max(self.peak, proc.memory_info().rss)
+
+            self._thread = threading.Thread(target=poll, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self.peak = max(self.peak, psutil.Process().memory_info().rss)
+        else:
+            import resource
+            self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return False
+
+
+def drop_cached(paths: List[str]) -> None:
+    """Evict the files from the page cache so the next read goes to storage."""
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def payload_bytes(img) -> int:
+    if isinstance(img, dict):
+        return sum(v.nbytes for v in img.values() if hasattr(v, 'nbytes'))
+    return getattr(img, 'nbytes', 0)
+
+
+def run_case(loader: ImageLoader, paths: List[str], threads: int, repeat: int, cold: bool) -> dict:
+    """Read every path `repeat` times on `threads` threads; one untimed warm-up pass first."""
+    def timed_read(path):
+        t0 = time.perf_counter()
+        img, _ = loader.read_image(path)
+        # Touch memmapped pages; a memmap read is lazy otherwise
+        if isinstance(img, np.memmap):
+            img = np.array(img)
+        elif isinstance(img, dict):
+            img = {k: np.array(v) for k, v in img.items()}
+        dt = time.perf_counter() - t0
+        nbytes = payload_bytes(img)
+        if loader.buffer_pool is not None:
+            loader.buffer_pool.release(img)
+        return dt, nbytes
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(timed_read, paths))
+        latencies = []
+        decoded = 0
+        with RssSampler() as rss:
+            t_start = time.perf_counter()
+            for _ in range(repeat):
+                if cold:
+                    drop_cached(paths)
+                for dt, nbytes in pool.map(timed_read, paths):
+                    latencies.append(dt)
+                    decoded += nbytes
+            wall = time.perf_counter() - t_start
+
+    file_bytes = sum(os.path.getsize(p) for p in paths) * repeat
+    ms = np.array(latencies) * 1000.0
+    return {
+        "reads": len(latencies),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "decoded_mb_s": decoded / (1024 ** 2) / wall if wall > 0 else 0.0,
+        "file_mb_s": file_bytes / (1024 ** 2) / wall if wall > 0 else 0.0,
+        "frames_s": len(latencies) / wall if wall > 0 else 0.0,
+        "avg_file_kb": file_bytes / len(latencies) / 1024 if latencies else 0.0,
+        "peak_rss_mb": rss.peak / (1024 ** 2),
+    }
+
+
+def print_table(results: List[dict]) -> None:
+    header = f"{'format':<6} {'res':>10} {'thr':>3} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} " \
+             f"{'MB/s':>8} {'file MB/s':>9} {'fps':>8} {'file KB':>8} {'RSS MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        if "error" in r:
+            print(f"{r['format']:<6} {r['resolution']:>10} {r['threads']:>3}  error: {r['error']}")
+            continue
+        print(f"{r['format']:<6} {r['resolution']:>10} {r['threads']:>3} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+              f"{r['p99_ms']:>8.2f} {r['decoded_mb_s']:>8.1f} {r['file_mb_s']:>9.1f} {r['frames_s']:>8.1f} "
+              f"{r['avg_file_kb']:>8.1f} {r['peak_rss_mb']:>8.1f}")
+
+
+def parse_list(text: str, cast=int) -> list:
+    return [cast(v) for v in text.split(',') if v.strip()]
+
+
+def parse_resolutions(text: str) -> List[Tuple[int, int]]:
+    out = []
+    for item in text.split(','):
+        w, h = map(int, item.lower().split('x'))
+        out.append((w, h))
+    return out
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark ImageLoader.read_image across asset formats, resolutions and thread counts."
+    )
+    parser.add_argument("-i", "--input", type=str, default=None,
+                        help="Measure the files in this folder instead of generated samples")
+    parser.add_argument("-w", "--workdir", type=str, default=None,
+                        help="Where generated samples are written and kept (default: temporary, deleted)")
+    parser.add_argument("-f", "--formats", type=str, default=",".join(FORMATS),
+                        help=f"Comma-separated formats (default: {','.join(FORMATS)})")
+    parser.add_argument("-r", "--resolutions", type=str, default="854x480,1920x1080",
+                        help="Comma-separated WxH list for generated samples (default: 854x480,1920x1080)")
+    parser.add_argument("-t", "--threads", type=str, default="1,2,4",
+                        help="Comma-separated thread counts (default: 1,2,4)")
+    parser.add_argument("-n", "--frames", type=int, default=24,
+                        help="Distinct files per format and resolution (default: 24)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes over the files (default: 3)")
+    parser.add_argument("--cold", action="store_true",
+                        help="Evict files from the page cache before each pass (posix_fadvise DONTNEED)")
+    parser.add_argument("--buffer-pool", action="store_true", help="Decode into pooled buffers")
+    parser.add_argument("--target", type=str, default=None,
+                        help="Reduced-resolution decode target WxH, as used in headless modes")
+    parser.add_argument("--json", type=str, default=None, help="Write results to this JSON file ('-' for stdout)")
+    parser.add_argument("--log-level", type=str, default="INFO",
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+                        help="Logging level (default: INFO)")
+    return parser.parse_args()
+
+
+def run(args: argparse.Namespace, workdir: str) -> List[dict]:
+    formats = [f for f in parse_list(args.formats, str) if f in FORMATS]
+    if args.input:
+        samples = collect_input(args.input, formats)
+    else:
+        logging.info(f"Generating samples in {workdir} ...")
+        samples = generate_samples(workdir, formats, parse_resolutions(args.resolutions), args.frames)
+
+    loader = ImageLoader(buffer_pool=8 if args.buffer_pool else 0)
+    if args.target:
+        loader.set_target_size(parse_resolutions(args.target)[0])
+
+    results = []
+    for (fmt, res), paths in samples.items():
+        for threads in parse_list(args.threads):
+            row = {"format": fmt, "resolution": res, "threads": threads, "files": len(paths)}
+            logging.info(f"{fmt} {res} x{threads} ...")
+            try:
+                row.update(run_case(loader, paths, threads, args.repeat, args.cold))
+            except Exception as e:
+                row["error"] = f"{type(e).__name__}: {e}"
+            results.append(row)
+    loader.close()
+    return results
+
+
+def main() -> None:
+    """Main entry point."""
+    args = parse_arguments()
+    setup_logging(args.log_level)
+
+    if args.workdir:
+        os.makedirs(args.workdir, exist_ok=True)
+        results = run(args, args.workdir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="decode_bench_") as tmp:
+            results = run(args, tmp)
+
+    print_table(results)
+    if args.json:
+        report = {
+            "host": {"cpu_count": os.cpu_count(), "platform": sys.platform},
+            "settings": {"repeat": args.repeat, "cold": args.cold, "buffer_pool": args.buffer_pool,
+                         "target": args.target},
+            "results": results,
+        }
+        if args.json == "-":
+            json.dump(report, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
+            logging.info(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
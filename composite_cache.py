@@ -0,0 +1,75 @@
+"""
+composite_cache.py – LRU cache of composited output frames.
+
+The same main/float pair comes back at ping-pong turnarounds, through rest
+zones where both folders are 0 and across captures of a held frame, and the
+CPU compositor used to rebuild it from scratch every time. Entries are keyed
+by what determines the output - (main path, float path, main SBS, float SBS,
+output size, decoded layer shapes), plus an encoding tag such as ("jpeg", quality) when the encoded
+bytes are cached instead of the pixels - and evicted least recently used
+under a byte budget.
+
+Cached arrays are made read-only; every consumer (JPEG encode, ASCII
+conversion) only reads them.
+"""
+import threading
+from collections import OrderedDict
+
+
+class CompositeCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = int(max_bytes)
+        self._entries = OrderedDict()  # key -> (value, nbytes), oldest first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Cache an output frame (ndarray) or encoded bytes; returns False if it can't fit at all."""
+        nbytes = value.nbytes if hasattr(value, 'nbytes') else len(value)
+        if nbytes > self.max_bytes:
+            return False
+        if hasattr(value, 'setflags'):
+            value.setflags(write=False)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, size) = self._entries.popitem(last=False)
+                self._bytes -= size
+                self.evictions += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self):
+        """Get cache statistics (thread-safe)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -20,3 +20,44 @@ LOW_RES_FULLSCREEN_RESOLUTION = (960, 600)
 # -------------------------
 AUTO_OPTIMIZE_DISPLAY_RESOLUTION = True  # Automatically change display resolution to match small images
 RESTORE_DISPLAY_ON_EXIT = True  # Restore original display resolution when application exits
+
+# -------------------------
+# Frame Pacing
+# -------------------------
+# The display loop wakes on absolute FPS deadlines phase-locked to the index clock:
+# a coarse sleep, then a spin for the last PACER_SPIN_MS. Late frames catch up on
+# the same grid; whole missed frames are skipped. Lateness histogram goes to /data.
+PACER_SPIN_MS = 1.0          # 0 = sleep only (less CPU, more jitter)
+PACER_ALIGN_TO_CLOCK = True  # Align frame boundaries to the launch time (free clock only)
+
+# Web/ASCII modes on the free clock sleep until the next index change (or the next
+# change after the capture slot, when SERVER_CAPTURE_RATE < IPS) instead of running
+# at FPS; GL renders only frames it captures.
+HEADLESS_EVENT_LOOP = True
+
+# -------------------------
+# CPU Compositor
+# -------------------------
+# The no-GL compositor (web/ASCII without a GL context) can split each frame into row
+# bands blended in parallel: one band per thread, at least 256K pixels per band.
+# Opt-in: the band pool competes with the loader's decode threads/processes for cores.
+CPU_COMPOSITE_THREADS = 1  # 1 = single-threaded; N = N bands; 0 = cpu_count
+# When the output is smaller than the source (web mode), resize each layer (alpha
+# premultiplied) to the letterboxed size first and blend there.
+RESIZE_BEFORE_BLEND = True
+# Output frames come from a small ring of buffers owned by the caller until it has
+# encoded/converted them, instead of being copied out of shared buffers.
+CPU_OUTPUT_BUFFERS = 3
+# Debug: poison released output buffers and fail on double release or on a write
+# after release (costs a full-frame fill and compare per frame).
+CPU_OUTPUT_DEBUG = False
+
+# -------------------------
+# Composite Cache
+# -------------------------
+# The no-GL compositor keeps recent output frames keyed by source paths, SBS flags
+# and output size, so repeats (ping-pong turnarounds, rest zones, held frames)
+# skip compositing. With COMPOSITE_CACHE_JPEG the web stream caches the encoded
+# JPEG instead, skipping the encode as well.
+COMPOSITE_CACHE_MB = 0  # 0 = off
+COMPOSITE_CACHE_JPEG = True
@@ -0,0 +1,114 @@
+#loader_constants.py - decode, caching and prefetch tuning for image_loader / image_display.
+
+# -------------------------
+# Decoded-Frame Cache
+# -------------------------
+# Byte budget (MB) for decoded WebP/JPEG/SPZ/NPZ frames kept in RAM, keyed by file path.
+# 0 = off. Ping-pong playback revisits every frame once per period, so 300-500 MB on
+# a Pi kiosk removes most repeat decodes.
+FRAME_CACHE_MB = 0
+
+# -------------------------
+# Decode Buffer Pool
+# -------------------------
+# Reuse WebP/JPEG output arrays instead of allocating a fresh one per frame.
+# Buffers return to the pool once the FIFO and the display loop are both done with them.
+DECODE_BUFFER_POOL = True
+DECODE_POOL_MAX_FREE = 8  # Spare buffers kept per frame size
+
+# -------------------------
+# Reduced-Resolution Decoding
+# -------------------------
+# Headless modes (web / ASCII) decode WebP and JPEG straight to the smallest size at or
+# above what the output needs (libwebp scaled decode, TurboJPEG DCT scaling).
+REDUCED_RES_DECODE = True
+
+# -------------------------
+# Frame Slabs (utilities/bake_assets.py)
+# -------------------------
+# A folder holding a single (frames, H, W, 4) slab is listed one entry per frame as
+# "<folder>/frames.npy#<frame>", resolved by ImageLoader to a zero-copy memmap slice.
+SLAB_FILE_NAME = "frames.npy"
+SLAB_FRAME_SEP = "#"
+SLAB_BBOX_FILE_NAME = "frames_bbox.npy"  # (frames, 4) alpha bbox per frame: y0, y1, x0, x1
+
+# -------------------------
+# Decode Backend
+# -------------------------
+# "thread": decode inside the loader thread pool (default).
+# "process": decode in worker processes, pixels handed back through shared memory.
+#            Scales decode with cores on 4+ core boxes. Needs fork (Linux); the
+#            decoded-frame cache and buffer pool don't apply in this mode.
+DECODE_BACKEND = "thread"
+DECODE_PROCESSES = 0  # 0 = cpu_count - 1
+
+# -------------------------
+# Transcode Cache
+# -------------------------
+# Disk budget (MB) for .spz/.npz frames re-saved uncompressed (.spy) on first read;
+# later reads memmap the raw file instead of inflating. 0 = off.
+# Entries are keyed by source path + mtime + size, so edited sources re-transcode.
+TRANSCODE_CACHE_MB = 0
+TRANSCODE_CACHE_DIR = "_cache/transcoded"
+
+# -------------------------
+# Readahead
+# -------------------------
+# Ask the kernel to start reading the files needed READAHEAD_MIN_S..READAHEAD_MAX_S
+# seconds ahead of the playhead (posix_fadvise WILLNEED), so decodes hit the page
+# cache instead of waiting on the SD card. Warm/late/cold read counts go to /data.
+READAHEAD = True
+READAHEAD_MIN_S = 0.5
+READAHEAD_MAX_S = 2.0
+
+# -------------------------
+# Load Pipeline
+# -------------------------
+# Split each frame load into an I/O stage (file bytes into reused buffers) and a
+# decode stage, joined by a bounded queue, so slow reads and slow decodes don't
+# stall each other. Per-stage busy counts, queue depths and timings go to /data.
+# Thread decode backend only.
+LOAD_PIPELINE = True
+LOAD_IO_THREADS = 2
+LOAD_DECODE_THREADS = 0  # 0 = min(8, cpu_count + 2), same as the plain thread pool
+LOAD_DECODE_QUEUE = 4    # Frames read and waiting for a decode thread
+
+# -------------------------
+# Parallel Layer Decode
+# -------------------------
+# Decode a frame's float layer on a helper thread while the loader worker decodes
+# the main layer, so a frame costs the slower decode instead of the sum. A frame
+# whose main and float are the same file is decoded once. Thread decode backend only
+# (the process backend already decodes layers in separate workers).
+LAYER_PARALLEL_DECODE = True
+LAYER_DECODE_THREADS = 0  # 0 = cpu_count
+
+# -------------------------
+# Adaptive Worker Count
+# -------------------------
+# Grow the decode workers on late misses or a backlog while the CPU has headroom;
+# shrink them when the CPU is saturated, a grow only made decodes slower, or they
+# sit idle. Count, bounds and each decision go to /data. Thread decode backend only.
+WORKER_AUTOSIZE = True
+WORKER_MIN = 2
+WORKER_MAX = 0                  # 0 = min(16, 2 * cpu_count + 2)
+WORKER_SIZING_INTERVAL_S = 2.0  # Seconds between decisions
+WORKER_CPU_HIGH = 85            # Percent; no growing at or above this
+
+# -------------------------
+# Prefetch Window
+# -------------------------
+# Upcoming indices (following the clock and ping-pong direction) kept buffered or
+# in flight. Capped at FIFO_LENGTH. Window fill and miss causes (late / not
+# requested / dropped) go to /data.
+PREFETCH_WINDOW = 8
+PREFETCH_FOLDER_LOOKAHEAD = True  # Request frames past a projected folder switch from the new folders
+
+# -------------------------
+# Sparse Float Layers
+# -------------------------
+# An RGBA float layer whose alpha bounding box covers at most this fraction of the
+# frame is cropped to that box (slab sidecar from bake_assets.py, else computed on
+# first decode per path); the compositor blends and GL uploads only the tile.
+# 0 = off. Thread decode backend only; SBS (JPEG) float layers stay full frame.
+SPARSE_FLOAT_MAX_AREA = 0  # e.g. 0.5 to crop floats covering at most half the frame
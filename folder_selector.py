@@ -10,7 +10,7 @@ from settings import CLOCK_MODE, IPS
 LOCAL_CONTROLFPS = 2*IPS #local fps
 
 
-def update_folder_selection(index, float_folder_count, main_folder_count, folder_dict=None):
+def update_folder_selection(index, float_folder_count, main_folder_count, folder_dict=None, now=None):
     """
     Maintains persistent random timing for folder switching.
     Folders reset to 0 in rest zones and switch based on randomized modulus logic.
@@ -18,6 +18,7 @@ def update_folder_selection(index, float_folder_count, main_folder_count, folder
     while preserving the rest → first → periodic structure.
     Enforces a minimum ~1 s gap, caps at ~20 s, and adds slight random jitter.
     Timing is based on real elapsed time, not ping-pong index.
+    `now` (time.time() seconds) can be injected; project_folder_selection() uses it.
     """
     # Use provided dictionary or fallback to global
     if folder_dict is None:
@@ -35,7 +36,8 @@ def update_folder_selection(index, float_folder_count, main_folder_count, folder
     rng = folder_dict['rng']
 
     # Initialize last-pick times for spacing enforcement
-    now = time.time()
+    if now is None:
+        now = time.time()
     if 'last_main_time' not in folder_dict:
         folder_dict['last_main_time'] = now
     if 'last_float_time' not in folder_dict:
@@ -140,4 +142,56 @@ def update_folder_selection(index, float_folder_count, main_folder_count, folder
 
     # Save and return updated selection
     folder_dict['Main_and_Float_Folders'] = (main_folder, float_folder)
-    return main_folder, float_folder
\ No newline at end of file
+    return main_folder, float_folder
+
+
+def _scratch_copy(folder_dict):
+    """Copy of the selection state that can be advanced without touching the original."""
+    scratch = dict(folder_dict)
+    for key in ('pre_main', 'pre_float'):
+        if key in scratch:
+            scratch[key] = deque(scratch[key])
+    if 'rng' in scratch:
+        rng = random.Random()
+        rng.setstate(folder_dict['rng'].getstate())
+        scratch['rng'] = rng
+    return scratch
+
+
+def project_folder_selection(indices, float_folder_count, main_folder_count, folder_dict=None, now=None, ips=IPS):
+    """
+    Pure lookahead: the (main, float) pair update_folder_selection() will return for
+    each of the upcoming clock ticks in `indices`, one every 1/ips seconds from `now`.
+    A tick that repeats the previous index (ping-pong pivot) makes no call, as in
+    the display loop. Runs the same logic on a copy of the state and of the RNG, so
+    the live selection (and its random sequence) is unchanged. Exact as long as the
+    real calls keep to that schedule.
+    """
+    if folder_dict is None:
+        folder_dict = folder_dictionary
+    scratch = _scratch_copy(folder_dict)
+    if now is None:
+        now = time.time()
+    pairs = []
+    pair = scratch.get('Main_and_Float_Folders', (0, 0))
+    prev = None
+    for step, idx in enumerate(indices, 1):
+        if idx != prev:
+            pair = update_folder_selection(idx, float_folder_count, main_folder_count, scratch, now + step / ips)
+        pairs.append(pair)
+        prev = idx
+    return pairs
+
+
+def upcoming_folder_switches(indices, float_folder_count, main_folder_count, folder_dict=None, now=None, ips=IPS):
+    """[(step, index, (main, float))] for each projected change of folder pair over `indices`."""
+    if folder_dict is None:
+        folder_dict = folder_dictionary
+    current = folder_dict.get('Main_and_Float_Folders', (0, 0))
+    switches = []
+    pairs = project_folder_selection(indices, float_folder_count, main_folder_count, folder_dict, now, ips)
+    for step, (idx, pair) in enumerate(zip(indices, pairs), 1):
+        if pair != current:
+            switches.append((step, idx, pair))
+            current = pair
+    return switches
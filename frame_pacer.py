@@ -0,0 +1,118 @@
+"""
+frame_pacer.py – Absolute-deadline frame pacing for the display loop.
+
+Sleeping `1/FPS - dt` after each frame lets every overshoot of time.sleep()
+and every slow frame push all later frames back, so intervals jitter and the
+loop slides against the IPS index clock. FramePacer instead puts frame k at
+epoch + k / FPS on perf_counter_ns(), with the epoch phase-locked to the
+index clock's launch time, so:
+
+  - it sleeps coarsely to `spin_ns` before the deadline, then spin-waits;
+  - a frame that runs late starts the next one immediately, and the loop
+    catches up onto the same grid (no drift accumulates);
+  - once more than a whole frame behind, the missed deadlines are skipped
+    (counted) rather than replayed back to back.
+
+Lateness (wake-up time minus deadline) goes into a histogram for the monitor.
+The clocks and sleep are injectable so tests can drive the pacer deterministically.
+"""
+import time
+
+NS = 1_000_000_000
+LATE_BUCKETS_MS = (0.1, 0.5, 1, 2, 4, 8, 16)  # Upper edges; anything later is "more"
+
+
+class FramePacer:
+    def __init__(self, fps, spin_ns=1_000_000, anchor_ns=None, clock=time.perf_counter_ns, sleep=time.sleep,
+                 wall_clock=time.time_ns):
+        self.fps = fps
+        self.spin_ns = max(0, int(spin_ns))
+        self._clock = clock
+        self._sleep = sleep
+        now = clock()
+        if anchor_ns is not None:
+            # Phase-lock frame boundaries to a wall-clock origin (index_calculator.launch_time)
+            self.epoch = now - (((wall_clock() - anchor_ns) * fps) % NS) // fps
+        else:
+            self.epoch = now
+        self.frame = (now - self.epoch) * fps // NS
+        self.frames = 0
+        self.skipped = 0
+        self.hist = [0] * (len(LATE_BUCKETS_MS) + 1)
+        self.late_max_ns = 0
+        self.late_total_ns = 0
+
+    def deadline(self, frame):
+        """Clock time (perf_counter_ns) at which `frame` starts; exact integer grid, never rebased."""
+        return self.epoch + frame * NS // self.fps
+
+    def wait(self):
+        """Block until the next frame's deadline; returns how late we woke, in ns."""
+        frame = self.frame + 1
+        now = self._clock()
+        if now - self.deadline(frame) >= NS // self.fps:
+            # More than a frame behind: jump to the latest deadline already passed
+            current = (now - self.epoch) * self.fps // NS
+            self.skipped += current - frame
+            frame = current
+        target = self.deadline(frame)
+        coarse = target - self.spin_ns - now
+        if coarse > 0:
+            self._sleep(coarse / NS)
+        while self._clock() < target:
+            pass
+        late = self._clock() - target
+        self.frame = frame
+        self._record(late)
+        return late
+
+    def _record(self, late_ns):
+        self.frames += 1
+        self.late_total_ns += late_ns
+        self.late_max_ns = max(self.late_max_ns, late_ns)
+        ms = late_ns / 1e6
+        for i, edge in enumerate(LATE_BUCKETS_MS):
+            if ms < edge:
+                self.hist[i] += 1
+                break
+        else:
+            self.hist[-1] += 1
+
+    def get_stats(self):
+        """Frame count, skipped deadlines, lateness summary and histogram."""
+        labels = [f"<{edge}ms" for edge in LATE_BUCKETS_MS] + [f">={LATE_BUCKETS_MS[-1]}ms"]
+        return {
+            'frames': self.frames,
+            'skipped': self.skipped,
+            'late_avg_ms': self.late_total_ns / max(1, self.frames) / 1e6,
+            'late_max_ms': self.late_max_ns / 1e6,
+            'late_hist': dict(zip(labels, self.hist)),
+        }
+
+
+class CaptureGate:
+    """
+    Throttles headless captures to `rate` per second. Captures follow index
+    changes, and the stamp lands a little after the change that triggered it,
+    so a full interval from the stamp falls just past the next change and the
+    gate would let only every other one through. Half an index tick of slack
+    keeps each slot on the index change it was meant for.
+    """
+
+    def __init__(self, rate, ips, clock=time.time_ns):
+        self.interval_ns = NS // max(1, int(rate))
+        self.slack_ns = NS // (2 * max(1, int(ips)))
+        self._clock = clock
+        self.last_ns = clock()
+
+    def ready(self, now_ns=None):
+        """True once the next capture slot has opened."""
+        now_ns = self._clock() if now_ns is None else now_ns
+        return now_ns >= self.next_slot_ns()
+
+    def mark(self, now_ns=None):
+        self.last_ns = self._clock() if now_ns is None else now_ns
+
+    def next_slot_ns(self):
+        """Earliest time_ns() the next capture may happen."""
+        return self.last_ns + self.interval_ns - self.slack_ns
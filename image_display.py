@@ -1,7 +1,7 @@
 #image_display.py
+import math
 import os
 import time
-from concurrent.futures import ThreadPoolExecutor
 from collections import deque
 import threading
 
@@ -30,6 +30,7 @@ FPS = getattr(settings, 'FPS', 30)
 FRAME_COUNTER_DISPLAY = getattr(settings, 'FRAME_COUNTER_DISPLAY', True)
 CLOCK_MODE = getattr(settings, 'CLOCK_MODE', 0)
 FIFO_LENGTH = getattr(settings, 'FIFO_LENGTH', 30)
+FIFO_MAX_MB = getattr(settings, 'FIFO_MAX_MB', 0)
 BACKGROUND_COLOR = getattr(settings, 'BACKGROUND_COLOR', (0, 0, 0))
 
 # Streaming Settings
@@ -37,6 +38,39 @@ JPEG_QUALITY = getattr(settings, 'JPEG_QUALITY', 55)
 SERVER_CAPTURE_RATE = getattr(settings, "SERVER_CAPTURE_RATE", FPS or 10)
 HEADLESS_RES = getattr(settings, "HEADLESS_RES", (480, 640))
 
+# Loader Settings
+FRAME_CACHE_MB = getattr(settings, 'FRAME_CACHE_MB', 0)
+DECODE_BUFFER_POOL = getattr(settings, 'DECODE_BUFFER_POOL', True)
+DECODE_POOL_MAX_FREE = getattr(settings, 'DECODE_POOL_MAX_FREE', 8)
+REDUCED_RES_DECODE = getattr(settings, 'REDUCED_RES_DECODE', True)
+DECODE_BACKEND = getattr(settings, 'DECODE_BACKEND', "thread")
+DECODE_PROCESSES = getattr(settings, 'DECODE_PROCESSES', 0)
+TRANSCODE_CACHE_MB = getattr(settings, 'TRANSCODE_CACHE_MB', 0)
+TRANSCODE_CACHE_DIR = getattr(settings, 'TRANSCODE_CACHE_DIR', "_cache/transcoded")
+READAHEAD = getattr(settings, 'READAHEAD', True)
+READAHEAD_MIN_S = getattr(settings, 'READAHEAD_MIN_S', 0.5)
+READAHEAD_MAX_S = getattr(settings, 'READAHEAD_MAX_S', 2.0)
+PREFETCH_WINDOW = getattr(settings, 'PREFETCH_WINDOW', 8)
+PREFETCH_FOLDER_LOOKAHEAD = getattr(settings, 'PREFETCH_FOLDER_LOOKAHEAD', True)
+LOAD_PIPELINE = getattr(settings, 'LOAD_PIPELINE', True)
+LOAD_IO_THREADS = getattr(settings, 'LOAD_IO_THREADS', 2)
+LOAD_DECODE_THREADS = getattr(settings, 'LOAD_DECODE_THREADS', 0)
+LOAD_DECODE_QUEUE = getattr(settings, 'LOAD_DECODE_QUEUE', 4)
+LAYER_PARALLEL_DECODE = getattr(settings, 'LAYER_PARALLEL_DECODE', True)
+LAYER_DECODE_THREADS = getattr(settings, 'LAYER_DECODE_THREADS', 0)
+SPARSE_FLOAT_MAX_AREA = getattr(settings, 'SPARSE_FLOAT_MAX_AREA', 0)
+HEADLESS_EVENT_LOOP = getattr(settings, 'HEADLESS_EVENT_LOOP', True)
+PACER_SPIN_MS = getattr(settings, 'PACER_SPIN_MS', 1.0)
+PACER_ALIGN_TO_CLOCK = getattr(settings, 'PACER_ALIGN_TO_CLOCK', True)
+WORKER_AUTOSIZE = getattr(settings, 'WORKER_AUTOSIZE', True)
+WORKER_MIN = getattr(settings, 'WORKER_MIN', 2)
+WORKER_MAX = getattr(settings, 'WORKER_MAX', 0)
+WORKER_SIZING_INTERVAL_S = getattr(settings, 'WORKER_SIZING_INTERVAL_S', 2.0)
+WORKER_CPU_HIGH = getattr(settings, 'WORKER_CPU_HIGH', 85)
+COMPOSITE_CACHE_MB = getattr(settings, 'COMPOSITE_CACHE_MB', 0)
+COMPOSITE_CACHE_JPEG = getattr(settings, 'COMPOSITE_CACHE_JPEG', True)
+STATS_INTERVAL = 1.0  # Seconds between pipeline counter pushes to the monitor
+
 # --- ASCII PRE-BAKE CONSTANTS ---
 # Pre-calculate LUTs once for the merger/renderer
 _ansi_colors = [f"\033[38;5;{i}m" for i in range(256)]
@@ -45,8 +79,9 @@ ANSI_LUT = np.array(_ansi_colors)
 RESET_CODE = "\033[0m"
 # --------------------------------
 
+import index_calculator
 from index_calculator import update_index
-from folder_selector import update_folder_selection, folder_dictionary
+from folder_selector import update_folder_selection, folder_dictionary, project_folder_selection
 from display_manager import DisplayState, display_init, _is_wayland_session, _hide_cursor_reliable, _move_wlrctl_offscreen_once
 from event_handler import register_callbacks
 import renderer
@@ -78,6 +113,14 @@ class RollingIndexCompensator:
 
 
 from image_loader import ImageLoader, FIFOImageBuffer
+import process_loader
+from process_loader import ProcessImageLoader
+from readahead import Readahead
+from load_pipeline import LoadPipeline, DeadlinePool
+from prefetch import PrefetchScheduler
+from worker_sizing import WorkerSizer
+from frame_pacer import CaptureGate, FramePacer
+from composite_cache import CompositeCache
 
 
 class FIFOImageBufferPatched(FIFOImageBuffer):
@@ -85,11 +128,186 @@ class FIFOImageBufferPatched(FIFOImageBuffer):
     pass
 
 
+def decode_target(is_web, is_ascii):
+    """
+    Smallest (w, h) a decoded layer must fill for the headless output, plus the fit rule,
+    or (None, None) for full-resolution decoding.
+    """
+    if not REDUCED_RES_DECODE:
+        return None, None
+    if is_ascii:
+        # to_ascii() COVER-scales to cols x rows with rows squashed by the font ratio
+        cols = max(1, int(getattr(settings, 'ASCII_WIDTH', 90)))
+        rows = max(1, int(getattr(settings, 'ASCII_HEIGHT', 60)))
+        font_ratio = getattr(settings, 'ASCII_FONT_RATIO', 0.5) or 1.0
+        return (cols, math.ceil(rows / font_ratio)), "cover"
+    if is_web:
+        return HEADLESS_RES, "contain"
+    return None, None
+
+
+def pipeline_stats(loader, pool=None, prefetcher=None, sizer=None, fifo=None, pacer=None, composite_cache=None,
+                   output_ring=None):
+    """Flatten loader-side counters into monitor keys for /data."""
+    stats = {}
+    if output_ring is not None:
+        o = output_ring.get_stats()
+        stats.update({
+            "cpu_output_buffers": f"{o['outstanding']}/{o['depth']}",
+            "cpu_output_reuses": o['reuses'],
+            "cpu_output_overflows": o['overflows'],
+            "cpu_output_violations": o['violations'],
+        })
+    if composite_cache is not None:
+        c = composite_cache.get_stats()
+        stats.update({
+            "composite_cache_entries": c['entries'],
+            "composite_cache_mb": f"{c['bytes'] / (1024 ** 2):.1f}/{c['max_bytes'] // (1024 ** 2)}",
+            "composite_cache_hits": c['hits'],
+            "composite_cache_misses": c['misses'],
+            "composite_cache_evictions": c['evictions'],
+            "composite_cache_hit_rate": f"{c['hit_rate']:.1%}",
+        })
+    if pacer is not None:
+        t = pacer.get_stats()
+        stats.update({
+            "pace_frames": t['frames'],
+            "pace_skipped": t['skipped'],
+            "pace_late_avg_ms": f"{t['late_avg_ms']:.2f}",
+            "pace_late_max_ms": f"{t['late_max_ms']:.2f}",
+            "pace_late_hist": " ".join(f"{k}:{v}" for k, v in t['late_hist'].items()),
+        })
+    if fifo is not None:
+        f = fifo.get_stats()
+        stats.update({
+            "fifo_frames": f"{f['depth']}/{f['max_size'] or '-'}",
+            "fifo_mb": f"{f['bytes'] / (1024 ** 2):.1f}/{f['max_bytes'] // (1024 ** 2) or '-'}",
+            "fifo_budget_drops": f['budget_drops'],
+        })
+    if sizer is not None:
+        w = sizer.get_stats()
+        stats.update({
+            "load_workers": w['workers'],
+            "load_workers_range": f"{w['min_workers']}-{w['max_workers']}",
+            "load_workers_grows": w['grows'],
+            "load_workers_shrinks": w['shrinks'],
+            "load_workers_decision": f"{w['decision']}: {w['reason']}",
+            "load_workers_history": "; ".join(f"{f}->{t} {r}" for _, f, t, r in w['history']),
+        })
+    if prefetcher is not None:
+        p = prefetcher.get_stats()
+        stats.update({
+            "prefetch_fill": f"{p['fill']}/{p['window']}",
+            "prefetch_fill_avg": f"{p['fill_avg']:.1f}",
+            "prefetch_in_flight": p['in_flight'],
+            "prefetch_submitted": p['submitted'],
+            "prefetch_deduplicated": p['deduplicated'],
+            "prefetch_discarded": p['discarded'],
+            "prefetch_cancelled": p['cancelled'],
+            "miss_late": p['misses']['late'],
+            "miss_not_requested": p['misses']['not_requested'],
+            "miss_dropped": p['misses']['dropped'],
+        })
+    if isinstance(pool, LoadPipeline):
+        s = pool.get_stats()
+        stats.update({
+            "load_io_busy": f"{s['io_busy']}/{s['io_threads']}",
+            "load_io_queue": s['io_queue'],
+            "load_io_queue_peak": s['io_queue_peak'],
+            "load_io_ms": f"{s['io_avg_ms']:.1f}",
+            "load_decode_busy": f"{s['decode_busy']}/{s['decode_threads']}",
+            "load_decode_queue": f"{s['decode_queue']}/{s['decode_queue_max']}",
+            "load_decode_queue_peak": s['decode_queue_peak'],
+            "load_decode_ms": f"{s['decode_avg_ms']:.1f}",
+            "load_read_mb": f"{s['bytes_read'] / (1024 ** 2):.1f}",
+            "load_errors": s['io_errors'] + s['decode_errors'],
+            "load_expired": s['expired'],
+        })
+        r = loader.read_buffers.get_stats()
+        stats.update({
+            "read_buffer_allocations": r['allocations'],
+            "read_buffer_reuses": r['reuses'],
+        })
+    elif isinstance(pool, DeadlinePool):
+        s = pool.get_stats()
+        stats.update({
+            "load_busy": f"{s['busy']}/{s['threads']}",
+            "load_queue": s['queue'],
+            "load_ms": f"{s['avg_ms']:.1f}",
+            "load_expired": s['expired'],
+        })
+    o = loader.get_opacity_stats()
+    for role in ("main", "float"):
+        for cls, count in o[role].items():
+            stats[f"layer_{role}_{cls}"] = count
+    stats["layer_opacity_scans"] = o['scans']
+    l = loader.get_layer_stats()
+    stats.update({
+        "layer_parallel": l['parallel'],
+        "layer_shared": l['shared'],
+        "layer_float_tiles": l['tiles'],
+        "layer_float_tile_area": f"{l['tile_area']:.1%}",
+    })
+    if loader.frame_cache is not None:
+        c = loader.frame_cache.get_stats()
+        stats.update({
+            "frame_cache_entries": c['entries'],
+            "frame_cache_mb": f"{c['bytes'] // (1024 ** 2)}/{c['max_bytes'] // (1024 ** 2)}",
+            "frame_cache_hits": c['hits'],
+            "frame_cache_misses": c['misses'],
+            "frame_cache_evictions": c['evictions'],
+            "frame_cache_rejected": c['rejected'],
+            "frame_cache_hit_rate": f"{c['hit_rate']:.1%}",
+        })
+    if loader.buffer_pool is not None:
+        p = loader.buffer_pool.get_stats()
+        stats.update({
+            "decode_pool_allocations": p['allocations'],
+            "decode_pool_reuses": p['reuses'],
+            "decode_pool_outstanding": p['outstanding'],
+            "decode_pool_free": p['free'],
+            "decode_pool_free_mb": f"{p['free_bytes'] / (1024 ** 2):.1f}",
+        })
+    if loader.transcode_cache is not None:
+        t = loader.transcode_cache.get_stats()
+        stats.update({
+            "transcode_files": t['files'],
+            "transcode_mb": f"{t['bytes'] // (1024 ** 2)}/{t['max_bytes'] // (1024 ** 2)}",
+            "transcode_hits": t['hits'],
+            "transcode_misses": t['misses'],
+            "transcode_writes": t['writes'],
+            "transcode_evictions": t['evictions'],
+        })
+    if loader.readahead is not None:
+        r = loader.readahead.get_stats()
+        stats.update({
+            "readahead_horizon": f"{r['horizon_frames'][0]}-{r['horizon_frames'][1]}",
+            "readahead_advised": r['advised'],
+            "readahead_queued": r['queued'],
+            "readahead_dropped": r['dropped'],
+            "readahead_warm": r['warm_reads'],
+            "readahead_late": r['late_reads'],
+            "readahead_cold": r['cold_reads'],
+            "readahead_warm_rate": f"{r['warm_rate']:.1%}",
+        })
+    engine_stats = getattr(loader, 'engine_stats', None)
+    if engine_stats is not None:
+        e = engine_stats()
+        stats.update({
+            "decode_processes": e['processes'],
+            "shm_slots_free": f"{e['slots_free']}/{e['slots']}",
+            "shm_slot_mb": f"{e['slot_mb']:.1f}",
+            "shm_frames": e['slot_frames'],
+            "shm_pickled_frames": e['pickled_frames'],
+        })
+    return stats
+
+
 # -----------------------------------------------------------------------------
 # WORKER FUNCTION (Runs in Background Threads)
 # -----------------------------------------------------------------------------
 
-def load_and_render_frame(loader, index, main_folder, float_folder, source_aspect_ratio=None):
+def load_and_render_frame(loader, index, main_folder, float_folder, source_aspect_ratio=None, raw=None):
     """
     Loads images AND performs the heavy ASCII merging/string-generation
     in the background thread. Returns the final string if ASCII.
@@ -100,9 +318,13 @@ def load_and_render_frame(loader, index, main_folder, float_folder, source_aspec
         main_folder: Main folder path
         float_folder: Float folder path
         source_aspect_ratio: Source image aspect ratio (w/h) for consistent scaling
+        raw: (main, float) file bytes already read by the LoadPipeline I/O stage
+
+    Image frames come back as (main, float, main_sbs, float_sbs, (main_path, float_path),
+    (main_class, float_class)) with the layers' opacity classes.
     """
     # 1. Load Data
-    m_img, f_img, m_sbs, f_sbs = loader.load_images(index, main_folder, float_folder)
+    m_img, f_img, m_sbs, f_sbs = loader.load_images(index, main_folder, float_folder, raw)
 
     # 2. Check for ASCII Data
     if isinstance(m_img, dict):
@@ -184,8 +406,15 @@ def load_and_render_frame(loader, index, main_folder, float_folder, source_aspec
             print(f"ASCII Render Error: {e}")
             return None, None, False, False
 
-    # 3. Standard Image Return
-    return m_img, f_img, m_sbs, f_sbs
+    # 3. Standard Image Return (source paths key the composite cache, classes let the renderers skip work)
+    paths = loader.load_paths(index, main_folder, float_folder)
+    return m_img, f_img, m_sbs, f_sbs, paths, loader.classify_layers(paths, (m_img, f_img), (m_sbs, f_sbs))
+
+
+def prestart_decode_workers():
+    """Fork the process decode backend's workers; call before starting any thread."""
+    if DECODE_BACKEND == "process":
+        process_loader.prestart_workers(DECODE_PROCESSES, TRANSCODE_CACHE_DIR, TRANSCODE_CACHE_MB * 1024 * 1024)
 
 
 # -----------------------------------------------------------------------------
@@ -198,9 +427,7 @@ def run_display(clock_source=CLOCK_MODE):
     state.fullscreen = FULLSCREEN_MODE
     last_actual_fps = 0.0  # Initialize to 0, will be calculated from actual frame times
 
-    capture_rate = SERVER_CAPTURE_RATE
-    capture_interval = 1.0 / capture_rate
-    last_server_capture = time.time()
+    capture_gate = CaptureGate(SERVER_CAPTURE_RATE, settings.IPS)
     last_captured_index = None
 
     # Monitor Counters
@@ -333,11 +560,64 @@ def run_display(clock_source=CLOCK_MODE):
     
     update_folder_selection(index, float_folder_count, main_folder_count)
 
-    loader = ImageLoader()
+    use_processes = DECODE_BACKEND == "process"
+    if use_processes and not ProcessImageLoader.supported():
+        print("[DISPLAY] Process decode backend needs Linux fork(); falling back to threads")
+        use_processes = False
+
+    # FIFO_LENGTH = 0 leaves the FIFO bounded by FIFO_MAX_MB alone
+    fifo_length = max(0, FIFO_LENGTH)
+    if not fifo_length and (FIFO_MAX_MB <= 0 or use_processes):
+        # Nothing else bounds it / shared-memory slots are allocated per buffered frame
+        fifo_length = 30
+        print(f"[DISPLAY] FIFO_LENGTH = 0 needs FIFO_MAX_MB and the thread backend; using {fifo_length}")
+
+    if use_processes:
+        # Each FIFO entry, in-flight load and on-screen frame pins two slots (main + float)
+        in_flight = max(min(8, (os.cpu_count() or 1) + 2), PREFETCH_WINDOW)
+        loader = ProcessImageLoader(
+            processes=DECODE_PROCESSES,
+            slot_count=2 * (fifo_length + in_flight + 2),
+            pingpong=PINGPONG,
+            transcode_dir=TRANSCODE_CACHE_DIR,
+            transcode_bytes=TRANSCODE_CACHE_MB * 1024 * 1024,
+        )
+    else:
+        loader = ImageLoader(
+            frame_cache_bytes=FRAME_CACHE_MB * 1024 * 1024,
+            pingpong=PINGPONG,
+            buffer_pool=DECODE_POOL_MAX_FREE if DECODE_BUFFER_POOL else 0,
+            transcode_dir=TRANSCODE_CACHE_DIR,
+            transcode_bytes=TRANSCODE_CACHE_MB * 1024 * 1024,
+            layer_threads=(LAYER_DECODE_THREADS or os.cpu_count() or 1) if LAYER_PARALLEL_DECODE else 0,
+            sparse_float=SPARSE_FLOAT_MAX_AREA,
+        )
     loader.set_paths(main_folder_path, float_folder_path)
     loader.set_png_paths_len(png_paths_len)
-
-    fifo = FIFOImageBufferPatched(max_size=FIFO_LENGTH)
+    loader.set_playhead(index)
+    if loader.frame_cache is not None:
+        print(f"[DISPLAY] Decoded-frame cache: {FRAME_CACHE_MB} MB")
+    if loader.transcode_cache is not None:
+        print(f"[DISPLAY] Transcode cache: {TRANSCODE_CACHE_DIR} ({TRANSCODE_CACHE_MB} MB)")
+    target_size, target_fit = decode_target(is_web, is_ascii)
+    if target_size is not None:
+        loader.set_target_size(target_size, target_fit)
+        print(f"[DISPLAY] Reduced-resolution decode: {target_size[0]}x{target_size[1]} ({target_fit})")
+    if use_processes:
+        loader.start(main_folder_path[0][0])
+        print(f"[DISPLAY] Process decode backend: {loader.processes} workers, {loader.slot_count} shared-memory slots")
+    readahead = None
+    if READAHEAD:
+        readahead = Readahead(loader, settings.IPS, READAHEAD_MIN_S, READAHEAD_MAX_S, pingpong=PINGPONG)
+        readahead.advance(index, 1, *folder_dictionary["Main_and_Float_Folders"])
+        print(f"[DISPLAY] Readahead: {READAHEAD_MIN_S}-{READAHEAD_MAX_S}s ahead")
+
+    # get() pins the frame it hands out under the FIFO lock, before update() can recycle it
+    fifo = FIFOImageBufferPatched(max_size=fifo_length, on_drop=loader.release_frame,
+                                  max_bytes=FIFO_MAX_MB * 1024 * 1024, on_get=loader.retain_frame,
+                                  length=png_paths_len, pingpong=PINGPONG)
+    if FIFO_MAX_MB > 0:
+        print(f"[DISPLAY] FIFO: {fifo_length or 'unlimited'} frames / {FIFO_MAX_MB} MB")
 
     # Pre-load using the NEW helper directly for the first frame
     initial_folders = folder_dictionary["Main_and_Float_Folders"]
@@ -345,6 +625,15 @@ def run_display(clock_source=CLOCK_MODE):
     fifo.update(index, res0)
 
     cur_main, cur_float, cur_m_sbs, cur_f_sbs = None, None, False, False
+    cur_source = None
+    cur_classes = (None, None)  # Opacity classes of (cur_main, cur_float)
+
+    # Composited output is only reusable without GL: the GL path draws with live rotation/mirror state
+    composite_cache = None
+    if COMPOSITE_CACHE_MB > 0 and is_headless and not has_gl:
+        composite_cache = CompositeCache(COMPOSITE_CACHE_MB * 1024 * 1024)
+        cached_kind = "JPEG" if is_web and COMPOSITE_CACHE_JPEG else "frames"
+        print(f"[DISPLAY] Composite cache: {COMPOSITE_CACHE_MB} MB ({cached_kind})")
 
     main_texture = None
     float_texture = None
@@ -355,11 +644,23 @@ def run_display(clock_source=CLOCK_MODE):
 
     compensator = RollingIndexCompensator()
 
-    def async_cb(fut, idx):
-        try:
-            fifo.update(idx, fut.result())
-        except Exception as e:
-            if monitor: monitor.record_load_error(idx, e)
+    last_stats_publish = 0.0
+
+    def publish_stats():
+        nonlocal last_stats_publish
+        now_m = time.monotonic()
+        if now_m - last_stats_publish < STATS_INTERVAL:
+            return
+        last_stats_publish = now_m
+        if sizer is not None:
+            sizer.tick(now_m)
+        stats = pipeline_stats(loader, pool, prefetcher, sizer, fifo, pacer, composite_cache,
+                               renderer.output_ring if is_headless and not has_gl else None)
+        if stats:
+            monitor.record_stats(stats)
+
+    def load_error(idx, e):
+        if monitor: monitor.record_load_error(idx, e)
 
     # 5. Thread Pool for I/O-bound work
     # Optimize worker count for I/O-bound image loading
@@ -368,17 +669,67 @@ def run_display(clock_source=CLOCK_MODE):
     # Conservative formula that works well across all devices
     # Reverted from aggressive tiered scaling to universal formula
     max_workers = min(8, cpu_count + 2)
-
-    with ThreadPoolExecutor(max_workers=max_workers) as pool:
-        next_idx = 1 if index == 0 else (index - 1 if index == png_paths_len - 1 else index + 1)
-        # Use the NEW worker function
-        folders = folder_dictionary["Main_and_Float_Folders"]
-        future = pool.submit(load_and_render_frame, loader, next_idx, *folders, source_aspect_ratio=source_aspect_ratio)
-        future.add_done_callback(lambda f, i=next_idx: async_cb(f, i))
+    # Start there and let the sizer move it on the thread backend; process slots are
+    # sized for a fixed number of loads in flight
+    autosize = WORKER_AUTOSIZE and not use_processes
+    start_workers = LOAD_DECODE_THREADS or max_workers
+    ceiling = max(start_workers, WORKER_MAX or min(16, 2 * cpu_count + 2)) if autosize else start_workers
+
+    if LOAD_PIPELINE and not use_processes:
+        # Separate read and decode stages; same submit() call shape as the executor
+        pool = LoadPipeline(io_threads=LOAD_IO_THREADS, decode_threads=start_workers,
+                            queue_depth=LOAD_DECODE_QUEUE, max_decode_threads=ceiling)
+        print(f"[DISPLAY] Load pipeline: {LOAD_IO_THREADS} I/O / {start_workers} decode threads")
+    else:
+        pool = DeadlinePool(max_workers=ceiling, workers=start_workers)
+    sizer = None
+
+    with pool:
+        # Keep the next few indices buffered or in flight, not just the neighbouring one
+        folder_schedule = None
+        if PREFETCH_FOLDER_LOOKAHEAD and not index_calculator.midi_mode:
+            def folder_schedule(indices):
+                return project_folder_selection(indices, float_folder_count, main_folder_count)
+        prefetcher = PrefetchScheduler(
+            pool, loader, fifo, load_and_render_frame, png_paths_len,
+            window=min(PREFETCH_WINDOW, fifo_length or PREFETCH_WINDOW), pingpong=PINGPONG,
+            # Deadlines only mean something when the free clock drives the index
+            ips=None if index_calculator.midi_mode else settings.IPS,
+            folder_schedule=folder_schedule,
+            on_error=load_error, source_aspect_ratio=source_aspect_ratio,
+        )
+        prefetcher.advance(index, 1, folder_dictionary["Main_and_Float_Folders"])
+        if autosize:
+            sizer = WorkerSizer(pool, WORKER_MIN, ceiling, interval_s=WORKER_SIZING_INTERVAL_S,
+                                cpu_high=WORKER_CPU_HIGH, prefetcher=prefetcher)
+            print(f"[DISPLAY] Adaptive loader workers: {sizer.workers} ({sizer.min_workers}-{sizer.max_workers})")
 
         frame_times = deque(maxlen=60)
         frame_start = time.perf_counter()
-        
+        pacer = None
+        if FPS:
+            # Frame k at launch + k/FPS on the index clock's grid, not "sleep what's left"
+            anchor = index_calculator.launch_time if PACER_ALIGN_TO_CLOCK and not index_calculator.midi_mode else None
+            pacer = FramePacer(FPS, spin_ns=int(PACER_SPIN_MS * 1_000_000), anchor_ns=anchor)
+        # Headless output only changes with the index, so sleep from one index change to the next
+        event_driven = HEADLESS_EVENT_LOOP and is_headless and not index_calculator.midi_mode
+        if event_driven:
+            print(f"[DISPLAY] Event-driven headless loop: waking on index changes ({settings.IPS} IPS)")
+
+        def wait_next_frame():
+            if not event_driven:
+                if pacer is not None:
+                    pacer.wait()
+                return
+            after_ns = time.time_ns()
+            if not isinstance(cur_main, str):
+                # Composited output: index changes before the next capture slot show nothing
+                after_ns = max(after_ns, capture_gate.next_slot_ns())
+            wake_ns = index_calculator.next_index_change_ns(png_paths_len, PINGPONG, after_ns)
+            delay = (wake_ns - time.time_ns()) / 1_000_000_000
+            if delay > 0:
+                time.sleep(min(delay, 1.0))  # Re-check at least once a second
+
         # Counter for periodic mouse hiding (every 60 frames ~= 2 seconds at 30fps)
         cursor_hide_counter = 0
         
@@ -402,20 +753,37 @@ def run_display(clock_source=CLOCK_MODE):
             index, _ = update_index(png_paths_len, PINGPONG)
 
             if index != prev:
+                loader.set_playhead(index, index - prev)
+                if is_ascii and target_size is not None:
+                    # ASCII grid can be resized live from the monitor page
+                    new_target = decode_target(is_web, is_ascii)
+                    if new_target != (target_size, target_fit):
+                        target_size, target_fit = new_target
+                        loader.set_target_size(target_size, target_fit)
+                        if composite_cache is not None:
+                            composite_cache.clear()  # Entries at the old decode size can't be hit again
                 update_folder_selection(index, float_folder_count, main_folder_count)
+                if readahead is not None:
+                    readahead.advance(index, index - prev, *folder_dictionary["Main_and_Float_Folders"])
+                prefetcher.advance(index, index - prev, folder_dictionary["Main_and_Float_Folders"])
 
                 comp_idx = compensator.get_compensated_index(index)
-                res = fifo.get(comp_idx)
+                res = fifo.get(comp_idx)  # Already retained by the FIFO's on_get
 
                 if res:
-                    d_idx, m_img, f_img, m_sbs, f_sbs = res
+                    d_idx, m_img, f_img, m_sbs, f_sbs = res[:5]
                     compensator.update(index, d_idx)
 
+                    # The new frame's pooled buffers are held while on screen; let go of the old ones
+                    loader.release_frame((cur_main, cur_float))
+
                     # Update loop pointers
                     cur_main = m_img
                     cur_float = f_img
                     cur_m_sbs = m_sbs
                     cur_f_sbs = f_sbs
+                    cur_source = res[5] if len(res) > 5 else None
+                    cur_classes = res[6] if len(res) > 6 else (None, None)
 
                     # --- [OPTIMIZED] PRE-BAKED ASCII PATH ---
                     # Check if the worker thread already returned a String
@@ -431,21 +799,12 @@ def run_display(clock_source=CLOCK_MODE):
                         successful_display = True
                         last_displayed_index = d_idx
 
-                        # Trigger Next Load
-                        next_idx = 1 if index == 0 else (
-                            index - 1 if index == png_paths_len - 1 else (index + 1 if index > prev else index - 1))
-                        folders = folder_dictionary["Main_and_Float_Folders"]
-                        future = pool.submit(load_and_render_frame, loader, next_idx, *folders, source_aspect_ratio=source_aspect_ratio)
-                        future.add_done_callback(lambda f, i=next_idx: async_cb(f, i))
-
                         # Timing
                         now = time.perf_counter()
                         dt = now - frame_start
                         frame_times.append(dt)
                         frame_start = now
-                        if FPS:
-                            s = (1.0 / FPS) - dt
-                            if s > 0: time.sleep(s)
+                        wait_next_frame()
 
                         # Calculate FPS from frame times (handle both single and multiple frames)
                         if len(frame_times) >= 1:
@@ -473,45 +832,44 @@ def run_display(clock_source=CLOCK_MODE):
                                 "fifo_miss_count": fifo_miss_count,
                                 "last_fifo_miss": last_fifo_miss
                             })
+                            publish_stats()
 
                         continue
                     # ----------------------------------------
 
-                    # GL Texture Update (Only for non-string)
+                    # GL Texture Update (Only for non-string); layers the shader won't sample stay as they are
                     if has_gl:
-                        main_texture = renderer.update_texture(main_texture, m_img)
-                        float_texture = renderer.update_texture(float_texture, f_img)
+                        if renderer.main_visible(*cur_classes):
+                            main_texture = renderer.update_texture(main_texture, m_img)
+                        if cur_classes[1] != "transparent":
+                            float_texture = renderer.update_texture(float_texture, f_img)
 
                     successful_display = True
                     last_displayed_index = d_idx
                 else:
-                    if not is_headless: print(f"[MISS] {index}")
+                    cause = prefetcher.record_miss(comp_idx)
+                    if not is_headless: print(f"[MISS] {index} ({cause})")
                     fifo_miss_count += 1
                     last_fifo_miss = index
 
-                next_idx = 1 if index == 0 else (
-                    index - 1 if index == png_paths_len - 1 else (index + 1 if index > prev else index - 1))
-                folders = folder_dictionary["Main_and_Float_Folders"]
-                future = pool.submit(load_and_render_frame, loader, next_idx, *folders, source_aspect_ratio=source_aspect_ratio)
-                future.add_done_callback(lambda f, i=next_idx: async_cb(f, i))
-
-            # Render (GL)
-            if has_gl:
-                if is_headless: window.use()
-                renderer.overlay_images_single_pass(
-                    main_texture, float_texture, BACKGROUND_COLOR,
-                    main_is_sbs=cur_m_sbs, float_is_sbs=cur_f_sbs
-                )
-
             # Capture (Only for Images/Headless Web)
             should_capture = False
             if is_headless or not has_gl:
-                now = time.time()
-                if (index != last_captured_index) and (now - last_server_capture > capture_interval):
+                if (index != last_captured_index) and capture_gate.ready():
                     should_capture = True
-                    last_server_capture = now
+                    capture_gate.mark()
                     last_captured_index = index
 
+            # Render (GL); headless only renders what it is about to capture
+            if has_gl and (not is_headless or should_capture):
+                if is_headless: window.use()
+                renderer.overlay_images_single_pass(
+                    main_texture, float_texture, BACKGROUND_COLOR,
+                    main_is_sbs=cur_m_sbs, float_is_sbs=cur_f_sbs,
+                    float_rect=renderer.float_uv_rect(cur_float, cur_classes[1]),
+                    main_visible=renderer.main_visible(*cur_classes)
+                )
+
             if should_capture:
                 # If m_img is a string, we already handled it.
                 if isinstance(cur_main, str):
@@ -521,6 +879,7 @@ def run_display(clock_source=CLOCK_MODE):
                 elif cur_main is not None:
                     try:
                         frame = None
+                        cache_key = None
                         if has_gl:
                             # Only HeadlessWindow has .fbo and .size attributes
                             # In windowed mode, window is a raw glfw object without these attributes
@@ -544,19 +903,39 @@ def run_display(clock_source=CLOCK_MODE):
                                 tgt_size = HEADLESS_RES
                             else:
                                 tgt_size = None  # Local mode: full resolution
-                            
-                            frame = renderer.composite_cpu(
-                                cur_main, cur_float,
-                                main_is_sbs=cur_m_sbs, float_is_sbs=cur_f_sbs,
-                                target_size=tgt_size
-                            )
+
+                            if composite_cache is not None and cur_source is not None:
+                                # Layer shapes pin the decode size: FIFO frames decoded before an ASCII resize differ
+                                decoded = (getattr(cur_main, 'shape', None), getattr(cur_float, 'shape', None))
+                                cache_key = (cur_source, cur_m_sbs, cur_f_sbs, tgt_size, decoded)
+                                if is_web and COMPOSITE_CACHE_JPEG:
+                                    cache_key += (("jpeg", JPEG_QUALITY),)
+                                frame = composite_cache.get(cache_key)
+
+                            if isinstance(frame, bytes):
+                                # Cached JPEG: skip both the composite and the encode
+                                exchange_web.set_frame(frame)
+                                exchange.set_frame(frame)  # Legacy compatibility
+                                frame = None
+                            elif frame is None:
+                                frame = renderer.composite_cpu(
+                                    cur_main, cur_float,
+                                    main_is_sbs=cur_m_sbs, float_is_sbs=cur_f_sbs,
+                                    target_size=tgt_size,
+                                    main_class=cur_classes[0], float_class=cur_classes[1]
+                                )
+                                if cache_key is not None and not (is_web and COMPOSITE_CACHE_JPEG):
+                                    if composite_cache.put(cache_key, frame):
+                                        renderer.detach_output(frame)  # The cache owns it now
 
                         if frame is not None:
                             if is_web:
                                 # Web only: use web exchange (and legacy for backward compat)
-                                enc = jpeg.encode(frame, quality=JPEG_QUALITY, pixel_format=TJPF_RGB)
-                                exchange_web.set_frame(b'j' + enc)
-                                exchange.set_frame(b'j' + enc)  # Legacy compatibility
+                                enc = b'j' + jpeg.encode(frame, quality=JPEG_QUALITY, pixel_format=TJPF_RGB)
+                                if cache_key is not None and COMPOSITE_CACHE_JPEG:
+                                    composite_cache.put(cache_key, enc)
+                                exchange_web.set_frame(enc)
+                                exchange.set_frame(enc)  # Legacy compatibility
                             elif is_ascii:
                                 text_frame = ascii_converter.to_ascii(frame)
                                 exchange_ascii.set_frame(text_frame)
@@ -564,6 +943,9 @@ def run_display(clock_source=CLOCK_MODE):
 
                     except Exception as e:
                         print(f"[CAPTURE ERROR] {e}")
+                    finally:
+                        # Encoded/converted (or failed): the output buffer goes back to the ring
+                        renderer.release_output(frame)
 
             if not is_headless and has_gl and glfw:
                 glfw.swap_buffers(window)
@@ -590,9 +972,7 @@ def run_display(clock_source=CLOCK_MODE):
             dt = now - frame_start
             frame_times.append(dt)
             frame_start = now
-            if FPS:
-                s = (1.0 / FPS) - dt
-                if s > 0: time.sleep(s)
+            wait_next_frame()
 
             # Calculate FPS from frame times (handle both single and multiple frames)
             if len(frame_times) >= 1:
@@ -621,10 +1001,15 @@ def run_display(clock_source=CLOCK_MODE):
                     "fifo_miss_count": fifo_miss_count,
                     "last_fifo_miss": last_fifo_miss
                 })
+                publish_stats()
 
             if not is_headless and has_gl and glfw and glfw.window_should_close(window):
                 state.run_mode = False
 
+        if readahead is not None:
+            readahead.close()
+        loader.close()
+
         if not is_headless and has_gl and glfw:
             glfw.terminate()
         if is_headless and has_gl and window is not None and hasattr(window, "close"):
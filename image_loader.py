@@ -1,24 +1,518 @@
+import io
 import threading
-from collections import deque
+import weakref
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import ctypes
+import math
 import numpy as np
 import os
-from settings import MAIN_FOLDER_PATH, FLOAT_FOLDER_PATH, TOLERANCE
+from settings import MAIN_FOLDER_PATH, FLOAT_FOLDER_PATH, TOLERANCE, SLAB_FILE_NAME, SLAB_FRAME_SEP, \
+    SLAB_BBOX_FILE_NAME
 
 from turbojpeg import TJPF_RGB
 from turbojpeg_loader import get_turbojpeg
 
 jpeg = get_turbojpeg()
 
-from libwebp_loader import init_libwebp
+from libwebp_loader import init_libwebp, decode_rgba_into
 
 _libwebp = init_libwebp(verbose=False)
 
+# Formats that cost real CPU to decode. Memmapped .spy/.npy are already
+# served by the page cache, so caching them would only double-count RAM.
+_CACHEABLE_EXTS = ("webp", "jpg", "jpeg", "spz", "npz")
+
+# Formats whose file bytes can be read ahead of decoding (see ImageLoader.read_raw).
+_RAW_EXTS = ("webp", "jpg", "jpeg", "spz", "npz")
+
+# List entries of the form "<folder>/frames.npy#<frame>" address one frame of a baked slab.
+_SLAB_MARKER = SLAB_FILE_NAME + SLAB_FRAME_SEP
+
+
+def _payload_nbytes(img):
+    """Byte size of a decoded payload (array or ASCII dict)."""
+    if isinstance(img, dict):
+        return sum(v.nbytes for v in img.values() if hasattr(v, 'nbytes'))
+    return getattr(img, 'nbytes', 0)
+
+
+def _c_bytes(data):
+    """ctypes view of a bytes-like object for libwebp's char* arguments (no copy)."""
+    if isinstance(data, bytes):
+        return data
+    return (ctypes.c_char * len(data)).from_buffer(data)
+
+
+def _freeze(img):
+    """Mark cached arrays read-only so a consumer can't scribble on a shared frame."""
+    arrays = img.values() if isinstance(img, dict) else (img,)
+    for arr in arrays:
+        if isinstance(arr, np.ndarray):
+            arr.flags.writeable = False
+
+
+def alpha_bbox(alpha):
+    """(y0, y1, x0, x1) bounding box of non-zero alpha; (0, 0, 0, 0) for a fully transparent layer."""
+    rows = np.flatnonzero(alpha.any(axis=1))
+    if rows.size == 0:
+        return 0, 0, 0, 0
+    y0, y1 = int(rows[0]), int(rows[-1]) + 1
+    cols = np.flatnonzero(alpha[y0:y1].any(axis=0))
+    return y0, y1, int(cols[0]), int(cols[-1]) + 1
+
+
+LAYER_CLASSES = ("opaque", "transparent", "mixed")
+
+
+def layer_alpha(img, is_sbs):
+    """Alpha plane of a decoded layer (mask half for SBS), or None when it has none (fully opaque)."""
+    if is_sbs:
+        return img[:, img.shape[1] // 2:, 0]
+    if img.ndim == 3 and img.shape[2] == 4:
+        return img[..., 3]
+    return None
+
+
+def opacity_class(alpha):
+    """'opaque', 'transparent' or 'mixed' for an alpha plane (None = no alpha channel)."""
+    if alpha is None:
+        return "opaque"
+    if alpha.size == 0 or not alpha.any():
+        return "transparent"
+    if alpha.min() == 255:
+        return "opaque"
+    return "mixed"
+
+
+class LayerTile(np.ndarray):
+    """
+    RGBA float layer cropped to its alpha bounding box. `tile_origin` is the
+    tile's (y, x) inside the full layer and `frame_size` that layer's (h, w);
+    everything outside the tile is fully transparent. The renderer blends and
+    uploads only the tile.
+    """
+
+    def __array_finalize__(self, obj):
+        self.tile_origin = getattr(obj, 'tile_origin', (0, 0))
+        self.frame_size = getattr(obj, 'frame_size', None)
+
+
+class DecodedFrameCache:
+    """
+    Byte-budgeted cache of decoded frames, keyed by file path.
+
+    Eviction is playhead-aware rather than LRU: the victim is the entry the
+    playhead will take longest to reach again, following the current travel
+    direction and the ping-pong turnaround. Frames just behind the playhead
+    near a turnaround are therefore kept, since they come back almost at once.
+    """
+
+    def __init__(self, max_bytes, png_paths_len=0, pingpong=True):
+        self.max_bytes = int(max_bytes)
+        self.png_paths_len = png_paths_len
+        self.pingpong = pingpong
+        self._entries = {}  # path -> (index, img, is_sbs, nbytes)
+        self._bytes = 0
+        self._playhead = 0
+        self._direction = 1
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejected = 0  # Frames not admitted because everything cached was needed sooner
+
+    def set_playhead(self, index, direction=None):
+        with self._lock:
+            self._playhead = index
+            if direction:
+                self._direction = 1 if direction > 0 else -1
+
+    def _steps_until(self, index):
+        """Number of ticks before the playhead reaches `index` (caller holds lock)."""
+        n = self.png_paths_len
+        if index is None or n <= 0:
+            return float('inf')
+        if self.pingpong and n > 1:
+            # One period visits 0..N-1 then N-1..0; map index/direction onto that cycle.
+            period = 2 * n
+            pos = self._playhead if self._direction > 0 else (period - 1) - self._playhead
+            return min((index - pos) % period, ((period - 1) - index - pos) % period)
+        return (index - self._playhead) % n
+
+    def __contains__(self, path):
+        with self._lock:
+            return path in self._entries
+
+    def get(self, path):
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, path, index, img, is_sbs):
+        """Store `img`; returns True only if the cache now owns that array."""
+        nbytes = _payload_nbytes(img)
+        if nbytes <= 0 or nbytes > self.max_bytes:
+            return False
+        with self._lock:
+            if path in self._entries:
+                return False  # A concurrent load already cached this path; `img` stays the caller's
+            if self._bytes + nbytes > self.max_bytes:
+                needed_in = self._steps_until(index)
+                victims = sorted(self._entries.items(), key=lambda kv: self._steps_until(kv[1][0]), reverse=True)
+                freed, evict = 0, []
+                for vpath, ventry in victims:
+                    if self._bytes - freed + nbytes <= self.max_bytes:
+                        break
+                    if self._steps_until(ventry[0]) <= needed_in:
+                        break
+                    evict.append(vpath)
+                    freed += ventry[3]
+                if self._bytes - freed + nbytes > self.max_bytes:
+                    self.rejected += 1
+                    return False
+                for vpath in evict:
+                    del self._entries[vpath]
+                self._bytes -= freed
+                self.evictions += len(evict)
+            _freeze(img)
+            self._entries[path] = (index, img, is_sbs, nbytes)
+            self._bytes += nbytes
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self):
+        """Get cache statistics (thread-safe)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'rejected': self.rejected,
+                'hit_rate': self.hits / max(1, lookups),
+            }
+
+
+class ReadBufferPool:
+    """
+    Reusable bytearrays for raw file reads, so the I/O stage doesn't allocate
+    a fresh bytes object per file. Capacities are rounded up to 64 KiB so
+    files of slightly different sizes share buffers.
+    """
+
+    _ROUND = 64 * 1024
+
+    def __init__(self, max_free=8):
+        self.max_free = max_free
+        self._free = []
+        self._lock = threading.Lock()
+        self.allocations = 0
+        self.reuses = 0
+
+    def acquire(self, size):
+        with self._lock:
+            best = None
+            for i, buf in enumerate(self._free):
+                if len(buf) >= size and (best is None or len(buf) < len(self._free[best])):
+                    best = i
+            if best is not None:
+                self.reuses += 1
+                return self._free.pop(best)
+            self.allocations += 1
+        return bytearray(-(-max(size, 1) // self._ROUND) * self._ROUND)
+
+    def release(self, buf):
+        with self._lock:
+            if len(self._free) < self.max_free:
+                self._free.append(buf)
+            else:
+                # Keep the largest buffers; a small one can't serve a big file
+                smallest = min(range(len(self._free)), key=lambda i: len(self._free[i]))
+                if len(self._free[smallest]) < len(buf):
+                    self._free[smallest] = buf
+
+    def get_stats(self):
+        """Get pool statistics (thread-safe)."""
+        with self._lock:
+            return {
+                'allocations': self.allocations,
+                'reuses': self.reuses,
+                'free': len(self._free),
+                'free_bytes': sum(len(b) for b in self._free),
+            }
+
+
+class DecodeBufferPool:
+    """
+    Size-keyed pool of reusable uint8 output arrays for the WebP/JPEG decoders.
+
+    Ownership is reference counted: a decoded array starts owned by its FIFO
+    entry (count 1), the display loop retains it while it is on screen, and each
+    owner calls release() when done. At zero the array goes back to the free
+    list for its shape. Arrays are tracked through weak references, so a frame
+    that is dropped without release() is simply garbage collected, never leaked.
+    """
+
+    def __init__(self, max_free_per_shape=8):
+        self.max_free_per_shape = max_free_per_shape
+        self._free = {}  # shape -> list of arrays
+        self._owned = {}  # id(arr) -> [weakref, refcount]
+        # Re-entrant: a weakref callback can fire from GC while this thread holds the lock.
+        self._lock = threading.RLock()
+        self.allocations = 0
+        self.reuses = 0
+        self.recycled = 0
+
+    def acquire(self, shape):
+        shape = tuple(shape)
+        with self._lock:
+            free = self._free.get(shape)
+            if free:
+                arr = free.pop()
+                self.reuses += 1
+            else:
+                arr = None
+                self.allocations += 1
+        if arr is None:
+            arr = np.empty(shape, dtype=np.uint8)
+        key = id(arr)
+        with self._lock:
+            self._owned[key] = [weakref.ref(arr, lambda _r, k=key: self._forget(k, _r)), 1]
+        return arr
+
+    def _forget(self, key, ref):
+        with self._lock:
+            entry = self._owned.get(key)
+            if entry is not None and entry[0] is ref:
+                del self._owned[key]
+
+    def _entry(self, arr):
+        """Tracking entry for `arr`, or None if the pool doesn't own it (caller holds lock)."""
+        if not isinstance(arr, np.ndarray):
+            return None
+        entry = self._owned.get(id(arr))
+        if entry is None or entry[0]() is not arr:
+            return None
+        return entry
+
+    def retain(self, arr):
+        with self._lock:
+            entry = self._entry(arr)
+            if entry is not None:
+                entry[1] += 1
+
+    def release(self, arr):
+        with self._lock:
+            entry = self._entry(arr)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del self._owned[id(arr)]
+            free = self._free.setdefault(arr.shape, [])
+            if len(free) < self.max_free_per_shape:
+                free.append(arr)
+                self.recycled += 1
+
+    def owns(self, arr):
+        with self._lock:
+            return self._entry(arr) is not None
+
+    def detach(self, arr):
+        """Stop tracking `arr`; it now belongs to someone else (e.g. the frame cache) for good."""
+        with self._lock:
+            if self._entry(arr) is not None:
+                del self._owned[id(arr)]
+
+    def get_stats(self):
+        """Get pool statistics (thread-safe)."""
+        with self._lock:
+            return {
+                'allocations': self.allocations,
+                'reuses': self.reuses,
+                'recycled': self.recycled,
+                'outstanding': len(self._owned),
+                'free': sum(len(v) for v in self._free.values()),
+                'free_bytes': sum(a.nbytes for v in self._free.values() for a in v),
+            }
+
+
+class TranscodeCache:
+    """
+    Persistent on-disk cache of compressed .spz/.npz frames re-saved as raw .npy,
+    so every read after the first is a memmap instead of a zlib inflate.
+
+    Entries are named from the source path, mtime and size, so an edited source
+    simply stops matching; stale files age out under the disk budget, oldest first.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_bytes)
+        self._files = OrderedDict()  # file name -> size, oldest use first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".spy"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name, st.st_size))
+        for _, name, size in sorted(entries):
+            self._files[name] = size
+            self._bytes += size
+        with self._lock:
+            self._prune(0)
+
+    @staticmethod
+    def _name(path):
+        st = os.stat(path)
+        key = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}"
+        return hashlib.sha1(key.encode("utf-8")).hexdigest() + ".spy"
+
+    def _prune(self, incoming):
+        """Delete least recently used files until `incoming` more bytes fit (caller holds lock)."""
+        while self._files and self._bytes + incoming > self.max_bytes:
+            name, size = self._files.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+
+    def lookup(self, path):
+        name = self._name(path)
+        with self._lock:
+            known = name in self._files
+            if known:
+                self._files.move_to_end(name)
+        if known:
+            try:
+                img = np.load(os.path.join(self.cache_dir, name), mmap_mode='r')
+                with self._lock:
+                    self.hits += 1
+                return img
+            except (OSError, ValueError):
+                with self._lock:
+                    self._bytes -= self._files.pop(name, 0)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def cached_file(self, path):
+        """On-disk raw file currently standing in for `path`, or None (doesn't touch counters)."""
+        try:
+            name = self._name(path)
+        except OSError:
+            return None
+        with self._lock:
+            known = name in self._files
+        return os.path.join(self.cache_dir, name) if known else None
+
+    def store(self, path, img):
+        name = self._name(path)
+        size = img.nbytes + 128  # .npy header
+        if size > self.max_bytes:
+            return
+        final = os.path.join(self.cache_dir, name)
+        tmp = f"{final}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._lock:
+            if name in self._files:
+                return
+            self._prune(size)
+        try:
+            with open(tmp, "wb") as f:
+                np.save(f, np.ascontiguousarray(img))
+            os.replace(tmp, final)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            if name not in self._files:
+                self._files[name] = size
+                self._bytes += size
+                self.writes += 1
+
+    def get_stats(self):
+        """Get cache statistics (thread-safe)."""
+        with self._lock:
+            return {
+                'files': len(self._files),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'writes': self.writes,
+                'evictions': self.evictions,
+            }
+
+
 class ImageLoader:
-    def __init__(self, main_folder_path=MAIN_FOLDER_PATH, float_folder_path=FLOAT_FOLDER_PATH, png_paths_len=0):
+    def __init__(self, main_folder_path=MAIN_FOLDER_PATH, float_folder_path=FLOAT_FOLDER_PATH, png_paths_len=0,
+                 frame_cache_bytes=0, pingpong=True, buffer_pool=0, transcode_dir=None, transcode_bytes=0,
+                 layer_threads=0, sparse_float=0.0):
         self.main_folder_path = main_folder_path
         self.float_folder_path = float_folder_path
         self.png_paths_len = png_paths_len
+        self.frame_cache = None
+        if frame_cache_bytes and frame_cache_bytes > 0:
+            self.frame_cache = DecodedFrameCache(frame_cache_bytes, png_paths_len, pingpong)
+        self.buffer_pool = DecodeBufferPool(buffer_pool) if buffer_pool else None
+        self.readahead = None  # Set by readahead.Readahead to observe which reads it warmed
+        self.read_buffers = ReadBufferPool()
+        self.transcode_cache = None
+        if transcode_dir and transcode_bytes and transcode_bytes > 0:
+            self.transcode_cache = TranscodeCache(transcode_dir, transcode_bytes)
+        self.target_size = None
+        self.target_fit = "contain"
+        self._slabs = {}  # slab path -> read-only memmap, opened once per run
+        self._slab_lock = threading.Lock()
+        # Float layers decode here while the calling worker decodes the main layer
+        self._layer_pool = None
+        if layer_threads and layer_threads > 0:
+            self._layer_pool = ThreadPoolExecutor(max_workers=layer_threads, thread_name_prefix="load-layer")
+        self._layer_lock = threading.Lock()
+        self.parallel_layers = 0  # Frames whose two layers decoded concurrently
+        self.shared_layers = 0  # Frames whose main and float were the same file, decoded once
+        # RGBA float layers whose alpha bbox covers at most this fraction of the frame become LayerTiles
+        self.sparse_float = sparse_float
+        self._float_boxes = {}  # float path -> ((h, w), bbox), guarded by _layer_lock
+        self._slab_boxes = {}  # slab path -> (frames, 4) bbox array or None, guarded by _slab_lock
+        self.float_tiles = 0
+        self.float_tile_area = 0.0  # Sum of tile area / frame area
+        # Opacity class per path, so repeat frames skip the alpha scan
+        self._opacity = {}  # path -> ((h, w), class), guarded by _layer_lock
+        self.opacity_counts = {(role, c): 0 for role in ("main", "float") for c in LAYER_CLASSES}
+        self.opacity_scans = 0
 
     def set_paths(self, main_folder_path, float_folder_path):
         self.main_folder_path = main_folder_path
@@ -26,23 +520,269 @@ class ImageLoader:
 
     def set_png_paths_len(self, value):
         self.png_paths_len = value
+        if self.frame_cache is not None:
+            self.frame_cache.png_paths_len = value
+
+    def set_playhead(self, index, direction=None):
+        """Tell the frame cache where playback is so eviction can favour upcoming frames."""
+        if self.frame_cache is not None:
+            self.frame_cache.set_playhead(index, direction)
 
-    def _read_webp(self, image_path):
+    def set_target_size(self, size, fit="contain"):
+        """
+        Decode WebP/JPEG layers only as large as a `size` (w, h) output needs.
+        fit="contain" matches letterboxed output (web), fit="cover" matches crop-to-fill
+        (ASCII). None restores full-resolution decoding.
+        """
+        size = tuple(size) if size else None
+        if size == self.target_size and fit == self.target_fit:
+            return
+        self.target_size = size
+        self.target_fit = fit
+        if self.frame_cache is not None:
+            self.frame_cache.clear()  # Cached frames were decoded for the old target
+
+    def _decode_scale(self, w, h):
+        """Smallest scale (<= 1) at which a w x h layer still fills the output target."""
+        target = self.target_size
+        if target is None or w <= 0 or h <= 0:
+            return 1.0
+        sx, sy = target[0] / w, target[1] / h
+        scale = max(sx, sy) if self.target_fit == "cover" else min(sx, sy)
+        return min(1.0, scale)
+
+    @staticmethod
+    def _snap_scale(scale):
+        """
+        Round a decode scale up to the next eighth, the grid TurboJPEG's DCT
+        scaling factors sit on, so WebP and JPEG layers of the same source size
+        decode to the same size (ceil(w * k / 8), as TJSCALED computes it).
+        """
+        return min(1.0, math.ceil(scale * 8 - 1e-9) / 8)
+
+    @staticmethod
+    def _jpeg_scaling_factor(scale):
+        """Smallest TurboJPEG DCT scaling factor that is still >= scale, or None for 1/1."""
+        best = None
+        for num, den in jpeg.scaling_factors:
+            f = num / den
+            if scale <= f <= 1.0 and (best is None or f < best[0] / best[1]):
+                best = (num, den)
+        if best is None or best[0] == best[1]:
+            return None
+        return best
+
+    def _alloc(self, shape):
+        if self.buffer_pool is None:
+            return np.empty(shape, dtype=np.uint8)
+        return self.buffer_pool.acquire(shape)
+
+    def retain_frame(self, data_tuple):
+        """Take an extra reference on a frame's pooled arrays (e.g. while it is on screen)."""
+        if self.buffer_pool is None or not data_tuple:
+            return
+        self.buffer_pool.retain(data_tuple[0])
+        self.buffer_pool.retain(data_tuple[1])
+
+    def release_frame(self, data_tuple):
+        """Drop a reference on a frame's pooled arrays; no-op for anything the pool didn't hand out."""
+        if self.buffer_pool is None or not data_tuple:
+            return
+        self.buffer_pool.release(data_tuple[0])
+        self.buffer_pool.release(data_tuple[1])
+
+    def _read_webp(self, image_path, data=None):
         if _libwebp is None: raise RuntimeError("libwebp not loaded.")
-        with open(image_path, "rb") as f:
-            data = f.read()
+        if data is None:
+            with open(image_path, "rb") as f:
+                data = f.read()
+        data = _c_bytes(data)
         w, h = ctypes.c_int(), ctypes.c_int()
         if not _libwebp.WebPGetInfo(data, len(data), ctypes.byref(w), ctypes.byref(h)):
             raise ValueError(f"Invalid WebP: {image_path}")
-        img = np.empty((h.value, w.value, 4), dtype=np.uint8)
-        if not _libwebp.WebPDecodeRGBAInto(data, len(data), img.ctypes.data_as(ctypes.POINTER(ctypes.c_uint8)),
-                                           h.value * w.value * 4, w.value * 4):
+        scale = 1.0
+        if getattr(_libwebp, 'has_scaled_decode', False):
+            scale = self._snap_scale(self._decode_scale(w.value, h.value))
+        if scale < 1.0:
+            # Scaled decode: libwebp resamples while decoding, straight to the size we need
+            img = self._alloc((math.ceil(h.value * scale), math.ceil(w.value * scale), 4))
+            ok = decode_rgba_into(_libwebp, data, img)
+        else:
+            img = self._alloc((h.value, w.value, 4))
+            ok = _libwebp.WebPDecodeRGBAInto(data, len(data), img.ctypes.data_as(ctypes.POINTER(ctypes.c_uint8)),
+                                             h.value * w.value * 4, w.value * 4)
+        if not ok:
+            if self.buffer_pool is not None:
+                self.buffer_pool.release(img)
             raise RuntimeError(f"Decode failed: {image_path}")
         return img, False
 
-    def read_image(self, image_path):
+    def _get_slab(self, slab_path):
+        slab = self._slabs.get(slab_path)
+        if slab is None:
+            with self._slab_lock:
+                slab = self._slabs.get(slab_path)
+                if slab is None:
+                    slab = np.load(slab_path, mmap_mode='r')
+                    self._slabs[slab_path] = slab
+        return slab
+
+    def _slab_bbox(self, image_path):
+        """Baked alpha bbox of a slab frame (bake_assets.py sidecar), or None."""
+        slab_path, _, frame = image_path.rpartition(SLAB_FRAME_SEP)
+        with self._slab_lock:
+            if slab_path not in self._slab_boxes:
+                sidecar = slab_path[:-len(SLAB_FILE_NAME)] + SLAB_BBOX_FILE_NAME
+                try:
+                    boxes = np.load(sidecar)
+                except (OSError, ValueError):
+                    boxes = None
+                self._slab_boxes[slab_path] = boxes
+            boxes = self._slab_boxes[slab_path]
+        frame = int(frame)
+        if boxes is None or boxes.ndim != 2 or frame >= len(boxes):
+            return None
+        return tuple(int(v) for v in boxes[frame])
+
+    def _float_tile(self, path, img):
+        """
+        Crop a mostly transparent RGBA float layer to its alpha bounding box
+        (plus one transparent pixel, so GL filtering at the edge reads real
+        data). The box comes from the slab sidecar or is computed on first
+        decode and kept per path.
+        """
+        if not self.sparse_float or not isinstance(img, np.ndarray) or img.ndim != 3 or img.shape[2] != 4:
+            return img
+        h, w = img.shape[:2]
+        with self._layer_lock:
+            known = self._float_boxes.get(path)
+        if known is not None and known[0] == (h, w):
+            box = known[1]
+        else:
+            box = self._slab_bbox(path) if _SLAB_MARKER in path else None
+            if box is None:
+                box = alpha_bbox(img[..., 3])
+            with self._layer_lock:
+                self._float_boxes[path] = ((h, w), box)
+        y0, y1, x0, x1 = box
+        if (y1 - y0) * (x1 - x0) > self.sparse_float * h * w:
+            return img
+        if y1 > y0:
+            y0, y1, x0, x1 = max(0, y0 - 1), min(h, y1 + 1), max(0, x0 - 1), min(w, x1 + 1)
+        tile = img[y0:y1, x0:x1]
+        if self.buffer_pool is not None and self.buffer_pool.owns(img):
+            # Keep the small tile, recycle the full decode buffer now
+            tile = tile.copy()
+            self.buffer_pool.release(img)
+        tile = tile.view(LayerTile)
+        tile.tile_origin = (y0, x0)
+        tile.frame_size = (h, w)
+        with self._layer_lock:
+            self.float_tiles += 1
+            self.float_tile_area += (y1 - y0) * (x1 - x0) / (h * w)
+        return tile
+
+    def _read_float(self, image_path, index=None, data=None):
+        img, is_sbs = self.read_image(image_path, index, data)
+        return self._float_tile(image_path, img), is_sbs
+
+    def _read_slab_frame(self, image_path):
+        """Resolve "<folder>/frames.npy#<frame>" to a zero-copy view of that frame."""
+        slab_path, _, frame = image_path.rpartition(SLAB_FRAME_SEP)
+        return self._get_slab(slab_path)[int(frame)], False
+
+    def file_range(self, image_path):
+        """
+        (file, offset, length) a read of `image_path` will touch, for readahead.
+        length 0 means the whole file.
+        """
+        if _SLAB_MARKER in image_path:
+            slab_path, _, frame = image_path.rpartition(SLAB_FRAME_SEP)
+            slab = self._get_slab(slab_path)
+            frame_bytes = slab[0].nbytes
+            return slab_path, slab.offset + int(frame) * frame_bytes, frame_bytes
+        if self.transcode_cache is not None:
+            raw = self.transcode_cache.cached_file(image_path)
+            if raw is not None:
+                return raw, 0, 0
+        return image_path, 0, 0
+
+    def read_raw(self, image_path):
+        """
+        I/O half of read_image(): the file's bytes as a memoryview over a pooled
+        buffer, or None when the decode wouldn't use them (memmapped formats,
+        frames already in the RAM or transcode cache). Pass the view to
+        read_image(data=...) and hand it back with release_raw() afterwards.
+        """
+        if self.readahead is not None:
+            self.readahead.note_read(image_path)
+        if _SLAB_MARKER in image_path:
+            return None
+        ext = image_path.split('.')[-1].lower()
+        if ext not in _RAW_EXTS:
+            return None
+        if self.frame_cache is not None and image_path in self.frame_cache:
+            return None
+        if self.transcode_cache is not None and ext in ("spz", "npz") and self.transcode_cache.cached_file(image_path):
+            return None
+        with open(image_path, "rb", buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            buf = self.read_buffers.acquire(size)
+            view = memoryview(buf)
+            n = 0
+            while n < size:
+                got = f.readinto(view[n:size])
+                if not got:
+                    break
+                n += got
+        return view[:n]
+
+    def release_raw(self, data):
+        if data is not None:
+            self.read_buffers.release(data.obj)
+
+    def read_image(self, image_path, index=None, data=None):
+        cache = self.frame_cache
+        if cache is None:
+            return self._decode(image_path, data=data)
+
+        ext = image_path.split('.')[-1].lower()
+        if ext not in _CACHEABLE_EXTS:
+            return self._decode(image_path, data=data)
+
+        cached = cache.get(image_path)
+        if cached is not None:
+            return cached
+        img, is_sbs = self._decode(image_path, data=data)
+        if isinstance(img, np.memmap):
+            return img, is_sbs  # Served from the transcode cache; the page cache already has it
+        if cache.put(image_path, index, img, is_sbs) and self.buffer_pool is not None:
+            # The cache keeps this array for good; it must never be recycled under it.
+            self.buffer_pool.detach(img)
+        return img, is_sbs
+
+    def _read_transcoded(self, image_path, data=None):
+        """spz/npz via the raw transcode cache: memmap on a hit, inflate-and-store on a miss."""
+        raw = self.transcode_cache.lookup(image_path)
+        if raw is not None:
+            return raw, False
+        img, is_sbs = self._decode(image_path, transcode=False, data=data)
+        if isinstance(img, np.ndarray):  # Legacy ASCII dicts stay compressed
+            self.transcode_cache.store(image_path, img)
+        return img, is_sbs
+
+    def _decode(self, image_path, transcode=True, data=None):
+        if _SLAB_MARKER in image_path:
+            return self._read_slab_frame(image_path)
+
         ext = image_path.split('.')[-1].lower()
 
+        if transcode and self.transcode_cache is not None and ext in ("spz", "npz"):
+            return self._read_transcoded(image_path, data)
+
+        # Bytes already read by the I/O stage stand in for the file
+        source = image_path if data is None else io.BytesIO(data)
+
         # --- [INSERTED] Hybrid Asset Support ---
         if ext == "spy":
             # Raw Memory Map (Fastest)
@@ -50,10 +790,10 @@ class ImageLoader:
 
         if ext == "spz":
             # Compressed Archive
-            with np.load(image_path) as data:
+            with np.load(source) as archive:
                 # Key is 'image' from our baker, or fallback 'arr_0'
-                key = 'image' if 'image' in data else 'arr_0'
-                return data[key], False
+                key = 'image' if 'image' in archive else 'arr_0'
+                return archive[key], False
 
         if ext == "npy":
             # ASCII Stack
@@ -66,95 +806,392 @@ class ImageLoader:
         # --- NPZ PATH (Smart Handling: Headless vs Legacy) ---
         if ext == "npz":
             # We must load the archive to check keys
-            with np.load(image_path) as data:
+            with np.load(source) as archive:
                 # 1. HEADLESS IMAGE? (Look for 'image' key)
-                if 'image' in data:
-                    return data['image'], False
+                if 'image' in archive:
+                    return archive['image'], False
 
                 # 2. LEGACY ASCII? (Look for 'chars' and 'colors')
-                elif 'chars' in data and 'colors' in data:
-                    return {'chars': data['chars'], 'colors': data['colors']}, False
+                elif 'chars' in archive and 'colors' in archive:
+                    return {'chars': archive['chars'], 'colors': archive['colors']}, False
 
                 # 3. GENERIC FALLBACK
                 else:
                     # Just grab the first array found (usually 'arr_0')
-                    key = data.files[0]
-                    return data[key], False
+                    key = archive.files[0]
+                    return archive[key], False
 
         # --- STANDARD IMAGES ---
-        if ext == "webp": return self._read_webp(image_path)
+        if ext == "webp": return self._read_webp(image_path, data)
         if ext in ("jpg", "jpeg"):
             # TurboJPEG decode: TJPF_RGB is fastest format, decode happens in worker thread
             # This is optimal - no unnecessary copies, uses native library
-            with open(image_path, "rb") as f: data = f.read()
+            if data is None:
+                with open(image_path, "rb") as f: data = f.read()
+            dst = None
             try:
-                return jpeg.decode(data, pixel_format=TJPF_RGB), True
+                factor = None
+                if self.buffer_pool is not None or self.target_size is not None:
+                    w, h, _, _ = jpeg.decode_header(data)
+                    # JPEGs are SBS (colour | mask), so size against the visible half
+                    factor = self._jpeg_scaling_factor(self._decode_scale(w // 2, h))
+                    if factor is not None:
+                        num, den = factor
+                        w, h = (w * num + den - 1) // den, (h * num + den - 1) // den
+                    if self.buffer_pool is not None:
+                        dst = self.buffer_pool.acquire((h, w, 3))
+                return jpeg.decode(data, pixel_format=TJPF_RGB, scaling_factor=factor, dst=dst), True
             except Exception as e:
+                if dst is not None:
+                    self.buffer_pool.release(dst)
                 print(f"[JPEG ERROR] Failed to decode: {image_path}")
                 print(f"  Error: {e}")
                 raise  # Re-raise to maintain existing error handling
 
         raise ValueError(f"Unsupported: {image_path}")
 
-    def load_images(self, index, main_folder, float_folder):
-        mpath = self.main_folder_path[index][main_folder]
-        fpath = self.float_folder_path[index][float_folder]
-        main_img, main_sbs = self.read_image(mpath)
-        float_img, float_sbs = self.read_image(fpath)
+    def close(self):
+        """Drop open slab memmaps and stop the layer threads. Subclasses with workers shut them down here."""
+        with self._slab_lock:
+            self._slabs.clear()
+        if self._layer_pool is not None:
+            self._layer_pool.shutdown(wait=True)
+
+    def get_layer_stats(self):
+        """Counts of frames decoded with both layers in parallel or once for a shared path, and float tiles."""
+        with self._layer_lock:
+            return {
+                'parallel': self.parallel_layers,
+                'shared': self.shared_layers,
+                'tiles': self.float_tiles,
+                'tile_area': self.float_tile_area / self.float_tiles if self.float_tiles else 0.0,
+            }
+
+    def classify_layers(self, paths, images, sbs_flags):
+        """
+        (main, float) opacity classes of a decoded frame, each "opaque",
+        "transparent", "mixed" or None (ASCII data), cached per path. A float
+        LayerTile is classified from the tile; outside it is transparent anyway.
+        """
+        classes = []
+        for role, path, img, is_sbs in zip(("main", "float"), paths, images, sbs_flags):
+            if not isinstance(img, np.ndarray):
+                classes.append(None)
+                continue
+            shape = img.shape[:2]
+            with self._layer_lock:
+                known = self._opacity.get(path)
+            if known is not None and known[0] == shape:
+                cls = known[1]
+            else:
+                cls = opacity_class(layer_alpha(img, is_sbs))
+                if cls == "opaque" and isinstance(img, LayerTile):
+                    cls = "mixed"  # Covers only part of the frame
+                with self._layer_lock:
+                    self._opacity[path] = (shape, cls)
+                    self.opacity_scans += 1
+            with self._layer_lock:
+                self.opacity_counts[role, cls] += 1
+            classes.append(cls)
+        return tuple(classes)
+
+    def get_opacity_stats(self):
+        """Frames per (role, opacity class) and how many alpha scans the per-path cache didn't save."""
+        with self._layer_lock:
+            stats = {role: {c: self.opacity_counts[role, c] for c in LAYER_CLASSES} for role in ("main", "float")}
+            stats['scans'] = self.opacity_scans
+            return stats
+
+    def load_paths(self, index, main_folder, float_folder):
+        return self.main_folder_path[index][main_folder], self.float_folder_path[index][float_folder]
+
+    def load_images(self, index, main_folder, float_folder, raw=None):
+        """
+        Decode both layers of a frame. `raw` is an optional (main, float) pair of
+        read_raw() results already fetched by the I/O stage.
+        """
+        mpath, fpath = self.load_paths(index, main_folder, float_folder)
+        if raw is None:
+            raw = (None, None)
+            if self.readahead is not None:
+                self.readahead.note_read(mpath)
+                if fpath != mpath:
+                    self.readahead.note_read(fpath)
+        if fpath == mpath:
+            # One decode serves both layers; the extra reference is the float layer's
+            img, is_sbs = self.read_image(mpath, index, raw[0])
+            if self.buffer_pool is not None:
+                self.buffer_pool.retain(img)
+            with self._layer_lock:
+                self.shared_layers += 1
+            return img, img, is_sbs, is_sbs
+        if self._layer_pool is not None:
+            return self._load_layers_parallel(mpath, fpath, index, raw)
+        main_img, main_sbs = self.read_image(mpath, index, raw[0])
+        try:
+            float_img, float_sbs = self._read_float(fpath, index, raw[1])
+        except Exception:
+            if self.buffer_pool is not None:
+                self.buffer_pool.release(main_img)
+            raise
         return main_img, float_img, main_sbs, float_sbs
 
+    def _load_layers_parallel(self, mpath, fpath, index, raw):
+        """Float layer on the layer pool, main layer on this thread, joined into one frame."""
+        float_job = self._layer_pool.submit(self._read_float, fpath, index, raw[1])
+        try:
+            main_img, main_sbs = self.read_image(mpath, index, raw[0])
+        except Exception:
+            try:
+                float_img, _ = float_job.result()
+            except Exception:
+                pass
+            else:
+                if self.buffer_pool is not None:
+                    self.buffer_pool.release(float_img)
+            raise
+        try:
+            float_img, float_sbs = float_job.result()
+        except Exception:
+            if self.buffer_pool is not None:
+                self.buffer_pool.release(main_img)
+            raise
+        with self._layer_lock:
+            self.parallel_layers += 1
+        return main_img, float_img, main_sbs, float_sbs
+
+
+def _array_nbytes(arr):
+    """Heap bytes behind an array; memmapped frames live in the page cache and count as 0."""
+    base = arr
+    while isinstance(base, np.ndarray):
+        if isinstance(base, np.memmap):
+            return 0
+        base = base.base
+    return arr.nbytes
+
+
+def frame_nbytes(data_tuple):
+    """Bytes held by a (main, float, ...) frame: arrays, ASCII dicts or pre-rendered strings."""
+    total = 0
+    seen = set()
+    for layer in data_tuple[:2]:
+        if id(layer) in seen:
+            continue  # Shared main/float layer
+        seen.add(id(layer))
+        if isinstance(layer, np.ndarray):
+            total += _array_nbytes(layer)
+        elif isinstance(layer, dict):
+            total += sum(_array_nbytes(v) for v in layer.values() if isinstance(v, np.ndarray))
+        elif isinstance(layer, (str, bytes)):
+            total += len(layer)
+    return total
+
 
 class FIFOImageBuffer:
-    def __init__(self, max_size=5):
-        self.queue = deque()
+    """
+    Decoded frames keyed by index, so the display loop's lookup is a dict probe
+    (plus at most TOLERANCE probes either side) instead of a scan.
+
+    get() also tracks the playhead and its travel direction (ping-pong flips
+    included). Frames the playhead has left more than TOLERANCE behind are
+    dropped as stale, and when the buffer is full the entry farthest from the
+    playhead goes first: passed frames, then the farthest ahead.
+
+    "Full" is max_size entries and/or max_bytes of frame data (0 = no limit on
+    that axis), so one setting can't OOM a small board with 4K frames and also
+    starve it of ASCII ones. The newest entry is always kept, even over budget.
+
+    on_get is called under the lock with the entry get() hands out, so the
+    caller can pin its buffers before a concurrent update() evicts it and
+    on_drop recycles them.
+
+    With pingpong=False and the loop `length` known, distances are taken
+    modulo the loop: the N-1 -> 0 wrap is a forward step, and frames
+    prefetched for the next loop are ahead of the playhead, not behind it.
+    """
+
+    def __init__(self, max_size=5, on_drop=None, max_bytes=0, on_get=None, length=0, pingpong=True):
+        self.entries = {}  # index -> data tuple, in insertion order
+        self.sizes = {}  # index -> bytes the entry holds
         self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.budget_drops = 0  # Evictions forced by max_bytes rather than max_size
+        self.on_drop = on_drop  # Called with an entry's data tuple once the buffer lets go of it
+        self.on_get = on_get  # Called (under the lock) with the data tuple get() returns
         self.lock = threading.Lock()
+        self.playhead = None
+        self.direction = 1
+        self.length = length if not pingpong and length > 1 else 0  # Loop length when indices wrap
         self.dropped_count = 0  # Track dropped frames due to backpressure
+        self.stale_count = 0  # Frames dropped because the playhead passed them
         self.total_updates = 0  # Track total update attempts
 
     def is_full(self):
         """Check if buffer is at capacity (thread-safe)."""
         with self.lock:
-            return len(self.queue) >= self.max_size
+            return ((self.max_size and len(self.entries) >= self.max_size)
+                    or (self.max_bytes and self.bytes >= self.max_bytes))
+
+    def current_bytes(self):
+        """Get bytes held by buffered frames (thread-safe)."""
+        with self.lock:
+            return self.bytes
+
+    def _pop(self, index):
+        self.bytes -= self.sizes.pop(index)
+        return self.entries.pop(index)
+
+    def _over(self):
+        if len(self.entries) <= 1:
+            return None
+        if self.max_size and len(self.entries) > self.max_size:
+            return "count"
+        if self.max_bytes and self.bytes > self.max_bytes:
+            return "bytes"
+        return None
 
     def current_depth(self):
         """Get current buffer depth (thread-safe)."""
         with self.lock:
-            return len(self.queue)
+            return len(self.entries)
+
+    def __contains__(self, index):
+        with self.lock:
+            return index in self.entries
+
+    def is_behind(self, index):
+        """True if the playhead has left `index` more than TOLERANCE behind (thread-safe)."""
+        with self.lock:
+            return self._behind(index)
+
+    def _step(self, frm, to):
+        """Signed index distance frm -> to; the shorter way round when looping."""
+        if not self.length:
+            return to - frm
+        n = self.length
+        return (to - frm + n // 2) % n - n // 2
+
+    def _wrap(self, index):
+        return index % self.length if self.length else index
+
+    def _behind(self, index):
+        return self.playhead is not None and self._step(self.playhead, index) * self.direction < -TOLERANCE
+
+    def _victim(self):
+        """Index to evict: oldest insert until a playhead is known, else farthest from it."""
+        if self.playhead is None:
+            return next(iter(self.entries))
+
+        def score(idx):
+            d = self._step(self.playhead, idx) * self.direction
+            return (1, -d) if d < -TOLERANCE else (0, abs(d))
+
+        return max(self.entries, key=score)
 
     def update(self, index, data_tuple):
         """
         Update buffer with new frame data.
-        Implements backpressure: drops oldest frame if buffer is full.
-        Returns True if frame was added, False if dropped due to backpressure.
+        Implements backpressure: when full, the frame farthest from the playhead
+        is dropped (possibly the incoming one).
+        Returns True if frame was added, False if dropped.
         """
+        released = []
         with self.lock:
             self.total_updates += 1
-            dropped = False
-            if len(self.queue) >= self.max_size:
-                self.queue.popleft()
-                self.dropped_count += 1
-                dropped = True
-            self.queue.append((index, data_tuple))
-            return not dropped
+            if self._behind(index):
+                # Arrived after the playhead moved on
+                self.stale_count += 1
+                released.append(data_tuple)
+                added = False
+            else:
+                if index in self.entries:
+                    released.append(self._pop(index))
+                self.entries[index] = data_tuple
+                self.sizes[index] = size = frame_nbytes(data_tuple)
+                self.bytes += size
+                added = True
+                reason = self._over()
+                while added and reason:
+                    victim = self._victim()
+                    released.append(self._pop(victim))
+                    self.dropped_count += 1
+                    if reason == "bytes":
+                        self.budget_drops += 1
+                    added = victim != index
+                    reason = self._over()
+        if self.on_drop:
+            for data in released:
+                self.on_drop(data)
+        return added
 
     def get(self, current_index):
+        stale = []
+        try:
+            return self._get(current_index, stale)
+        finally:
+            if self.on_drop:
+                for data in stale:
+                    self.on_drop(data)
+
+    def _move_playhead(self, current_index, stale):
+        prev, prev_dir = self.playhead, self.direction
+        step = self._step(prev, current_index) if prev is not None else 0
+        if step:
+            self.direction = 1 if step > 0 else -1
+        self.playhead = current_index
+        if not self.entries:
+            return
+        d = self.direction
+        if prev is not None and d == prev_dir and abs(step) < len(self.entries):
+            # Only indices the playhead just moved past can have become stale
+            lo = prev - d * TOLERANCE
+            candidates = [self._wrap(lo + d * k) for k in range(abs(step))]
+        else:
+            # First call, direction flip or long jump: check everything once
+            candidates = list(self.entries)
+        for idx in candidates:
+            if idx in self.entries and self._behind(idx):
+                stale.append(self._pop(idx))
+                self.stale_count += 1
+
+    def _get(self, current_index, stale):
         with self.lock:
-            while self.queue and abs(self.queue[0][0] - current_index) > TOLERANCE:
-                self.queue.popleft()
-            if not self.queue: return None
-            best_idx, best_data = min(self.queue, key=lambda item: abs(item[0] - current_index))
-            if abs(best_idx - current_index) <= TOLERANCE:
-                return best_idx, best_data[0], best_data[1], best_data[2], best_data[3]
-            return None
+            self._move_playhead(current_index, stale)
+            entries = self.entries
+            if not entries:
+                return None
+            data = entries.get(current_index)
+            best_idx = current_index
+            if data is None:
+                # Nearest neighbour within TOLERANCE, preferring the side we're heading to
+                d = self.direction
+                for off in range(1, TOLERANCE + 1):
+                    for idx in (self._wrap(current_index + d * off), self._wrap(current_index - d * off)):
+                        data = entries.get(idx)
+                        if data is not None:
+                            best_idx = idx
+                            break
+                    if data is not None:
+                        break
+                else:
+                    return None
+            if self.on_get:
+                self.on_get(data)
+            return (best_idx,) + tuple(data)
 
     def get_stats(self):
         """Get buffer statistics (thread-safe)."""
         with self.lock:
             return {
-                'depth': len(self.queue),
+                'depth': len(self.entries),
                 'max_size': self.max_size,
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'budget_drops': self.budget_drops,
                 'dropped_count': self.dropped_count,
+                'stale_count': self.stale_count,
                 'total_updates': self.total_updates,
                 'drop_rate': self.dropped_count / max(1, self.total_updates)
             }
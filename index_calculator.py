@@ -72,22 +72,38 @@ def calculate_free_clock_index(total_images, pingpong=True):
     elapsed_ns = current_time_ns - launch_time
     # Calculate index using integer math: (elapsed_ns * IPS) // 1_000_000_000
     raw_index = (elapsed_ns * IPS) // 1_000_000_000
+    index = _free_clock_position(raw_index, total_images, pingpong)
 
+    control_data_dictionary['Index_and_Direction'] = (index, None)
+    return index, None
+
+def _free_clock_position(raw_index, total_images, pingpong=True):
+    """Map a raw tick count to the displayed index (see calculate_free_clock_index)."""
     if pingpong and total_images > 1:
         period    = 2 * total_images
         mod_index = raw_index % period
 
         if mod_index < total_images:
             # forward ramp: 0 → N-1
-            index = mod_index
-        else:
-            # mirrored ramp with double‑pivot at both ends
-            index = (period - 1) - mod_index
-    else:
-        index = raw_index % total_images if total_images > 0 else 0
+            return mod_index
+        # mirrored ramp with double‑pivot at both ends
+        return (period - 1) - mod_index
+    return raw_index % total_images if total_images > 0 else 0
 
-    control_data_dictionary['Index_and_Direction'] = (index, None)
-    return index, None
+def next_index_change_ns(total_images, pingpong=True, after_ns=None):
+    """
+    Wall-clock time (time.time_ns()) at which the free-clock index next changes,
+    strictly after `after_ns` (default: now). The repeated index at a ping-pong
+    pivot is not a change, so that tick is stepped over.
+    """
+    after_ns = time.time_ns() if after_ns is None else after_ns
+    raw_index = ((after_ns - launch_time) * IPS) // 1_000_000_000
+    current = _free_clock_position(raw_index, total_images, pingpong)
+    tick = raw_index + 1
+    if total_images > 1 and _free_clock_position(tick, total_images, pingpong) == current:
+        tick += 1
+    # First nanosecond at which the raw index reaches `tick`
+    return launch_time + int(-(-(tick * 1_000_000_000) // IPS))
 
 def calculate_midi_clock_index(frame_counter, png_paths_len_param=None, frame_duration_param=None):
     """
@@ -13,11 +13,94 @@ Usage from another module (e.g. image_loader.py):
         raise RuntimeError("libwebp not loaded.")
 
     # _libwebp is now ready with WebPGetInfo / WebPDecodeRGBAInto signatures set.
+
+Scaled decoding (WebPDecoderConfig / WebPDecode) is wrapped by decode_rgba_into(),
+which decodes straight into a caller-provided RGBA array at that array's size.
 """
 
 import ctypes
 from ctypes.util import find_library
 
+# --- WebPDecoderConfig ABI (src/webp/decode.h) ---
+WEBP_DECODER_ABI_VERSION = 0x0209
+MODE_RGBA = 1
+VP8_STATUS_OK = 0
+
+_u8_p = ctypes.POINTER(ctypes.c_uint8)
+
+
+class WebPBitstreamFeatures(ctypes.Structure):
+    _fields_ = [
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("has_alpha", ctypes.c_int),
+        ("has_animation", ctypes.c_int),
+        ("format", ctypes.c_int),
+        ("pad", ctypes.c_uint32 * 5),
+    ]
+
+
+class WebPRGBABuffer(ctypes.Structure):
+    _fields_ = [
+        ("rgba", _u8_p),
+        ("stride", ctypes.c_int),
+        ("size", ctypes.c_size_t),
+    ]
+
+
+class WebPYUVABuffer(ctypes.Structure):
+    _fields_ = [
+        ("y", _u8_p), ("u", _u8_p), ("v", _u8_p), ("a", _u8_p),
+        ("y_stride", ctypes.c_int), ("u_stride", ctypes.c_int),
+        ("v_stride", ctypes.c_int), ("a_stride", ctypes.c_int),
+        ("y_size", ctypes.c_size_t), ("u_size", ctypes.c_size_t),
+        ("v_size", ctypes.c_size_t), ("a_size", ctypes.c_size_t),
+    ]
+
+
+class _WebPDecBufferUnion(ctypes.Union):
+    _fields_ = [("RGBA", WebPRGBABuffer), ("YUVA", WebPYUVABuffer)]
+
+
+class WebPDecBuffer(ctypes.Structure):
+    _fields_ = [
+        ("colorspace", ctypes.c_int),
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("is_external_memory", ctypes.c_int),
+        ("u", _WebPDecBufferUnion),
+        ("pad", ctypes.c_uint32 * 4),
+        ("private_memory", _u8_p),
+    ]
+
+
+class WebPDecoderOptions(ctypes.Structure):
+    _fields_ = [
+        ("bypass_filtering", ctypes.c_int),
+        ("no_fancy_upsampling", ctypes.c_int),
+        ("use_cropping", ctypes.c_int),
+        ("crop_left", ctypes.c_int),
+        ("crop_top", ctypes.c_int),
+        ("crop_width", ctypes.c_int),
+        ("crop_height", ctypes.c_int),
+        ("use_scaling", ctypes.c_int),
+        ("scaled_width", ctypes.c_int),
+        ("scaled_height", ctypes.c_int),
+        ("use_threads", ctypes.c_int),
+        ("dithering_strength", ctypes.c_int),
+        ("flip", ctypes.c_int),
+        ("alpha_dithering_strength", ctypes.c_int),
+        ("pad", ctypes.c_uint32 * 5),
+    ]
+
+
+class WebPDecoderConfig(ctypes.Structure):
+    _fields_ = [
+        ("input", WebPBitstreamFeatures),
+        ("output", WebPDecBuffer),
+        ("options", WebPDecoderOptions),
+    ]
+
 
 def init_libwebp(verbose: bool = False):
     """
@@ -87,9 +170,51 @@ def init_libwebp(verbose: bool = False):
     ]
     libwebp.WebPDecodeRGBAInto.restype = ctypes.POINTER(ctypes.c_uint8)
 
+    # Advanced (scaling) API. Very old builds lack it; callers must decode at full size then.
+    try:
+        libwebp.WebPInitDecoderConfigInternal.argtypes = [ctypes.POINTER(WebPDecoderConfig), ctypes.c_int]
+        libwebp.WebPInitDecoderConfigInternal.restype = ctypes.c_int
+        libwebp.WebPDecode.argtypes = [ctypes.c_char_p, ctypes.c_size_t, ctypes.POINTER(WebPDecoderConfig)]
+        libwebp.WebPDecode.restype = ctypes.c_int
+        libwebp.WebPFreeDecBuffer.argtypes = [ctypes.POINTER(WebPDecBuffer)]
+        libwebp.WebPFreeDecBuffer.restype = None
+        libwebp.has_scaled_decode = True
+    except AttributeError:
+        libwebp.has_scaled_decode = False
+
     return libwebp
 
 
+def decode_rgba_into(libwebp, data: bytes, out) -> bool:
+    """
+    Decode WebP `data` as RGBA directly into `out`, an (H, W, 4) uint8 C-contiguous array.
+    When out's size differs from the bitstream's, libwebp scales during decode, so the
+    full-resolution image is never materialised. Returns True on success.
+
+    Requires libwebp.has_scaled_decode: WebPDecodeRGBAInto can't scale, so there is
+    no fallback, and callers should allocate the full bitstream size instead.
+    """
+    if not getattr(libwebp, "has_scaled_decode", False):
+        raise RuntimeError("libwebp build lacks WebPDecode; scaled decode unavailable")
+    out_h, out_w = out.shape[:2]
+    out_ptr = out.ctypes.data_as(_u8_p)
+
+    config = WebPDecoderConfig()
+    if not libwebp.WebPInitDecoderConfigInternal(ctypes.byref(config), WEBP_DECODER_ABI_VERSION):
+        return False
+    config.options.use_scaling = 1
+    config.options.scaled_width = out_w
+    config.options.scaled_height = out_h
+    config.output.colorspace = MODE_RGBA
+    config.output.is_external_memory = 1
+    config.output.u.RGBA.rgba = out_ptr
+    config.output.u.RGBA.stride = out_w * 4
+    config.output.u.RGBA.size = out.nbytes
+    status = libwebp.WebPDecode(data, len(data), ctypes.byref(config))
+    libwebp.WebPFreeDecBuffer(ctypes.byref(config.output))
+    return status == VP8_STATUS_OK
+
+
 # Optional: eager load at import time if you want a module-level constant.
 # Comment this out if you prefer fully lazy loading.
 LIBWEBP = init_libwebp(verbose=False)
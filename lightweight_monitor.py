@@ -382,6 +382,10 @@ class MonitorUpdater:
             'last_error': str(err)
         })
 
+    def record_stats(self, stats):
+        """Publish flat pipeline counters (cache, pool, scheduler...) straight to /data."""
+        monitor_data.update(stats)
+
     def update(self, payload):
         # ... (Identical update logic as previous versions) ...
         # Copied for completeness
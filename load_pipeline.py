@@ -0,0 +1,395 @@
+"""
+load_pipeline.py – Two-stage I/O then decode pipeline for frame loads.
+
+A plain thread pool runs the file read and the decode of a frame in the same
+task, so a slow SD read parks a decode worker and a slow decode parks I/O.
+Here a small pool of I/O threads reads both layers' bytes into reusable
+buffers (ImageLoader.read_raw) and hands the frame to a bounded queue; a
+separate pool of decode threads drains it. The bounded queue is the
+backpressure: when decode falls behind, I/O stops reading ahead.
+
+LoadPipeline.submit() has the same shape as ThreadPoolExecutor.submit() for
+load_and_render_frame(loader, index, main_folder, float_folder, ...), so the
+display loop can use either.
+
+Both LoadPipeline and DeadlinePool (the single-stage pool) also accept
+submit_with_deadline(): queued work is served earliest deadline first, and a
+task whose deadline (time.monotonic()) has passed before a worker gets to it
+is cancelled instead of run, so a clock jump doesn't leave the workers busy
+with frames nobody will show.
+
+The decode stage (and DeadlinePool's workers) start `max` threads but only let
+`active` of them take work; set_workers() moves that limit at runtime, which
+is how worker_sizing.WorkerSizer grows and shrinks the pool.
+"""
+import itertools
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class _DeadlineQueue:
+    """Priority queue of (deadline, item), earliest first; FIFO among equal deadlines."""
+
+    def __init__(self, maxsize=0):
+        self._queue = queue.PriorityQueue(maxsize=maxsize)
+        self._seq = itertools.count()
+
+    def put(self, deadline, item):
+        self._queue.put((math.inf if deadline is None else deadline, next(self._seq), item))
+
+    def get(self):
+        deadline, _, item = self._queue.get()
+        return deadline, item
+
+    def qsize(self):
+        return self._queue.qsize()
+
+
+def _stale(fut, deadline):
+    """
+    "cancelled" if the caller cancelled `fut`, "expired" (and cancels it) if its
+    deadline has passed, else None. Skipped futures are marked notified so
+    waiters wake up.
+    """
+    if fut.cancelled():
+        reason = "cancelled"
+    elif deadline < time.monotonic() and fut.cancel():
+        reason = "expired"
+    else:
+        return None
+    fut.set_running_or_notify_cancel()
+    return reason
+
+
+class _WorkerGate:
+    """Lets at most `limit` of a stage's threads hold a job; the rest park."""
+
+    def __init__(self, limit):
+        self._cond = threading.Condition()
+        self.limit = limit
+        self.active = 0
+
+    def enter(self):
+        with self._cond:
+            while self.active >= self.limit:
+                self._cond.wait()
+            self.active += 1
+
+    def leave(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def set_limit(self, limit):
+        with self._cond:
+            self.limit = limit
+            self._cond.notify_all()
+
+
+class _StageStats:
+    """Busy count, completed jobs and smoothed job time for one stage."""
+
+    def __init__(self, threads):
+        self.threads = threads
+        self.busy = 0
+        self.done = 0
+        self.errors = 0
+        self.avg_ms = 0.0
+
+
+class LoadPipeline:
+    def __init__(self, io_threads=2, decode_threads=4, queue_depth=4, max_decode_threads=None):
+        max_decode_threads = max(decode_threads, max_decode_threads or decode_threads)
+        self._io_queue = _DeadlineQueue()  # Fed by the prefetch scheduler
+        self._decode_queue = _DeadlineQueue(maxsize=max(1, queue_depth))
+        self.queue_depth = max(1, queue_depth)
+        self._lock = threading.Lock()
+        self._io = _StageStats(io_threads)
+        self._decode = _StageStats(decode_threads)
+        self._decode_gate = _WorkerGate(decode_threads)
+        self.bytes_read = 0
+        self.expired = 0  # Skipped because their deadline passed while queued
+        self.peak_io_queue = 0
+        self.peak_decode_queue = 0
+        self._io_workers = [threading.Thread(target=self._io_worker, name=f"load-io-{i}", daemon=True)
+                            for i in range(io_threads)]
+        self._decode_workers = [threading.Thread(target=self._decode_worker, name=f"load-decode-{i}", daemon=True)
+                                for i in range(max_decode_threads)]
+        for t in self._io_workers + self._decode_workers:
+            t.start()
+
+    def submit(self, fn, loader, index, main_folder, float_folder, **kwargs):
+        """Queue fn(loader, index, main_folder, float_folder, raw=..., **kwargs) behind a raw read."""
+        return self.submit_with_deadline(None, fn, loader, index, main_folder, float_folder, **kwargs)
+
+    def submit_with_deadline(self, deadline, fn, loader, index, main_folder, float_folder, **kwargs):
+        fut = Future()
+        self._io_queue.put(deadline, (fut, fn, loader, index, main_folder, float_folder, kwargs))
+        with self._lock:
+            self.peak_io_queue = max(self.peak_io_queue, self._io_queue.qsize())
+        return fut
+
+    def _finish(self, stage, t0, ok):
+        ms = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            stage.busy -= 1
+            if ok:
+                stage.done += 1
+                stage.avg_ms = ms if stage.done == 1 else stage.avg_ms * 0.9 + ms * 0.1
+            else:
+                stage.errors += 1
+
+    def _io_worker(self):
+        while True:
+            deadline, job = self._io_queue.get()
+            if job is None:
+                return
+            fut, fn, loader, index, main_folder, float_folder, kwargs = job
+            if self._skip(fut, deadline):
+                continue
+            with self._lock:
+                self._io.busy += 1
+            t0 = time.perf_counter()
+            mraw = None
+            try:
+                mpath, fpath = loader.load_paths(index, main_folder, float_folder)
+                mraw = loader.read_raw(mpath)
+                fraw = loader.read_raw(fpath) if fpath != mpath else None  # Shared layer decodes once
+            except BaseException as e:
+                self._finish(self._io, t0, False)
+                loader.release_raw(mraw)
+                if fut.set_running_or_notify_cancel():
+                    fut.set_exception(e)
+                continue
+            self._finish(self._io, t0, True)
+            raw = (mraw, fraw)
+            with self._lock:
+                self.bytes_read += sum(len(r) for r in raw if r is not None)
+            # Blocks while decode is behind
+            self._decode_queue.put(deadline, (fut, fn, loader, index, main_folder, float_folder, kwargs, raw))
+            with self._lock:
+                self.peak_decode_queue = max(self.peak_decode_queue, self._decode_queue.qsize())
+
+    def _skip(self, fut, deadline):
+        reason = _stale(fut, deadline)
+        if reason == "expired":
+            with self._lock:
+                self.expired += 1
+        return reason is not None
+
+    def set_workers(self, n):
+        """Change how many decode threads take work; returns the clamped count."""
+        n = max(1, min(len(self._decode_workers), int(n)))
+        with self._lock:
+            self._decode.threads = n
+        self._decode_gate.set_limit(n)
+        return n
+
+    def sizing_stats(self):
+        """The decode stage as seen by worker_sizing.WorkerSizer."""
+        with self._lock:
+            return {
+                'workers': self._decode.threads,
+                'max_workers': len(self._decode_workers),
+                'busy': self._decode.busy,
+                'queue': self._decode_queue.qsize(),
+                'done': self._decode.done,
+                'avg_ms': self._decode.avg_ms,
+            }
+
+    def _decode_worker(self):
+        while True:
+            self._decode_gate.enter()
+            try:
+                if not self._decode_job():
+                    return
+            finally:
+                self._decode_gate.leave()
+
+    def _decode_job(self):
+        """Take and run one decode job; False on the shutdown sentinel."""
+        deadline, job = self._decode_queue.get()
+        if job is None:
+            return False
+        fut, fn, loader, index, main_folder, float_folder, kwargs, raw = job
+        if self._skip(fut, deadline) or not fut.set_running_or_notify_cancel():
+            loader.release_raw(raw[0])
+            loader.release_raw(raw[1])
+            return True
+        with self._lock:
+            self._decode.busy += 1
+        t0 = time.perf_counter()
+        try:
+            result = fn(loader, index, main_folder, float_folder, raw=raw, **kwargs)
+        except BaseException as e:
+            self._finish(self._decode, t0, False)
+            fut.set_exception(e)
+        else:
+            self._finish(self._decode, t0, True)
+            fut.set_result(result)
+        finally:
+            loader.release_raw(raw[0])
+            loader.release_raw(raw[1])
+        return True
+
+    def get_stats(self):
+        """Get per-stage statistics (thread-safe)."""
+        with self._lock:
+            return {
+                'io_threads': self._io.threads,
+                'io_busy': self._io.busy,
+                'io_queue': self._io_queue.qsize(),
+                'io_queue_peak': self.peak_io_queue,
+                'io_done': self._io.done,
+                'io_errors': self._io.errors,
+                'io_avg_ms': self._io.avg_ms,
+                'decode_threads': self._decode.threads,
+                'decode_threads_max': len(self._decode_workers),
+                'decode_busy': self._decode.busy,
+                'decode_queue': self._decode_queue.qsize(),
+                'decode_queue_max': self.queue_depth,
+                'decode_queue_peak': self.peak_decode_queue,
+                'decode_done': self._decode.done,
+                'decode_errors': self._decode.errors,
+                'decode_avg_ms': self._decode.avg_ms,
+                'bytes_read': self.bytes_read,
+                'expired': self.expired,
+            }
+
+    def shutdown(self, wait=True):
+        """Finish queued loads, then stop both stages (I/O first, so decode drains what it read)."""
+        for _ in self._io_workers:
+            self._io_queue.put(None, None)
+        if not wait:
+            return
+        for t in self._io_workers:
+            t.join()
+        self._decode_gate.set_limit(len(self._decode_workers))  # Wake parked threads for their sentinel
+        for _ in self._decode_workers:
+            self._decode_queue.put(None, None)
+        for t in self._decode_workers:
+            t.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown(wait=True)
+        return False
+
+
+class DeadlinePool:
+    """
+    Single-stage thread pool with the same submit()/submit_with_deadline() API,
+    for when the two-stage pipeline is off (process backend, LOAD_PIPELINE=False).
+    """
+
+    def __init__(self, max_workers, workers=None):
+        self._queue = _DeadlineQueue()
+        self._lock = threading.Lock()
+        self.expired = 0
+        self.done = 0
+        self.busy = 0
+        self.avg_ms = 0.0
+        self.active = max(1, min(max_workers, workers or max_workers))
+        self._gate = _WorkerGate(self.active)
+        self._workers = [threading.Thread(target=self._worker, name=f"load-{i}", daemon=True)
+                         for i in range(max_workers)]
+        for t in self._workers:
+            t.start()
+
+    def submit(self, fn, *args, **kwargs):
+        return self.submit_with_deadline(None, fn, *args, **kwargs)
+
+    def submit_with_deadline(self, deadline, fn, *args, **kwargs):
+        fut = Future()
+        self._queue.put(deadline, (fut, fn, args, kwargs))
+        return fut
+
+    def _worker(self):
+        while True:
+            self._gate.enter()
+            try:
+                if not self._run_job():
+                    return
+            finally:
+                self._gate.leave()
+
+    def _run_job(self):
+        """Take and run one job; False on the shutdown sentinel."""
+        deadline, job = self._queue.get()
+        if job is None:
+            return False
+        fut, fn, args, kwargs = job
+        reason = _stale(fut, deadline)
+        if reason == "expired":
+            with self._lock:
+                self.expired += 1
+        if reason is not None or not fut.set_running_or_notify_cancel():
+            return True
+        with self._lock:
+            self.busy += 1
+        t0 = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            fut.set_exception(e)
+        else:
+            fut.set_result(result)
+        ms = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            self.busy -= 1
+            self.done += 1
+            self.avg_ms = ms if self.done == 1 else self.avg_ms * 0.9 + ms * 0.1
+        return True
+
+    def set_workers(self, n):
+        """Change how many threads take work; returns the clamped count."""
+        n = max(1, min(len(self._workers), int(n)))
+        with self._lock:
+            self.active = n
+        self._gate.set_limit(n)
+        return n
+
+    def sizing_stats(self):
+        """The pool as seen by worker_sizing.WorkerSizer."""
+        with self._lock:
+            return {
+                'workers': self.active,
+                'max_workers': len(self._workers),
+                'busy': self.busy,
+                'queue': self._queue.qsize(),
+                'done': self.done,
+                'avg_ms': self.avg_ms,
+            }
+
+    def get_stats(self):
+        """Get pool statistics (thread-safe)."""
+        with self._lock:
+            return {
+                'threads': self.active,
+                'threads_max': len(self._workers),
+                'busy': self.busy,
+                'queue': self._queue.qsize(),
+                'done': self.done,
+                'avg_ms': self.avg_ms,
+                'expired': self.expired,
+            }
+
+    def shutdown(self, wait=True):
+        self._gate.set_limit(len(self._workers))  # Wake parked threads for their sentinel
+        for _ in self._workers:
+            self._queue.put(None, None)
+        if wait:
+            for t in self._workers:
+                t.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown(wait=True)
+        return False
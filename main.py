@@ -332,6 +332,9 @@ def main(clock=CLOCK_MODE):
     else:
         print(f">> Skipping build. Reusing existing lists in: {settings.GENERATED_LISTS_DIR}")
 
+    # Decode worker processes are forked before any server thread exists
+    image_display.prestart_decode_workers()
+
     # 2. Launch Servers
     mode = cli_args.mode
 
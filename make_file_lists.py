@@ -27,6 +27,8 @@ import settings
 # Defaults. main.py overrides these in settings if needed.
 PROCESSED_DIR_NAME = getattr(settings, 'PROCESSED_DIR', "folders_processed")
 GENERATED_DIR_NAME = getattr(settings, 'GENERATED_LISTS_DIR', "generated_img_lists")
+SLAB_FILE_NAME = getattr(settings, 'SLAB_FILE_NAME', "frames.npy")
+SLAB_FRAME_SEP = getattr(settings, 'SLAB_FRAME_SEP', "#")
 
 
 # ------------------------------
@@ -41,6 +43,21 @@ def get_subdirectories(path):
     return subdirs
 
 
+def slab_shape(path):
+    """
+    Shape of the baked (frames, H, W, C) slab in `path`, or None if the folder isn't a slab.
+    Per-frame ASCII stacks are also .npy, so only a 4-D frames.npy counts.
+    """
+    slab_path = os.path.join(path, SLAB_FILE_NAME)
+    if not os.path.isfile(slab_path):
+        return None
+    try:
+        slab = np.load(slab_path, mmap_mode='r')
+    except (ValueError, OSError):
+        return None
+    return slab.shape if slab.ndim == 4 else None
+
+
 def contains_image_files(path):
     try:
         # [MODIFIED] Added new extensions
@@ -51,6 +68,9 @@ def contains_image_files(path):
 
 
 def count_image_files(path):
+    shape = slab_shape(path)
+    if shape is not None:
+        return int(shape[0])
     try:
         # [MODIFIED] Added new extensions
         valid = ('.png', '.webp', '.jpg', '.jpeg', '.npy', '.npz', '.spz', '.spy')
@@ -128,6 +148,13 @@ def scan_directory_recursive(base_path, script_dir, folder_type):
         if not contains_image_files(subdir):
             continue
 
+        # Baked slab: one memmap holds every frame
+        shape = slab_shape(subdir)
+        if shape is not None:
+            frames, height, width, channels = shape
+            results.append((subdir, SLAB_FILE_NAME, int(width), int(height), channels == 4, int(frames)))
+            continue
+
         # [MODIFIED] Added extensions to list comprehension
         valid = ('.png', '.webp', '.jpg', '.jpeg', '.npy', '.npz', '.spz', '.spy')
         image_files = [f for f in os.listdir(subdir) if f.lower().endswith(valid)]
@@ -324,6 +351,13 @@ def sort_image_files(folder_dict):
     for num in sorted(folder_dict.keys()):
         folder = folder_dict[num]
 
+        shape = slab_shape(folder)
+        if shape is not None:
+            # One virtual entry per slab frame: "<folder>/frames.npy#<frame>"
+            slab_path = os.path.join(folder, SLAB_FILE_NAME)
+            sorted_files.append([f"{slab_path}{SLAB_FRAME_SEP}{i}" for i in range(shape[0])])
+            continue
+
         # [MODIFIED] Added extensions
         valid = ('.png', '.webp', '.jpg', '.jpeg', '.npy', '.npz', '.spz', '.spy')
         imgs = [os.path.join(folder, x) for x in os.listdir(folder) if x.lower().endswith(valid)]
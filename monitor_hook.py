@@ -88,6 +88,9 @@ class DetailedFileMonitor:
         self.data['last_error'] = str(err)
         self.data['failed_load_count'] = self.data.get('failed_load_count', 0) + 1
 
+    def record_stats(self, stats):
+        self.data.update(stats)
+
     def update(self, payload):
         now = time.monotonic()
 
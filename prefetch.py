@@ -0,0 +1,179 @@
+"""
+prefetch.py – Lookahead prefetch scheduler for the display loop.
+
+Instead of one load per index change for the neighbouring frame, the scheduler
+keeps the next `window` indices (following the free clock, ping-pong pivots
+included) either buffered in the FIFO or in flight, so one slow decode doesn't
+turn into a miss and the FIFO rebuilds depth after a stall.
+
+Misses are attributed to a cause:
+  late          - the frame was requested but hadn't arrived (or arrived after the playhead passed it)
+  not_requested - the frame was never asked for (startup, folder switch, clock jump)
+  dropped       - the frame arrived but the FIFO evicted it
+
+With `ips` set, each request carries a deadline: the moment the playhead will
+be more than TOLERANCE frames past its index. Pools with submit_with_deadline()
+serve the earliest deadline first and skip work that expired in the queue, and
+requests the playhead has already passed (clock jump, stall) are cancelled on
+the next advance().
+
+With `folder_schedule` (a callable mapping upcoming indices to the folder pair
+each will use, e.g. folder_selector.project_folder_selection), frames past a
+projected folder switch are requested from the new folders, so the switch
+doesn't open with misses.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from settings import TOLERANCE
+from readahead import upcoming_indices
+
+MISS_CAUSES = ("late", "not_requested", "dropped")
+
+
+class PrefetchScheduler:
+    def __init__(self, pool, loader, fifo, load_fn, total, window=8, pingpong=True,
+                 ips=None, folder_schedule=None, on_error=None, **load_kwargs):
+        self.pool = pool
+        self.loader = loader
+        self.fifo = fifo
+        self.load_fn = load_fn
+        self.load_kwargs = load_kwargs
+        self.total = total
+        self.window = max(1, window)
+        self.pingpong = pingpong
+        self.ips = ips
+        self._submit_with_deadline = getattr(pool, 'submit_with_deadline', None) if ips else None
+        self.folder_schedule = folder_schedule
+        self.on_error = on_error
+        self._wanted = {}  # index -> folders it was last requested for
+        self._in_flight = {}  # index -> (future, folders)
+        self._outcome = OrderedDict()  # index -> ("buffered" / "late" / "dropped", folders), recent only
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.deduplicated = 0
+        self.discarded = 0  # Finished for a folder pair that is no longer wanted
+        self.cancelled = 0  # Still queued when the playhead passed them
+        self.misses = dict.fromkeys(MISS_CAUSES, 0)
+        self.fill = 0
+        self._fill_avg = None
+
+    def advance(self, index, direction, folders):
+        """Top the window ahead of `index` back up; called on every index change."""
+        folders = tuple(folders)
+        if self.total <= 1:
+            targets = [index]
+        else:
+            targets = upcoming_indices(index, direction, self.total, 1, self.window + 1, self.pingpong)
+        if self.folder_schedule is not None:
+            plan = [tuple(pair) for pair in self.folder_schedule(targets)]
+        else:
+            plan = [folders] * len(targets)
+        with self._lock:
+            passed = [job[0] for idx, job in self._in_flight.items() if self.fifo.is_behind(idx)]
+        for fut in passed:
+            if fut.cancel():
+                with self._lock:
+                    self.cancelled += 1
+        now = time.monotonic()
+        ready = 0
+        steps = {}
+        for step, (idx, pair) in enumerate(zip(targets, plan), 1):
+            steps.setdefault(idx, (step, pair))  # Ping-pong pivots repeat an index
+        for idx, (step, folders) in steps.items():
+            with self._lock:
+                self._wanted[idx] = folders
+                job = self._in_flight.get(idx)
+                if job is not None:
+                    queued = job[1] == folders
+                else:
+                    # Buffered for this folder pair? (FIFO entries don't know their folders)
+                    queued = self._outcome.get(idx) == ("buffered", folders) and idx in self.fifo
+                if queued:
+                    self.deduplicated += 1
+                    ready += 1
+                    continue
+            deadline = now + (step + TOLERANCE) / self.ips if self.ips else None
+            self._submit(idx, folders, deadline)
+        with self._lock:
+            self.fill = ready
+            self._fill_avg = ready if self._fill_avg is None else self._fill_avg * 0.95 + ready * 0.05
+
+    def _submit(self, idx, folders, deadline=None):
+        if self._submit_with_deadline is not None:
+            fut = self._submit_with_deadline(deadline, self.load_fn, self.loader, idx, *folders, **self.load_kwargs)
+        else:
+            fut = self.pool.submit(self.load_fn, self.loader, idx, *folders, **self.load_kwargs)
+        with self._lock:
+            self._in_flight[idx] = (fut, folders)
+            self._outcome.pop(idx, None)
+            self.submitted += 1
+        fut.add_done_callback(lambda f, i=idx, fo=folders: self._done(f, i, fo))
+
+    def _done(self, fut, idx, folders):
+        with self._lock:
+            job = self._in_flight.get(idx)
+            if job is not None and job[0] is fut:
+                del self._in_flight[idx]
+            current = self._wanted.get(idx, folders) == folders
+            if fut.cancelled():
+                # Passed by the playhead (here) or expired in the pool queue
+                self._remember(idx, "late", folders)
+                return
+        try:
+            result = fut.result()
+        except Exception as e:
+            if self.on_error:
+                self.on_error(idx, e)
+            return
+        if not current:
+            # A newer request for the new folder pair covers this index
+            with self._lock:
+                self.discarded += 1
+            self.loader.release_frame(result)
+            return
+        if self.fifo.update(idx, result):
+            outcome = "buffered"
+        else:
+            outcome = "late" if self.fifo.is_behind(idx) else "dropped"
+        with self._lock:
+            self._remember(idx, outcome, folders)
+
+    def _remember(self, idx, outcome, folders):
+        """Record how a request ended, for miss attribution (caller holds lock)."""
+        self._outcome[idx] = (outcome, folders)
+        self._outcome.move_to_end(idx)
+        while len(self._outcome) > 4 * self.window:
+            self._outcome.popitem(last=False)
+
+    def record_miss(self, index):
+        """Classify a display-loop miss at `index`; returns the cause."""
+        with self._lock:
+            if index in self._in_flight:
+                cause = "late"
+            else:
+                outcome = self._outcome.get(index, (None,))[0]
+                if outcome is None:
+                    cause = "not_requested"
+                elif outcome == "late":
+                    cause = "late"
+                else:
+                    cause = "dropped"  # Buffered, then evicted before it was shown
+            self.misses[cause] += 1
+        return cause
+
+    def get_stats(self):
+        """Get scheduler statistics (thread-safe)."""
+        with self._lock:
+            return {
+                'window': self.window,
+                'fill': self.fill,
+                'fill_avg': self._fill_avg or 0.0,
+                'in_flight': len(self._in_flight),
+                'submitted': self.submitted,
+                'deduplicated': self.deduplicated,
+                'discarded': self.discarded,
+                'cancelled': self.cancelled,
+                'misses': dict(self.misses),
+            }
@@ -0,0 +1,346 @@
+"""
+process_loader.py – Optional process-pool decode backend.
+
+Runs ImageLoader.read_image in worker processes so WebP/JPEG decode and
+npz inflation stop competing with the render loop for the GIL. Decoded
+pixels come back through multiprocessing.shared_memory slots instead of
+being pickled: the worker decodes straight into a slot, and the FIFO holds
+numpy views onto it. A slot is recycled through the same retain_frame() /
+release_frame() handshake the decode buffer pool uses.
+
+Payloads that can't use a slot (ASCII dicts, frames larger than a slot, or
+every slot busy) fall back to pickling, and are counted.
+
+Linux only: workers are forked (main.py configures itself at import time, so
+spawn/forkserver can't re-import it), and fork is only safe before other
+threads exist. main.py calls prestart_workers() before it launches any server
+thread, and ProcessImageLoader.start() adopts those workers.
+"""
+import os
+import sys
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from image_loader import ImageLoader
+
+
+def _attach(name):
+    """
+    Attach to an existing block without registering it with a resource tracker.
+    The main process owns the slots; a worker's tracker would unlink them (and
+    warn about "leaked" memory) when that worker exits.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Before 3.13 attaching always registers. Unregistering afterwards isn't safe either:
+    # a forked worker can share the main process's tracker, whose own entry it would drop.
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+# -----------------------------------------------------------------------------
+# WORKER SIDE
+# -----------------------------------------------------------------------------
+
+_worker_loader = None
+_worker_blocks = {}  # shm name -> SharedMemory
+
+
+class _SlotBuffers:
+    """
+    Stands in for DecodeBufferPool inside a worker: the next decode of the right
+    size lands directly in the shared-memory slot for the current task.
+    """
+
+    def __init__(self):
+        self.block = None
+        self.view = None
+
+    def acquire(self, shape):
+        if self.block is not None and self.view is None and int(np.prod(shape)) <= self.block.size:
+            self.view = np.ndarray(shape, dtype=np.uint8, buffer=self.block.buf)
+            return self.view
+        return np.empty(shape, dtype=np.uint8)
+
+    def release(self, arr):
+        if arr is self.view:
+            self.view = None
+
+    def retain(self, arr):
+        pass
+
+    def detach(self, arr):
+        pass
+
+
+def _init_worker(transcode_dir=None, transcode_bytes=0):
+    global _worker_loader
+    # Workers share the on-disk transcode cache; each keeps its own index of it
+    _worker_loader = ImageLoader(transcode_dir=transcode_dir, transcode_bytes=transcode_bytes)
+    _worker_loader.buffer_pool = _SlotBuffers()
+
+
+def _decode_task(path, index, slot_name, target_size, target_fit):
+    """Decode one layer. Returns ("slot", shape, is_sbs) or ("pickle", payload, is_sbs)."""
+    loader = _worker_loader
+    slots = loader.buffer_pool
+    loader.set_target_size(target_size, target_fit)
+
+    slots.block = None
+    slots.view = None
+    if slot_name is not None:
+        block = _worker_blocks.get(slot_name)
+        if block is None:
+            block = _worker_blocks[slot_name] = _attach(slot_name)
+        slots.block = block
+
+    try:
+        img, is_sbs = loader.read_image(path, index)
+    finally:
+        view = slots.view
+        slots.block = None
+        slots.view = None
+
+    if view is not None and img is view:
+        return "slot", img.shape, is_sbs
+    if slot_name is not None and isinstance(img, np.ndarray) and img.dtype == np.uint8 and img.nbytes <= block.size:
+        # spy/spz/npz/slab frames arrive in their own memory; one copy into the slot
+        np.ndarray(img.shape, dtype=np.uint8, buffer=block.buf)[...] = img
+        return "slot", img.shape, is_sbs
+    return "pickle", img, is_sbs
+
+
+# -----------------------------------------------------------------------------
+# MAIN-PROCESS SIDE
+# -----------------------------------------------------------------------------
+
+_prestarted = None  # (pool, processes, initargs) forked by prestart_workers()
+
+
+def supported():
+    return sys.platform.startswith("linux") and "fork" in multiprocessing.get_all_start_methods()
+
+
+def _worker_count(processes):
+    return processes or max(1, (os.cpu_count() or 1) - 1)
+
+
+def _fork_pool(processes, initargs):
+    ctx = multiprocessing.get_context("fork")
+    pool = ProcessPoolExecutor(max_workers=processes, mp_context=ctx, initializer=_init_worker, initargs=initargs)
+    # With fork, the first submit launches every worker at once: do it now rather than mid-playback
+    pool.submit(os.getpid).result()
+    return pool
+
+
+def prestart_workers(processes=0, transcode_dir=None, transcode_bytes=0):
+    """
+    Fork the decode workers now, before the caller starts any threads.
+    The next ProcessImageLoader.start() with the same settings adopts them.
+    """
+    global _prestarted
+    if _prestarted is None and supported():
+        processes = _worker_count(processes)
+        initargs = (transcode_dir, transcode_bytes)
+        _prestarted = (_fork_pool(processes, initargs), processes, initargs)
+
+
+def _take_prestarted(processes, initargs):
+    global _prestarted
+    if _prestarted is None:
+        return None
+    pool, pre_processes, pre_initargs = _prestarted
+    _prestarted = None
+    if (pre_processes, pre_initargs) == (processes, initargs):
+        return pool
+    pool.shutdown(wait=False)
+    return None
+
+
+class SharedFrameSlots:
+    """Fixed set of equally sized shared-memory blocks, handed out one per decoded layer."""
+
+    def __init__(self, count, slot_bytes):
+        self.slot_bytes = slot_bytes
+        self.blocks = [shared_memory.SharedMemory(create=True, size=slot_bytes) for _ in range(count)]
+        self._free = list(range(count))
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            return self._free.pop() if self._free else None
+
+    def release(self, slot):
+        with self._lock:
+            self._free.append(slot)
+
+    def free_count(self):
+        with self._lock:
+            return len(self._free)
+
+    def close(self):
+        for block in self.blocks:
+            try:
+                block.close()
+            except BufferError:
+                pass  # Views still alive somewhere; the mapping goes away with them
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class ProcessImageLoader(ImageLoader):
+    """
+    ImageLoader whose load_images() fans the main and float layers out to a
+    process pool. Everything else (paths, playhead, target size) behaves like
+    the in-process loader, so load_and_render_frame() works unchanged.
+    """
+
+    def __init__(self, processes=0, slot_count=16, **kwargs):
+        # The decoded-frame cache would live in one worker's private memory, so it is off here.
+        kwargs.pop('frame_cache_bytes', None)
+        kwargs.pop('buffer_pool', None)
+        super().__init__(**kwargs)
+        self._transcode_args = (kwargs.get('transcode_dir'), kwargs.get('transcode_bytes', 0))
+        self.processes = _worker_count(processes)
+        self.slot_count = slot_count
+        self.slots = None
+        self.pool = None
+        self._views = {}  # id(view) -> [slot, view, refcount]
+        self._lock = threading.Lock()
+        self.slot_frames = 0
+        self.pickled_frames = 0
+
+    supported = staticmethod(supported)
+
+    def start(self, probe_path):
+        """Size the slots from one probe decode, then adopt the prestarted workers or fork new ones."""
+        self.pool = (_take_prestarted(self.processes, self._transcode_args)
+                     or _fork_pool(self.processes, self._transcode_args))
+        img, _ = super().read_image(probe_path)
+        nbytes = getattr(img, 'nbytes', 0)
+        # Headroom for float layers or later frames a little larger than the probe
+        slot_bytes = max(1, int(nbytes * 1.25))
+        self.slots = SharedFrameSlots(self.slot_count, slot_bytes)
+        return self
+
+    def _submit(self, path, index):
+        slot = self.slots.acquire()
+        name = self.slots.blocks[slot].name if slot is not None else None
+        fut = self.pool.submit(_decode_task, path, index, name, self.target_size, self.target_fit)
+        return fut, slot
+
+    def _collect(self, fut, slot):
+        try:
+            kind, payload, is_sbs = fut.result()
+        except BaseException:
+            if slot is not None:
+                self.slots.release(slot)
+            raise
+        if kind == "pickle":
+            if slot is not None:
+                self.slots.release(slot)
+            with self._lock:
+                self.pickled_frames += 1
+            return payload, is_sbs
+        view = np.ndarray(payload, dtype=np.uint8, buffer=self.slots.blocks[slot].buf)
+        with self._lock:
+            self._views[id(view)] = [slot, view, 1]
+            self.slot_frames += 1
+        return view, is_sbs
+
+    def load_images(self, index, main_folder, float_folder, raw=None):
+        # `raw` is ignored: workers read their own files
+        mpath, fpath = self.load_paths(index, main_folder, float_folder)
+        if self.readahead is not None:
+            self.readahead.note_read(mpath)
+            if fpath != mpath:
+                self.readahead.note_read(fpath)
+        if fpath == mpath:
+            # One slot serves both layers; the extra reference is the float layer's
+            img, is_sbs = self._collect(*self._submit(mpath, index))
+            self._retain(img)
+            with self._layer_lock:
+                self.shared_layers += 1
+            return img, img, is_sbs, is_sbs
+        # Both layers decode concurrently in separate workers
+        main_job = self._submit(mpath, index)
+        float_job = self._submit(fpath, index)
+        try:
+            main_img, main_sbs = self._collect(*main_job)
+        except BaseException:
+            try:
+                self._release(self._collect(*float_job)[0])
+            except BaseException:
+                pass
+            raise
+        try:
+            float_img, float_sbs = self._collect(*float_job)
+        except BaseException:
+            self._release(main_img)
+            raise
+        with self._layer_lock:
+            self.parallel_layers += 1
+        return main_img, float_img, main_sbs, float_sbs
+
+    def _retain(self, arr):
+        with self._lock:
+            entry = self._views.get(id(arr))
+            if entry is not None and entry[1] is arr:
+                entry[2] += 1
+
+    def _release(self, arr):
+        with self._lock:
+            entry = self._views.get(id(arr))
+            if entry is None or entry[1] is not arr:
+                return
+            entry[2] -= 1
+            if entry[2] > 0:
+                return
+            del self._views[id(arr)]
+        self.slots.release(entry[0])
+
+    def retain_frame(self, data_tuple):
+        if not data_tuple:
+            return
+        self._retain(data_tuple[0])
+        self._retain(data_tuple[1])
+
+    def release_frame(self, data_tuple):
+        if not data_tuple:
+            return
+        self._release(data_tuple[0])
+        self._release(data_tuple[1])
+
+    def engine_stats(self):
+        with self._lock:
+            slot_frames, pickled = self.slot_frames, self.pickled_frames
+            in_use = len(self._views)
+        return {
+            'processes': self.processes,
+            'slots': self.slot_count,
+            'slots_free': self.slots.free_count() if self.slots else 0,
+            'slot_mb': self.slots.slot_bytes / (1024 ** 2) if self.slots else 0,
+            'views_in_use': in_use,
+            'slot_frames': slot_frames,
+            'pickled_frames': pickled,
+        }
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+        with self._lock:
+            self._views.clear()
+        if self.slots is not None:
+            self.slots.close()
+            self.slots = None
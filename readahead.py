@@ -0,0 +1,171 @@
+"""
+readahead.py – Predictive kernel readahead for upcoming frames.
+
+Free-clock playback is deterministic: from the current index and direction the
+next few seconds of indices are known, and so are the files behind them for the
+current folder pair. A background thread asks the kernel to start reading those
+files (posix_fadvise WILLNEED, or an mmap prefault where fadvise is missing) so
+that the decode a second later finds them in the page cache instead of waiting
+on the SD card.
+
+Reads are classified when the loader asks for a file:
+  warm - readahead for it had already been issued
+  late - it was queued but the readahead thread hadn't reached it yet
+  cold - it was never predicted (folder switch, jump, startup)
+"""
+import os
+import mmap
+import math
+import queue
+import threading
+from collections import OrderedDict
+
+_PAGE = mmap.PAGESIZE
+
+
+def upcoming_indices(index, direction, total, start, stop, pingpong=True):
+    """
+    Indices `start`..`stop-1` steps after `index`, following the same sequence as
+    calculate_free_clock_index: 0..N-1, N-1..0 (double pivot) in ping-pong mode,
+    plain wrap-around otherwise.
+    """
+    if total <= 0:
+        return []
+    if not pingpong or total == 1:
+        return [(index + k) % total for k in range(start, stop)]
+    period = 2 * total
+    # Position within one ping-pong period: forward ramp [0, N), mirrored ramp [N, 2N)
+    phase = index if direction >= 0 else (period - 1) - index
+    out = []
+    for k in range(start, stop):
+        p = (phase + k) % period
+        out.append(p if p < total else (period - 1) - p)
+    return out
+
+
+def _advise(path, offset, length):
+    """Ask the kernel to pull [offset, offset+length) of `path` into the page cache."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, offset, length, os.POSIX_FADV_WILLNEED)
+            return
+        size = os.fstat(fd).st_size
+        if size == 0:
+            return
+        # mmap offsets must be page aligned
+        start = offset - (offset % _PAGE)
+        end = size if length == 0 else min(size, offset + length)
+        with mmap.mmap(fd, end - start, access=mmap.ACCESS_READ, offset=start) as mm:
+            if hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_WILLNEED'):
+                mm.madvise(mmap.MADV_WILLNEED)
+            else:
+                for i in range(0, len(mm), _PAGE):
+                    mm[i]  # Touch each page
+    finally:
+        os.close(fd)
+
+
+class Readahead:
+    """
+    Keeps the files for the next `min_s`..`max_s` seconds of playback advised.
+
+    advance() is called from the display loop on every index change and only
+    queues paths it hasn't seen recently, so the steady-state cost is one or two
+    queue puts per frame. All file access happens on the readahead thread.
+    """
+
+    def __init__(self, loader, ips, min_s=0.5, max_s=2.0, pingpong=True, queue_size=256):
+        self.loader = loader
+        self.pingpong = pingpong
+        self.set_horizon(ips, min_s, max_s)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._seen = OrderedDict()  # path -> True once advised, False while queued
+        self._lock = threading.Lock()
+        self.advised = 0
+        self.errors = 0
+        self.dropped = 0
+        self.warm_reads = 0
+        self.late_reads = 0
+        self.cold_reads = 0
+        self._thread = threading.Thread(target=self._run, name="readahead", daemon=True)
+        self._thread.start()
+        loader.readahead = self
+
+    def set_horizon(self, ips, min_s, max_s):
+        """Window in frames: from ceil(min_s * ips) to ceil(max_s * ips) steps ahead."""
+        self.start_step = max(1, math.ceil(min_s * ips))
+        self.stop_step = max(self.start_step + 1, math.ceil(max_s * ips) + 1)
+
+    def advance(self, index, direction, main_folder, float_folder):
+        loader = self.loader
+        total = len(loader.main_folder_path)
+        # Remember every path from when it enters the window until it is read (2 layers per step)
+        keep = 4 * self.stop_step
+        for idx in upcoming_indices(index, direction, total, self.start_step, self.stop_step, self.pingpong):
+            for path in (loader.main_folder_path[idx][main_folder], loader.float_folder_path[idx][float_folder]):
+                with self._lock:
+                    if path in self._seen:
+                        continue
+                    self._seen[path] = False
+                    while len(self._seen) > keep:
+                        self._seen.popitem(last=False)
+                try:
+                    self._queue.put_nowait(path)
+                except queue.Full:
+                    with self._lock:
+                        self._seen.pop(path, None)
+                        self.dropped += 1
+
+    def note_read(self, path):
+        """Called by the loader just before it reads `path`."""
+        with self._lock:
+            state = self._seen.get(path)
+            if state is True:
+                self.warm_reads += 1
+            elif state is False:
+                self.late_reads += 1
+            else:
+                self.cold_reads += 1
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            if path is None:
+                return
+            try:
+                _advise(*self.loader.file_range(path))
+                ok = True
+            except (OSError, ValueError):
+                ok = False
+            with self._lock:
+                if ok:
+                    self.advised += 1
+                    if path in self._seen:
+                        self._seen[path] = True
+                else:
+                    self.errors += 1
+
+    def get_stats(self):
+        """Get readahead statistics (thread-safe)."""
+        with self._lock:
+            reads = self.warm_reads + self.late_reads + self.cold_reads
+            return {
+                'horizon_frames': (self.start_step, self.stop_step - 1),
+                'advised': self.advised,
+                'queued': self._queue.qsize(),
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'warm_reads': self.warm_reads,
+                'late_reads': self.late_reads,
+                'cold_reads': self.cold_reads,
+                'warm_rate': self.warm_reads / reads if reads > 0 else 0.0,
+            }
+
+    def close(self):
+        try:
+            self._queue.put(None, timeout=1.0)
+        except queue.Full:
+            pass  # Daemon thread; it dies with the process
+        if self.loader.readahead is self:
+            self.loader.readahead = None
@@ -11,11 +11,13 @@ import numpy as np
 import moderngl
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 try:
     import cv2
 except ImportError:
     cv2 = None
-from settings import ENABLE_SRGB_FRAMEBUFFER, GAMMA_CORRECTION_ENABLED, BACKGROUND_COLOR
+from settings import ENABLE_SRGB_FRAMEBUFFER, GAMMA_CORRECTION_ENABLED, BACKGROUND_COLOR, CPU_COMPOSITE_THREADS, \
+    RESIZE_BEFORE_BLEND, CPU_OUTPUT_BUFFERS, CPU_OUTPUT_DEBUG
 
 # Renderer backend selection:
 # - "moderngl": requires GL3.3 or GLES3+
@@ -47,10 +49,147 @@ _bg_linear_color: tuple[float, float, float] | None = None
 _bg_linear_src: tuple[int, int, int] | None = None
 
 # --- CPU OPTIMIZATION GLOBALS ---
-_cpu_buffer: np.ndarray | None = None
-_cached_canvas: np.ndarray | None = None
+_cpu_buffer: np.ndarray | None = None  # Full-resolution composite, when the output is letterboxed from it
 _cpu_buffer_lock = threading.Lock()  # Thread safety for buffer operations
 
+
+class OutputRing:
+    """
+    Small ring of composite_cpu() output buffers, handed to the caller instead
+    of a copy of a shared buffer. The caller owns the frame until it calls
+    release_output() (once the JPEG is encoded or the ASCII text built); the
+    buffer then serves a later frame. If every buffer is still out, the
+    caller gets a one-off array rather than waiting.
+
+    With debug on, released buffers are poisoned and made read-only: a second
+    release raises, and a buffer written through a stale view while released
+    raises when it is handed out again.
+    """
+
+    POISON = 0xA5
+
+    def __init__(self, depth=3, debug=False):
+        self.depth = max(1, depth)
+        self.debug = debug
+        self._shape = None
+        self._count = 0  # Buffers of the current shape, free or handed out
+        self._free = []
+        self._owned = {}  # id(buf) -> buf, handed out
+        self._lock = threading.Lock()
+        self.handoffs = 0
+        self.reuses = 0
+        self.allocations = 0
+        self.overflows = 0
+        self.violations = 0
+
+    def acquire(self, shape):
+        shape = tuple(shape)
+        with self._lock:
+            if shape != self._shape:
+                # New output size: buffers of the old one are dropped as they come back
+                self._shape, self._count, self._free = shape, 0, []
+            self.handoffs += 1
+            if self._free:
+                buf = self._free.pop()
+                self.reuses += 1
+            elif self._count < self.depth:
+                buf = None
+                self._count += 1
+                self.allocations += 1
+            else:
+                self.overflows += 1
+                return np.empty(shape, dtype=np.uint8)  # Untracked; release() ignores it
+        if buf is None:
+            buf = np.empty(shape, dtype=np.uint8)
+        elif self.debug:
+            buf.setflags(write=True)
+            if not np.all(buf == self.POISON):
+                with self._lock:
+                    self.violations += 1
+                raise RuntimeError("CPU output buffer was written after release")
+        with self._lock:
+            self._owned[id(buf)] = buf
+        return buf
+
+    def release(self, buf):
+        """Hand a frame back; no-op for anything the ring didn't hand out."""
+        if not isinstance(buf, np.ndarray):
+            return
+        with self._lock:
+            if self._owned.pop(id(buf), None) is not buf:
+                if self.debug and any(b is buf for b in self._free):
+                    self.violations += 1
+                    raise RuntimeError("CPU output buffer released twice")
+                return
+            if buf.shape != self._shape:
+                return
+            if self.debug:
+                buf.fill(self.POISON)
+                buf.setflags(write=False)
+            self._free.append(buf)
+
+    def detach(self, buf):
+        """Stop tracking a handed-out frame; it now belongs to the caller (e.g. a cache) for good."""
+        with self._lock:
+            if self._owned.pop(id(buf), None) is buf and buf.shape == self._shape:
+                self._count -= 1
+
+    def clear(self):
+        with self._lock:
+            self._shape, self._count, self._free = None, 0, []
+
+    def get_stats(self):
+        """Get ring statistics (thread-safe)."""
+        with self._lock:
+            return {
+                'depth': self.depth,
+                'outstanding': len(self._owned),
+                'free': len(self._free),
+                'handoffs': self.handoffs,
+                'reuses': self.reuses,
+                'allocations': self.allocations,
+                'overflows': self.overflows,
+                'violations': self.violations,
+            }
+
+
+output_ring = OutputRing(CPU_OUTPUT_BUFFERS, CPU_OUTPUT_DEBUG)
+
+
+def release_output(frame):
+    """Return a composite_cpu() frame to the output ring once it has been encoded/converted."""
+    output_ring.release(frame)
+
+
+def detach_output(frame):
+    """Keep a composite_cpu() frame for good (it will never be released)."""
+    output_ring.detach(frame)
+
+
+class _BlendScratch:
+    """Widened (uint16) work buffers for _blend_into, kept across frames and grown on demand."""
+
+    def __init__(self):
+        self._src = self._dst = self._inv = None
+
+    def get(self, h, w):
+        if self._src is None or self._src.shape[0] < h or self._src.shape[1] < w:
+            h2 = max(h, 0 if self._src is None else self._src.shape[0])
+            w2 = max(w, 0 if self._src is None else self._src.shape[1])
+            self._src = np.empty((h2, w2, 3), dtype=np.uint16)
+            self._dst = np.empty((h2, w2, 3), dtype=np.uint16)
+            self._inv = np.empty((h2, w2, 1), dtype=np.uint16)
+        return self._src[:h, :w], self._dst[:h, :w], self._inv[:h, :w]
+
+
+_BLEND_STRIP_ROWS = 32  # Rows per blend strip: scratch stays cache-sized, opaque/empty strips skip the math
+
+# Band-parallel compositing: numpy/cv2 release the GIL, so row bands run on a persistent pool
+_BAND_MIN_PIXELS = 256 * 1024  # Smaller bands cost more in hand-off than they save
+_band_pool: ThreadPoolExecutor | None = None
+_band_threads = 0
+_band_scratch: list[_BlendScratch] = []  # One per band; guarded by _cpu_buffer_lock
+
 # --- TEXTURE POOL (Pre-allocated textures for common sizes) ---
 _texture_pool: dict[tuple[int, int, int], list] = {}  # (width, height, components) -> list of textures
 _texture_pool_lock = threading.Lock()
@@ -62,7 +201,9 @@ _legacy_vbo: int | None = None
 _legacy_mvp_loc: int | None = None
 _legacy_bg_loc: int | None = None
 _legacy_main_sbs_loc: int | None = None
+_legacy_main_visible_loc: int | None = None
 _legacy_float_sbs_loc: int | None = None
+_legacy_float_rect_loc: int | None = None
 _legacy_tex_main_loc: int | None = None
 _legacy_tex_float_loc: int | None = None
 _legacy_pos_loc: int | None = None
@@ -144,7 +285,8 @@ def initialize_legacy() -> None:
     """
     global _backend
     global _legacy_program, _legacy_vbo
-    global _legacy_mvp_loc, _legacy_bg_loc, _legacy_main_sbs_loc, _legacy_float_sbs_loc
+    global _legacy_mvp_loc, _legacy_bg_loc, _legacy_main_sbs_loc, _legacy_float_sbs_loc, _legacy_float_rect_loc
+    global _legacy_main_visible_loc
     global _legacy_tex_main_loc, _legacy_tex_float_loc, _legacy_pos_loc, _legacy_uv_loc
 
     _backend = "legacy"
@@ -172,7 +314,9 @@ def initialize_legacy() -> None:
         uniform vec3 u_bgColor;
 
         uniform bool u_main_is_sbs;
+        uniform bool u_main_visible;
         uniform bool u_float_is_sbs;
+        uniform vec4 u_float_rect;
 
         varying vec2 v_texcoord;
 
@@ -190,8 +334,17 @@ def initialize_legacy() -> None:
         }
 
         void main() {
-            vec4 mainC = sampleLayer(texture_main, u_main_is_sbs, v_texcoord);
-            vec4 floatC = sampleLayer(texture_float, u_float_is_sbs, v_texcoord);
+            // Main layer is skipped when it is fully transparent or under an opaque float
+            vec4 mainC = vec4(0.0);
+            if (u_main_visible) {
+                mainC = sampleLayer(texture_main, u_main_is_sbs, v_texcoord);
+            }
+            // Float layer only inside its tile rectangle (texels outside it may be stale)
+            vec4 floatC = vec4(0.0);
+            if (v_texcoord.x >= u_float_rect.x && v_texcoord.y >= u_float_rect.y &&
+                v_texcoord.x <= u_float_rect.z && v_texcoord.y <= u_float_rect.w) {
+                floatC = sampleLayer(texture_float, u_float_is_sbs, v_texcoord);
+            }
 
             vec3 color = mix(u_bgColor, mainC.rgb, mainC.a);
             color = mix(color, floatC.rgb, floatC.a);
@@ -218,7 +371,9 @@ def initialize_legacy() -> None:
         uniform vec3 u_bgColor;
 
         uniform bool u_main_is_sbs;
+        uniform bool u_main_visible;
         uniform bool u_float_is_sbs;
+        uniform vec4 u_float_rect;
 
         varying vec2 v_texcoord;
 
@@ -236,8 +391,17 @@ def initialize_legacy() -> None:
         }
 
         void main() {
-            vec4 mainC = sampleLayer(texture_main, u_main_is_sbs, v_texcoord);
-            vec4 floatC = sampleLayer(texture_float, u_float_is_sbs, v_texcoord);
+            // Main layer is skipped when it is fully transparent or under an opaque float
+            vec4 mainC = vec4(0.0);
+            if (u_main_visible) {
+                mainC = sampleLayer(texture_main, u_main_is_sbs, v_texcoord);
+            }
+            // Float layer only inside its tile rectangle (texels outside it may be stale)
+            vec4 floatC = vec4(0.0);
+            if (v_texcoord.x >= u_float_rect.x && v_texcoord.y >= u_float_rect.y &&
+                v_texcoord.x <= u_float_rect.z && v_texcoord.y <= u_float_rect.w) {
+                floatC = sampleLayer(texture_float, u_float_is_sbs, v_texcoord);
+            }
 
             vec3 color = mix(u_bgColor, mainC.rgb, mainC.a);
             color = mix(color, floatC.rgb, floatC.a);
@@ -254,6 +418,8 @@ def initialize_legacy() -> None:
     _legacy_bg_loc = gl.glGetUniformLocation(_legacy_program, "u_bgColor")
     _legacy_main_sbs_loc = gl.glGetUniformLocation(_legacy_program, "u_main_is_sbs")
     _legacy_float_sbs_loc = gl.glGetUniformLocation(_legacy_program, "u_float_is_sbs")
+    _legacy_float_rect_loc = gl.glGetUniformLocation(_legacy_program, "u_float_rect")
+    _legacy_main_visible_loc = gl.glGetUniformLocation(_legacy_program, "u_main_visible")
     _legacy_tex_main_loc = gl.glGetUniformLocation(_legacy_program, "texture_main")
     _legacy_tex_float_loc = gl.glGetUniformLocation(_legacy_program, "texture_float")
     _legacy_pos_loc = gl.glGetAttribLocation(_legacy_program, "position")
@@ -272,6 +438,10 @@ def initialize_legacy() -> None:
         gl.glUniform1i(_legacy_main_sbs_loc, 0)
     if _legacy_float_sbs_loc is not None:
         gl.glUniform1i(_legacy_float_sbs_loc, 0)
+    if _legacy_float_rect_loc is not None:
+        gl.glUniform4f(_legacy_float_rect_loc, *FULL_RECT)
+    if _legacy_main_visible_loc is not None:
+        gl.glUniform1i(_legacy_main_visible_loc, 1)
 
     # Default MVP: identity
     if _legacy_mvp_loc is not None:
@@ -381,7 +551,9 @@ def initialize(gl_context: moderngl.Context) -> None:
             uniform vec3 u_bgColor;
 
             uniform bool u_main_is_sbs;
+            uniform bool u_main_visible;
             uniform bool u_float_is_sbs;
+            uniform vec4 u_float_rect;
 
             varying vec2 v_texcoord;
 
@@ -399,8 +571,17 @@ def initialize(gl_context: moderngl.Context) -> None:
             }
 
             void main() {
-                vec4 mainC = sampleLayer(texture_main, u_main_is_sbs, v_texcoord);
-                vec4 floatC = sampleLayer(texture_float, u_float_is_sbs, v_texcoord);
+                // Main layer is skipped when it is fully transparent or under an opaque float
+                vec4 mainC = vec4(0.0);
+                if (u_main_visible) {
+                    mainC = sampleLayer(texture_main, u_main_is_sbs, v_texcoord);
+                }
+                // Float layer only inside its tile rectangle (texels outside it may be stale)
+                vec4 floatC = vec4(0.0);
+                if (v_texcoord.x >= u_float_rect.x && v_texcoord.y >= u_float_rect.y &&
+                    v_texcoord.x <= u_float_rect.z && v_texcoord.y <= u_float_rect.w) {
+                    floatC = sampleLayer(texture_float, u_float_is_sbs, v_texcoord);
+                }
 
                 vec3 color = mix(u_bgColor, mainC.rgb, mainC.a);
                 color = mix(color, floatC.rgb, floatC.a);
@@ -429,7 +610,9 @@ def initialize(gl_context: moderngl.Context) -> None:
             uniform vec3 u_bgColor;
 
             uniform bool u_main_is_sbs;
+            uniform bool u_main_visible;
             uniform bool u_float_is_sbs;
+            uniform vec4 u_float_rect;
 
             in vec2 v_texcoord;
             out vec4 fragColor;
@@ -448,8 +631,17 @@ def initialize(gl_context: moderngl.Context) -> None:
             }}
 
             void main() {{
-                vec4 mainC = sampleLayer(texture_main, u_main_is_sbs, v_texcoord);
-                vec4 floatC = sampleLayer(texture_float, u_float_is_sbs, v_texcoord);
+                // Main layer is skipped when it is fully transparent or under an opaque float
+                vec4 mainC = vec4(0.0);
+                if (u_main_visible) {{
+                    mainC = sampleLayer(texture_main, u_main_is_sbs, v_texcoord);
+                }}
+                // Float layer only inside its tile rectangle (texels outside it may be stale)
+                vec4 floatC = vec4(0.0);
+                if (v_texcoord.x >= u_float_rect.x && v_texcoord.y >= u_float_rect.y &&
+                    v_texcoord.x <= u_float_rect.z && v_texcoord.y <= u_float_rect.w) {{
+                    floatC = sampleLayer(texture_float, u_float_is_sbs, v_texcoord);
+                }}
 
                 vec3 color = mix(u_bgColor, mainC.rgb, mainC.a);
                 color = mix(color, floatC.rgb, floatC.a);
@@ -470,6 +662,8 @@ def initialize(gl_context: moderngl.Context) -> None:
     prog["u_bgColor"].value = (0.0, 0.0, 0.0)
     prog["u_main_is_sbs"].value = False
     prog["u_float_is_sbs"].value = False
+    prog["u_float_rect"].value = FULL_RECT
+    prog["u_main_visible"].value = True
 
 
 def set_transform_parameters(fs_scale, fs_offset_x, fs_offset_y, image_size, rotation_angle, mirror_mode):
@@ -501,7 +695,71 @@ def update_mvp(mvp_matrix):
         prog["u_MVP"].write(mvp_matrix.T.tobytes())
 
 
+FULL_RECT = (0.0, 0.0, 1.0, 1.0)
+EMPTY_RECT = (1.0, 1.0, 0.0, 0.0)
+
+
+def _tile(image):
+    """(y, x, frame_h, frame_w) of a LayerTile inside its full layer, or None for a full-frame image."""
+    frame_size = getattr(image, 'frame_size', None)
+    if frame_size is None:
+        return None
+    return image.tile_origin + frame_size
+
+
+def tile_uv_rect(image):
+    """
+    u_float_rect for a float layer: the tile's texel rectangle in texture
+    coordinates, inset half a texel so filtering never reads outside it.
+    """
+    tile = _tile(image)
+    if tile is None:
+        return FULL_RECT
+    y, x, fh, fw = tile
+    h, w = image.shape[:2]
+    if h < 2 or w < 2:
+        return EMPTY_RECT  # Nothing visible
+    # At the frame border the texture clamps to the tile's own texels, so no inset there
+    x0, y0 = (x + 0.5) / fw if x else 0.0, (y + 0.5) / fh if y else 0.0
+    x1 = (x + w - 0.5) / fw if x + w < fw else 1.0
+    y1 = (y + h - 0.5) / fh if y + h < fh else 1.0
+    return (x0, y0, x1, y1)
+
+
+def float_uv_rect(image, float_class=None):
+    """u_float_rect for a float layer of the given opacity class: nothing at all when it is fully transparent."""
+    if float_class == "transparent":
+        return EMPTY_RECT
+    return tile_uv_rect(image)
+
+
+def main_visible(main_class=None, float_class=None):
+    """Whether the main layer can show through: not fully transparent and not under an opaque full-frame float."""
+    return main_class != "transparent" and float_class != "opaque"
+
+
+def _write_tile(texture, image, tile):
+    """Upload a LayerTile into its rectangle of a frame-sized texture."""
+    y, x = tile[:2]
+    h, w = image.shape[:2]
+    if h == 0 or w == 0:
+        return
+    pixels = _as_contiguous_u8(np.asarray(image))
+    if _backend == "legacy":
+        gl = _lazy_import_gl()
+        _, fmt, pixels = _legacy_gl_formats(pixels)
+        gl.glTexSubImage2D(gl.GL_TEXTURE_2D, 0, x, y, w, h, fmt, gl.GL_UNSIGNED_BYTE, pixels)
+    else:
+        texture.write(memoryview(pixels), viewport=(x, y, w, h))
+
+
 def create_texture(image: np.ndarray) -> moderngl.Texture:
+    tile = _tile(image)
+    if tile is not None:
+        # Frame-sized texture; only the tile's rectangle is ever written
+        tex = create_texture(np.zeros(tile[2:] + (image.shape[2],), dtype=np.uint8))
+        _write_tile(tex, image, tile)
+        return tex
     if _backend == "legacy":
         _track_legacy_usage("create_texture")
         if _legacy_program is None:
@@ -574,6 +832,23 @@ def update_texture(texture: moderngl.Texture, new_image: np.ndarray) -> moderngl
     Future enhancement: Implement PBO-based async uploads using raw OpenGL for
     high-end systems where texture upload time is a bottleneck.
     """
+    tile = _tile(new_image)
+    if tile is not None:
+        fh, fw = tile[2:]
+        if _backend == "legacy":
+            if _legacy_texture_dims.get(int(texture)) != (fw, fh, new_image.shape[2]):
+                texture = update_texture(texture, np.zeros((fh, fw, new_image.shape[2]), dtype=np.uint8))
+            gl = _lazy_import_gl()
+            gl.glPixelStorei(gl.GL_UNPACK_ALIGNMENT, 1)
+            gl.glBindTexture(gl.GL_TEXTURE_2D, int(texture))
+        elif texture.size != (fw, fh) or texture.components != new_image.shape[2]:
+            _return_texture_to_pool(texture)
+            texture = _get_texture_from_pool(fw, fh, new_image.shape[2])
+            if texture is None:
+                return create_texture(new_image)
+        _write_tile(texture, new_image, tile)
+        return texture
+
     if _backend == "legacy":
         _track_legacy_usage("update_texture")
         gl = _lazy_import_gl()
@@ -680,7 +955,11 @@ def compute_transformed_quad():
 
 
 def overlay_images_single_pass(main_texture, float_texture, background_color=(0, 0, 0),
-                               main_is_sbs=False, float_is_sbs=False):
+                               main_is_sbs=False, float_is_sbs=False, float_rect=FULL_RECT, main_visible=True):
+    """
+    float_rect: float_uv_rect() of the float layer; the float texture is only sampled inside it.
+    main_visible=False skips sampling the main texture (see main_visible()).
+    """
     global _quad_dirty
     if _backend == "legacy":
         _track_legacy_usage("overlay_images_single_pass")
@@ -699,6 +978,10 @@ def overlay_images_single_pass(main_texture, float_texture, background_color=(0,
             gl.glUniform1i(_legacy_main_sbs_loc, 1 if main_is_sbs else 0)
         if _legacy_float_sbs_loc is not None:
             gl.glUniform1i(_legacy_float_sbs_loc, 1 if float_is_sbs else 0)
+        if _legacy_float_rect_loc is not None:
+            gl.glUniform4f(_legacy_float_rect_loc, *float_rect)
+        if _legacy_main_visible_loc is not None:
+            gl.glUniform1i(_legacy_main_visible_loc, 1 if main_visible else 0)
 
         if _quad_dirty or _quad_data is None:
             quad = compute_transformed_quad().astype(np.float32, copy=False)
@@ -738,6 +1021,8 @@ def overlay_images_single_pass(main_texture, float_texture, background_color=(0,
         prog["u_bgColor"].value = bg_linear
         prog["u_main_is_sbs"].value = main_is_sbs
         prog["u_float_is_sbs"].value = float_is_sbs
+        prog["u_float_rect"].value = float_rect
+        prog["u_main_visible"].value = main_visible
     ctx.clear(*bg_linear)
     if _quad_dirty or _quad_data is None:
         vbo.write(compute_transformed_quad().tobytes())
@@ -748,13 +1033,103 @@ def overlay_images_single_pass(main_texture, float_texture, background_color=(0,
 
 
 # --- CPU COMPOSITOR (Fixed Aspect Ratio & Alpha) ---
-def composite_cpu(main_img, float_img, main_is_sbs=False, float_is_sbs=False, target_size=None):
+def _blend_into(dst, src, alpha, scratch):
+    """
+    dst = (src * a + dst * (255 - a)) // 255 in place, without gathering the
+    a > 0 pixels: a == 0 leaves dst unchanged either way, so the result is
+    bit-identical to the old masked blend.
+
+    Work is limited to the bounding box of non-zero alpha, taken in row strips;
+    a strip that is fully opaque is a plain copy, one that is fully transparent
+    is skipped, and the rest use widened integer math in preallocated scratch.
+    Returns "transparent", "opaque" or "mixed" for the whole layer.
+    """
+    rows = np.flatnonzero(alpha.any(axis=1))
+    if rows.size == 0:
+        return "transparent"
+    r0, r1 = int(rows[0]), int(rows[-1]) + 1
+    cols = np.flatnonzero(alpha[r0:r1].any(axis=0))
+    c0, c1 = int(cols[0]), int(cols[-1]) + 1
+    h, w = alpha.shape
+    if (r0, r1, c0, c1) == (0, h, 0, w) and alpha.min() == 255:
+        np.copyto(dst, src)
+        return "opaque"
+    for y0 in range(r0, r1, _BLEND_STRIP_ROWS):
+        y1 = min(r1, y0 + _BLEND_STRIP_ROWS)
+        a = alpha[y0:y1, c0:c1]
+        d = dst[y0:y1, c0:c1]
+        s = src[y0:y1, c0:c1]
+        if a.min() == 255:
+            np.copyto(d, s)
+        elif a.any():
+            _blend_strip(d, s, a, scratch)
+    return "mixed"
+
+
+def _blend_strip(dst, src, alpha, scratch):
+    h, w = alpha.shape
+    s16, d16, inv16 = scratch.get(h, w)
+    a = alpha[..., None]
+    np.multiply(src, a, out=s16, dtype=np.uint16)
+    np.subtract(255, a, out=inv16, dtype=np.uint16)
+    np.multiply(dst, inv16, out=d16, dtype=np.uint16)
+    np.add(s16, d16, out=s16)  # <= 255 * 255, fits uint16
+    # x // 255 as (x + 1 + (x >> 8)) >> 8, exact for x <= 255 * 255, no division
+    np.right_shift(s16, 8, out=d16)
+    np.add(s16, d16, out=s16)
+    np.add(s16, 1, out=s16)
+    np.right_shift(s16, 8, out=s16)
+    np.copyto(dst, s16, casting='unsafe')
+
+
+def _resize_layer(rgb, alpha, w, h):
+    """
+    Layer resized to w x h, as RGBA (premultiplied while resampling, so the
+    colour of transparent pixels can't bleed into the edges) or RGB.
+    """
+    if cv2 is None:
+        rows = np.arange(h) * rgb.shape[0] // h
+        cols = np.arange(w) * rgb.shape[1] // w
+        img = rgb if alpha is None else np.dstack((rgb, alpha[:, :rgb.shape[1]]))
+        return np.ascontiguousarray(img[rows[:, None], cols])
+    if alpha is None:
+        return cv2.resize(np.ascontiguousarray(rgb), (w, h), interpolation=cv2.INTER_LINEAR)
+    rgba = cv2.cvtColor(np.dstack((rgb, alpha[:, :rgb.shape[1]])), cv2.COLOR_RGBA2mRGBA)
+    return cv2.cvtColor(cv2.resize(rgba, (w, h), interpolation=cv2.INTER_LINEAR), cv2.COLOR_mRGBA2RGBA)
+
+
+def _match_float_to_main(f_rgb, f_a, f_tile, th, tw):
+    """
+    Scale a float layer decoded at a different size than the main (reduced-
+    resolution decode differs per format; slab/spz frames aren't reduced at all)
+    onto the main's th x tw frame. Returns (float_img, tile) with tile as
+    (y, x, th, tw) in main-frame pixels, or None for a full-frame float.
+    """
+    fh, fw = f_tile[2:] if f_tile is not None else f_rgb.shape[:2]
+    sy, sx = th / fh, tw / fw
+    if f_tile is None:
+        return _resize_layer(f_rgb, f_a, tw, th), None
+    y0, x0 = round(f_tile[0] * sy), round(f_tile[1] * sx)
+    y1 = max(y0 + 1, round((f_tile[0] + f_rgb.shape[0]) * sy))
+    x1 = max(x0 + 1, round((f_tile[1] + f_rgb.shape[1]) * sx))
+    return _resize_layer(f_rgb, f_a, x1 - x0, y1 - y0), (y0, x0, th, tw)
+
+
+def composite_cpu(main_img, float_img, main_is_sbs=False, float_is_sbs=False, target_size=None,
+                  main_class=None, float_class=None):
     """
     Composite two images (main + float) with alpha blending.
     Thread-safe: Uses locks to protect global buffer state.
     Note: Typically called from main display loop (single-threaded), but locks ensure safety.
+
+    main_class/float_class are the loader's opacity classes ("opaque",
+    "transparent", "mixed"); they let fully opaque layers be copied and fully
+    transparent or covered ones be skipped without looking at their alpha.
+
+    The returned frame is a buffer from the output ring, owned by the caller:
+    hand it back with release_output() when done with it.
     """
-    global _cpu_buffer, _cached_canvas
+    global _cpu_buffer
 
     if main_img is None and float_img is None: return None
 
@@ -774,6 +1149,10 @@ def composite_cpu(main_img, float_img, main_is_sbs=False, float_is_sbs=False, ta
             else:
                 return img, None
 
+    # A LayerTile float covers only its rectangle of the frame
+    f_tile = _tile(float_img)
+    if f_tile is not None:
+        float_img = np.asarray(float_img)
     m_rgb, m_a = get_views(main_img, main_is_sbs)
     f_rgb, f_a = get_views(float_img, float_is_sbs)
 
@@ -781,98 +1160,250 @@ def composite_cpu(main_img, float_img, main_is_sbs=False, float_is_sbs=False, ta
     if m_rgb is not None:
         th, tw = m_rgb.shape[:2]
     elif f_rgb is not None:
-        th, tw = f_rgb.shape[:2]
+        th, tw = f_tile[2:] if f_tile is not None else f_rgb.shape[:2]
     else:
         return None
 
-    bg_r, bg_g, bg_b = BACKGROUND_COLOR
-
-    # Thread-safe buffer management - minimize lock scope
-    # Allocate/check buffer size within lock, then do compositing work
-    with _cpu_buffer_lock:
-        # 2. Manage Source Buffer (Lazy Instantiation)
-        if _cpu_buffer is None or _cpu_buffer.shape[:2] != (th, tw):
-            _cpu_buffer = np.empty((th, tw, 3), dtype=np.uint8)
-
-        # Fast Background Fill
-        _cpu_buffer[:] = (bg_r, bg_g, bg_b)
-
-        # 3. Apply Main Layer (within lock for thread safety)
-        if m_rgb is not None:
-            if m_a is None:
-                np.copyto(_cpu_buffer, m_rgb)
-            else:
-                # OPTIMIZED BLEND: Integer Math to avoid float casting
-                mask = m_a > 0
-                if np.any(mask):
-                    alpha = m_a[mask][:, None].astype(np.uint16)
-                    src = m_rgb[mask].astype(np.uint16)
-                    dst = _cpu_buffer[mask].astype(np.uint16)
-
-                    blended = (src * alpha + dst * (255 - alpha)) // 255
-                    _cpu_buffer[mask] = blended.astype(np.uint8)
-
-        # 4. Apply Float Layer (within lock for thread safety)
-        if f_rgb is not None:
-            fh, fw = f_rgb.shape[:2]
-            h, w = min(th, fh), min(tw, fw)
-
-            # Define views for cropping
-            target_view = _cpu_buffer[:h, :w]
-            source_view = f_rgb[:h, :w]
-
+    # Layers decoded at different sizes: the float follows the main's frame
+    if m_rgb is not None and f_rgb is not None and float_class != "transparent":
+        f_frame = f_tile[2:] if f_tile is not None else f_rgb.shape[:2]
+        if tuple(f_frame) != (th, tw):
+            float_img, f_tile = _match_float_to_main(f_rgb, f_a, f_tile, th, tw)
+            float_is_sbs = False
+            f_rgb, f_a = get_views(float_img, False)
+
+    bg = BACKGROUND_COLOR
+    # Float rectangle in frame coordinates, cropped to the overlap with the main frame
+    f_y0, f_x0 = f_tile[:2] if f_tile is not None else (0, 0)
+    f_y1, f_x1 = f_y0, f_x0
+    if f_rgb is not None:
+        f_y1, f_x1 = min(th, f_y0 + f_rgb.shape[0]), min(tw, f_x0 + f_rgb.shape[1])
+    if f_y1 <= f_y0 or f_x1 <= f_x0 or float_class == "transparent":
+        f_rgb = f_a = None
+    f_rect = (f_y0, f_y1, f_x0, f_x1)
+    if main_class == "opaque":
+        m_a = None
+    if float_class == "opaque":
+        f_a = None
+    # An opaque float over the whole frame hides the main layer and the background
+    float_covers = f_rgb is not None and f_a is None and f_rect == (0, th, 0, tw)
+    m_visible = m_rgb is not None and main_class != "transparent" and not float_covers
+
+    if RESIZE_BEFORE_BLEND and target_size is not None and cv2 is not None:
+        if min(target_size[0] / tw, target_size[1] / th) < 1.0:
+            # Downscaled output: shrink the layers first, blend at output resolution
+            return _composite_downscaled(main_img, m_rgb if m_visible else None, m_a, main_is_sbs,
+                                         float_img, f_rgb, f_a, float_is_sbs,
+                                         (th, tw), f_rect, target_size, f_tile is not None)
+
+    letterbox = target_size is not None and cv2 is not None and tuple(target_size) != (tw, th)
+
+    def composite_band(y0, y1, band):
+        """Background fill, main blend and float blend for rows y0:y1 of `out`."""
+        buf = out[y0:y1]
+        scratch = _band_scratch[band]
+        # 3. Apply Main Layer
+        if float_covers:
+            pass  # The float copy below overwrites the whole band
+        elif m_visible and m_a is None:
+            np.copyto(buf, m_rgb[y0:y1])  # Covers the whole band; no fill needed
+        else:
+            buf[:] = bg
+            if m_visible:
+                _blend_into(buf, m_rgb[y0:y1], m_a[y0:y1], scratch)
+        # 4. Apply Float Layer (only its rectangle)
+        fy0, fy1 = max(y0, f_y0), min(y1, f_y1)
+        if f_rgb is not None and fy1 > fy0:
+            target_view = buf[fy0 - y0:fy1 - y0, f_x0:f_x1]
+            source_view = f_rgb[fy0 - f_y0:fy1 - f_y0, :f_x1 - f_x0]
             if f_a is None:
                 target_view[:] = source_view
             else:
-                alpha_view = f_a[:h, :w]
-                mask = alpha_view > 0
-                if np.any(mask):
-                    alpha = alpha_view[mask][:, None].astype(np.uint16)
-                    src = source_view[mask].astype(np.uint16)
-                    dst = target_view[mask].astype(np.uint16)
+                _blend_into(target_view, source_view, f_a[fy0 - f_y0:fy1 - f_y0, :f_x1 - f_x0], scratch)
 
-                    blended = (src * alpha + dst * (255 - alpha)) // 255
-                    target_view[mask] = blended.astype(np.uint8)
+    with _cpu_buffer_lock:
+        # 2. Composite straight into the caller's frame, or into _cpu_buffer when it gets letterboxed
+        if not letterbox:
+            out = output_ring.acquire((th, tw, 3))
+        else:
+            if _cpu_buffer is None or _cpu_buffer.shape[:2] != (th, tw):
+                _cpu_buffer = np.empty((th, tw, 3), dtype=np.uint8)
+            out = _cpu_buffer
 
-        # Make a working copy for resize operations (releases lock early)
-        working_buffer = _cpu_buffer.copy()
+        _run_bands(composite_band, th, _band_count(th, tw))
+        if not letterbox:
+            return out
 
-    # 5. Final Resize (Letterboxed) with CACHING (outside lock)
-    if target_size is not None and cv2 is not None:
+        # 5. Final Resize (Letterboxed)
         target_w, target_h = target_size
 
-        if (tw, th) == (target_w, target_h):
-            return working_buffer
-
         # Calculate Scale
         scale = min(target_w / tw, target_h / th)
         new_w = int(tw * scale)
         new_h = int(th * scale)
 
-        # Fast Resize
-        resized = cv2.resize(working_buffer, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        # Fast Resize (cv2 parallelises this internally)
+        resized = cv2.resize(out, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+        # Center Paste
+        y_off = (target_h - new_h) // 2
+        x_off = (target_w - new_w) // 2
+        canvas = output_ring.acquire((target_h, target_w, 3))
+
+        def letterbox_band(y0, y1, band):
+            """Background bars and the pasted image for canvas rows y0:y1."""
+            rows = canvas[y0:y1]
+            p0, p1 = max(y0, y_off), min(y1, y_off + new_h)
+            if p0 >= p1:
+                rows[:] = bg
+                return
+            rows[:p0 - y0] = bg
+            rows[p1 - y0:] = bg
+            pasted = rows[p0 - y0:p1 - y0]
+            pasted[:, :x_off] = bg
+            pasted[:, x_off + new_w:] = bg
+            pasted[:, x_off:x_off + new_w] = resized[p0 - y_off:p1 - y_off]
+
+        _run_bands(letterbox_band, target_h, _band_count(target_h, target_w))
+        return canvas
+
+
+def _premultiplied(img, rgb, alpha, is_sbs):
+    """Layer as premultiplied RGBA (one cvtColor pass), so it can be resized without dark alpha fringes."""
+    if not is_sbs and img.ndim == 3 and img.shape[2] == 4 and rgb.shape[:2] == img.shape[:2]:
+        rgba = np.ascontiguousarray(img)
+    else:
+        rgba = np.dstack((rgb, alpha))
+    return cv2.cvtColor(rgba, cv2.COLOR_RGBA2mRGBA)
+
+
+def _blend_premultiplied_into(dst, src, scratch):
+    """dst = src.rgb + dst * (255 - src.a) / 255 for premultiplied RGBA `src`, in place."""
+    alpha = src[..., 3]
+    if not alpha.any():
+        return
+    if alpha.min() == 255:
+        np.copyto(dst, src[..., :3])
+        return
+    h, w = alpha.shape
+    s16, d16, inv16 = scratch.get(h, w)
+    np.subtract(255, alpha[..., None], out=inv16, dtype=np.uint16)
+    np.multiply(dst, inv16, out=d16, dtype=np.uint16)
+    # x // 255 as (x + 1 + (x >> 8)) >> 8 (see _blend_strip)
+    np.right_shift(d16, 8, out=s16)
+    np.add(d16, s16, out=d16)
+    np.add(d16, 1, out=d16)
+    np.right_shift(d16, 8, out=d16)
+    np.add(d16, src[..., :3], out=d16, dtype=np.uint16)
+    np.minimum(d16, 255, out=d16)  # Resampling can push rgb a hair past alpha
+    np.copyto(dst, d16, casting='unsafe')
+
+
+def _composite_downscaled(main_img, m_rgb, m_a, main_is_sbs, float_img, f_rgb, f_a, float_is_sbs,
+                          src_size, float_rect, target_size, float_is_tile=False):
+    """
+    Letterboxed composite for outputs smaller than the source: each layer is
+    resized (premultiplied, alpha included) to its output rectangle and the
+    blend runs at output resolution, instead of blending full frames and then
+    throwing most of the pixels away.
 
-        # Cache Canvas (minimal lock scope for cache management)
-        with _cpu_buffer_lock:
-            if _cached_canvas is None or _cached_canvas.shape[:2] != (target_h, target_w):
-                _cached_canvas = np.full((target_h, target_w, 3), (bg_r, bg_g, bg_b), dtype=np.uint8)
+    A float tile is warped onto the output grid the full layer would resize to,
+    with transparent borders, so it lands exactly where the full layer would.
+    """
+    th, tw = src_size
+    f_y0, f_y1, f_x0, f_x1 = float_rect
+    f_h, f_w = f_y1 - f_y0, f_x1 - f_x0  # Extent within f_rgb
+    target_w, target_h = target_size
+    scale = min(target_w / tw, target_h / th)
+    new_w, new_h = int(tw * scale), int(th * scale)
+    y_off = (target_h - new_h) // 2
+    x_off = (target_w - new_w) // 2
+
+    def shrink(img, w, h):
+        return cv2.resize(img, (w, h), interpolation=cv2.INTER_LINEAR)
+
+    # Resizes run outside the lock; they touch only the caller's frames
+    main_small = None
+    if m_rgb is not None:
+        main_small = shrink(m_rgb if m_a is None else _premultiplied(main_img, m_rgb, m_a, main_is_sbs), new_w, new_h)
+    float_small = None
+    fy0_s, fx0_s = int(f_y0 * scale), int(f_x0 * scale)
+    if float_is_tile:
+        fy1_s, fx1_s = min(new_h, math.ceil(f_y1 * scale)), min(new_w, math.ceil(f_x1 * scale))
+    else:
+        fy1_s, fx1_s = min(new_h, int(f_y1 * scale)), min(new_w, int(f_x1 * scale))
+    fh_s, fw_s = fy1_s - fy0_s, fx1_s - fx0_s
+    if f_rgb is not None and fw_s > 0 and fh_s > 0:
+        if f_a is None:
+            float_small = f_rgb[:f_h, :f_w]
+        elif f_a[:f_h, :f_w].any():
+            crop = float_img if (f_h, f_w) == f_rgb.shape[:2] else float_img[:f_h, :f_w]
+            float_small = _premultiplied(crop, f_rgb[:f_h, :f_w], f_a[:f_h, :f_w], float_is_sbs)
+        if float_small is not None and float_is_tile:
+            # Output pixel -> tile pixel, on the same sampling grid cv2.resize uses for the whole frame
+            sx, sy = tw / new_w, th / new_h
+            m = np.array([[sx, 0.0, (fx0_s + 0.5) * sx - 0.5 - f_x0],
+                          [0.0, sy, (fy0_s + 0.5) * sy - 0.5 - f_y0]])
+            float_small = cv2.warpAffine(float_small, m, (fw_s, fh_s), flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                                         borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+        elif float_small is not None:
+            float_small = shrink(float_small, fw_s, fh_s)
+
+    canvas = output_ring.acquire((target_h, target_w, 3))
+    canvas[:] = BACKGROUND_COLOR
+    region = canvas[y_off:y_off + new_h, x_off:x_off + new_w]
+    with _cpu_buffer_lock:
+        if not _band_scratch:
+            _band_scratch.append(_BlendScratch())
+        scratch = _band_scratch[0]
+        if main_small is not None:
+            if main_small.shape[2] == 3:
+                np.copyto(region, main_small)
+            else:
+                _blend_premultiplied_into(region, main_small, scratch)
+        if float_small is not None:
+            sub = region[fy0_s:fy0_s + fh_s, fx0_s:fx0_s + fw_s]
+            if float_small.shape[2] == 3:
+                np.copyto(sub, float_small)
             else:
-                _cached_canvas[:] = (bg_r, bg_g, bg_b)
+                _blend_premultiplied_into(sub, float_small, scratch)
+    return canvas
 
-            # Center Paste
-            y_off = (target_h - new_h) // 2
-            x_off = (target_w - new_w) // 2
-            _cached_canvas[y_off:y_off + new_h, x_off:x_off + new_w] = resized
 
-            # Return a copy
-            return _cached_canvas.copy()
+def _band_count(h, w):
+    """Row bands for an h x w frame: one per core, but none smaller than _BAND_MIN_PIXELS."""
+    threads = CPU_COMPOSITE_THREADS or os.cpu_count() or 1
+    return max(1, min(threads, h, (h * w) // _BAND_MIN_PIXELS))
 
-    return working_buffer
+
+def _run_bands(fn, rows, bands):
+    """
+    Call fn(y0, y1, band) over `bands` row ranges covering 0:rows, on the band pool
+    with this thread taking the first band. Caller holds _cpu_buffer_lock.
+    """
+    global _band_pool, _band_threads
+    while len(_band_scratch) < bands:
+        _band_scratch.append(_BlendScratch())
+    if bands <= 1:
+        fn(0, rows, 0)
+        return
+    if _band_pool is None or _band_threads < bands - 1:
+        if _band_pool is not None:
+            _band_pool.shutdown(wait=False)
+        _band_threads = bands - 1
+        _band_pool = ThreadPoolExecutor(max_workers=_band_threads, thread_name_prefix="composite-band")
+    edges = [rows * i // bands for i in range(bands + 1)]
+    futures = [_band_pool.submit(fn, edges[i], edges[i + 1], i) for i in range(1, bands)]
+    try:
+        fn(edges[0], edges[1], 0)
+    finally:
+        for fut in futures:
+            fut.result()
 
 
 def clear_cpu_caches():
     """Clear CPU compositor caches. Called when ASCII dimensions change to prevent stale data."""
-    global _cpu_buffer, _cached_canvas
+    global _cpu_buffer
     with _cpu_buffer_lock:
         _cpu_buffer = None
-        _cached_canvas = None
+    output_ring.clear()
@@ -6,6 +6,7 @@ from constantStorage.timezones import *
 from constantStorage.ascii_constants import *
 from constantStorage.server_constants import *
 from constantStorage.display_constants import *
+from constantStorage.loader_constants import *
 
 # -------------------------
 # Image Directories and Folder Paths
@@ -34,6 +35,7 @@ FPS = 60
 # Buffer settings: The BUFFER_SIZE is derived from IPS (e.g., 15 if IPS == 60)
 TOLERANCE = 10
 FIFO_LENGTH = 15
+FIFO_MAX_MB = 0  # Memory ceiling for buffered frames on top of FIFO_LENGTH; 0 = count only
 
 # Run mode stuff
 PINGPONG = True
@@ -0,0 +1,32 @@
+import unittest
+
+import numpy as np
+
+from composite_cache import CompositeCache
+
+
+class CompositeCacheTest(unittest.TestCase):
+    def test_lru_eviction_under_byte_budget(self):
+        cache = CompositeCache(300)
+        for name in ("a", "b", "c"):
+            cache.put(name, np.zeros(100, np.uint8))
+        self.assertIsNotNone(cache.get("a"))  # "b" is now least recently used
+        cache.put("d", b"x" * 100)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("d"), b"x" * 100)
+        stats = cache.get_stats()
+        self.assertEqual((stats['entries'], stats['bytes'], stats['evictions']), (3, 300, 1))
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+        self.assertAlmostEqual(stats['hit_rate'], 2 / 3)
+
+    def test_oversize_rejected_and_frames_frozen(self):
+        cache = CompositeCache(100)
+        self.assertFalse(cache.put("big", np.zeros(101, np.uint8)))
+        frame = np.zeros((4, 4, 3), np.uint8)
+        self.assertTrue(cache.put("small", frame))
+        with self.assertRaises(ValueError):
+            cache.get("small")[0, 0, 0] = 1
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,221 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+
+import renderer
+import turbojpeg_loader
+
+try:  # pragma: no cover - exercised implicitly through image_loader import
+    turbojpeg_loader.get_turbojpeg()
+except RuntimeError:  # pragma: no cover - fallback for environments without libturbojpeg
+    turbojpeg_loader.get_turbojpeg = lambda: None
+
+import image_loader
+from image_loader import ImageLoader, LayerTile
+from renderer import _BlendScratch, _blend_into
+
+
+def _masked_blend(dst, src, alpha):
+    """The gather/scatter blend composite_cpu used before _blend_into."""
+    out = dst.copy()
+    mask = alpha > 0
+    a = alpha[mask][:, None].astype(np.uint16)
+    blended = (src[mask].astype(np.uint16) * a + out[mask].astype(np.uint16) * (255 - a)) // 255
+    out[mask] = blended.astype(np.uint8)
+    return out
+
+
+class BlendIntoTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.dst = rng.integers(0, 256, (37, 53, 3), dtype=np.uint8)
+        self.src = rng.integers(0, 256, (37, 53, 3), dtype=np.uint8)
+        self.scratch = _BlendScratch()
+
+    def test_matches_masked_blend_exactly(self):
+        alpha = np.random.default_rng(8).integers(0, 256, (37, 53), dtype=np.uint8)
+        alpha[:10] = 0
+        alpha[-5:] = 255
+        expected = _masked_blend(self.dst, self.src, alpha)
+        dst = self.dst.copy()
+        self.assertEqual(_blend_into(dst, self.src, alpha, self.scratch), "mixed")
+        np.testing.assert_array_equal(dst, expected)
+
+    def test_opaque_and_transparent_fast_paths(self):
+        dst = self.dst.copy()
+        self.assertEqual(_blend_into(dst, self.src, np.zeros((37, 53), np.uint8), self.scratch), "transparent")
+        np.testing.assert_array_equal(dst, self.dst)
+        self.assertEqual(_blend_into(dst, self.src, np.full((37, 53), 255, np.uint8), self.scratch), "opaque")
+        np.testing.assert_array_equal(dst, self.src)
+
+    def test_composite_cpu_float_over_main(self):
+        main = np.dstack([self.dst, np.full((37, 53), 128, np.uint8)])
+        float_img = np.dstack([self.src, np.full((37, 53), 64, np.uint8)])
+        out = renderer.composite_cpu(main, float_img)
+        bg = np.empty_like(self.dst)
+        bg[:] = renderer.BACKGROUND_COLOR
+        expected = _masked_blend(_masked_blend(bg, self.dst, main[..., 3]), self.src, float_img[..., 3])
+        np.testing.assert_array_equal(out, expected)
+
+
+class BandParallelTest(unittest.TestCase):
+    def test_bands_match_single_threaded_output(self):
+        rng = np.random.default_rng(9)
+        main = rng.integers(0, 256, (61, 40, 4), dtype=np.uint8)
+        float_img = rng.integers(0, 256, (50, 48, 4), dtype=np.uint8)
+        float_img[:20, ..., 3] = 0
+        with mock.patch.object(renderer, 'CPU_COMPOSITE_THREADS', 1):
+            single = renderer.composite_cpu(main, float_img, target_size=(30, 40))
+        with mock.patch.object(renderer, 'CPU_COMPOSITE_THREADS', 4), \
+                mock.patch.object(renderer, '_BAND_MIN_PIXELS', 100):
+            self.assertEqual(renderer._band_count(61, 40), 4)
+            banded = renderer.composite_cpu(main, float_img, target_size=(30, 40))
+        np.testing.assert_array_equal(banded, single)
+
+
+class ResizeBeforeBlendTest(unittest.TestCase):
+    def test_downscaled_output_matches_blend_then_resize(self):
+        h, w = 120, 200
+        y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+        main = np.dstack([(x / w * 255).astype(np.uint8), (y / h * 255).astype(np.uint8),
+                          np.full((h, w), 90, np.uint8), np.full((h, w), 255, np.uint8)])
+        r = np.hypot((x - w * 0.6) / (w * 0.3), (y - h * 0.5) / (h * 0.3))
+        float_img = np.dstack([np.random.default_rng(3).integers(0, 256, (h, w, 3), dtype=np.uint8),
+                               (np.clip((1 - r) / 0.2, 0, 1) * 255).astype(np.uint8)])
+        float_img[..., :3][float_img[..., 3] > 0] = (250, 120, 0)  # Solid where visible, noise where transparent
+        with mock.patch.object(renderer, 'RESIZE_BEFORE_BLEND', False):
+            reference = renderer.composite_cpu(main, float_img, target_size=(64, 50))
+        out = renderer.composite_cpu(main, float_img, target_size=(64, 50))
+        diff = np.abs(out.astype(np.int16) - reference.astype(np.int16))
+        self.assertLessEqual(diff.max(), 4)
+        self.assertLess(diff.mean(), 0.5)
+
+
+class FloatTileTest(unittest.TestCase):
+    def _tile(self, layer, y0, y1, x0, x1):
+        tile = layer[y0:y1, x0:x1].view(LayerTile)
+        tile.tile_origin, tile.frame_size = (y0, x0), layer.shape[:2]
+        return tile
+
+    def test_tile_composites_like_the_full_layer(self):
+        rng = np.random.default_rng(11)
+        main = rng.integers(0, 256, (40, 60, 4), dtype=np.uint8)
+        layer = np.zeros((40, 60, 4), dtype=np.uint8)
+        layer[10:25, 20:50] = rng.integers(0, 256, (15, 30, 4), dtype=np.uint8)
+        tile = self._tile(layer, 9, 26, 19, 51)
+        np.testing.assert_array_equal(renderer.composite_cpu(main, tile), renderer.composite_cpu(main, layer))
+        with mock.patch.object(renderer, 'RESIZE_BEFORE_BLEND', True):
+            small = renderer.composite_cpu(main, tile, target_size=(30, 20))
+            reference = renderer.composite_cpu(main, layer, target_size=(30, 20))
+        self.assertLessEqual(np.abs(small.astype(np.int16) - reference.astype(np.int16)).max(), 2)
+
+    def test_tile_uv_rect(self):
+        layer = np.zeros((10, 20, 4), dtype=np.uint8)
+        self.assertEqual(renderer.tile_uv_rect(layer), renderer.FULL_RECT)
+        self.assertEqual(renderer.tile_uv_rect(self._tile(layer, 0, 5, 4, 20)), (4.5 / 20, 0.0, 1.0, 4.5 / 10))
+
+
+class MixedDecodeSizeTest(unittest.TestCase):
+    """Reduced-resolution decode shrinks WebP/JPEG layers only; slab and spz frames stay full size."""
+
+    def setUp(self):
+        self.main = np.full((360, 640, 4), 255, dtype=np.uint8)
+        self.main[..., :3] = 0
+        full = np.zeros((360, 640, 4), dtype=np.uint8)
+        full[:, :320] = 255  # White over the left half
+        self.full_float = full
+
+    def _webp_float(self, target):
+        ok, buf = cv2.imencode(".webp", cv2.cvtColor(self.full_float, cv2.COLOR_RGBA2BGRA),
+                               [cv2.IMWRITE_WEBP_QUALITY, 101])
+        self.assertTrue(ok)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "f.webp")
+            with open(path, "wb") as f:
+                f.write(buf.tobytes())
+            loader = ImageLoader()
+            loader.set_target_size(target)
+            return loader._read_webp(path)[0]
+
+    @unittest.skipIf(image_loader._libwebp is None, "libwebp not available")
+    def test_small_webp_float_over_full_size_slab_main(self):
+        float_img = self._webp_float((200, 113))
+        self.assertEqual(float_img.shape, (135, 240, 4))  # 0.3125 snaps to 3/8, as TurboJPEG would
+        for target in (None, (200, 113)):
+            out = renderer.composite_cpu(self.main, float_img, target_size=target)
+            reference = renderer.composite_cpu(self.main, self.full_float, target_size=target)
+            white = (out == 255).all(axis=2)
+            mid = out.shape[0] // 2
+            self.assertAlmostEqual(white[mid].sum(), (reference[mid] == 255).all(axis=1).sum(), delta=2)
+            self.assertTrue(white[-2, 2])  # Bottom-left is covered too, not just a top-left patch
+            renderer.release_output(out)
+            renderer.release_output(reference)
+
+    def test_small_float_tile_lands_where_the_full_one_would(self):
+        small = cv2.resize(self.full_float, (160, 90), interpolation=cv2.INTER_AREA)
+        tile = small[10:80, 0:81].view(LayerTile)
+        tile.tile_origin, tile.frame_size = (10, 0), (90, 160)
+        out = renderer.composite_cpu(self.main, tile)
+        white = (out == 255).all(axis=2)
+        self.assertEqual(out.shape, (360, 640, 3))
+        self.assertTrue(white[40:320, 2:318].all())
+        self.assertFalse(white[:36].any() or white[324:].any() or white[:, 324:].any())
+        renderer.release_output(out)
+
+
+class OpacityClassTest(unittest.TestCase):
+    def test_classes_skip_work_without_changing_output(self):
+        rng = np.random.default_rng(13)
+        main = rng.integers(0, 256, (30, 40, 4), dtype=np.uint8)
+        main[..., 3] = 255
+        clear = rng.integers(0, 256, (30, 40, 4), dtype=np.uint8)
+        clear[..., 3] = 0
+        solid = rng.integers(0, 256, (30, 40, 4), dtype=np.uint8)
+        solid[..., 3] = 255
+        for target in (None, (20, 15)):
+            np.testing.assert_array_equal(
+                renderer.composite_cpu(main, clear, target_size=target, main_class="opaque", float_class="transparent"),
+                renderer.composite_cpu(main, clear, target_size=target))
+            np.testing.assert_array_equal(
+                renderer.composite_cpu(main, solid, target_size=target, main_class="opaque", float_class="opaque"),
+                renderer.composite_cpu(main, solid, target_size=target))
+        self.assertFalse(renderer.main_visible("opaque", "opaque"))
+        self.assertEqual(renderer.float_uv_rect(clear, "transparent"), renderer.EMPTY_RECT)
+
+
+class OutputRingTest(unittest.TestCase):
+    def test_released_frames_are_reused_without_copies(self):
+        ring = renderer.OutputRing(depth=2)
+        with mock.patch.object(renderer, 'output_ring', ring):
+            main = np.random.default_rng(5).integers(0, 256, (20, 30, 3), dtype=np.uint8)
+            a = renderer.composite_cpu(main, None)
+            b = renderer.composite_cpu(main, None)
+            self.assertIsNot(a, b)
+            np.testing.assert_array_equal(a, main)
+            renderer.release_output(a)
+            self.assertIs(renderer.composite_cpu(main, None), a)
+            renderer.composite_cpu(main, None)  # Both buffers out: a one-off array
+        stats = ring.get_stats()
+        self.assertEqual((stats['allocations'], stats['reuses'], stats['overflows']), (2, 1, 1))
+
+    def test_debug_detects_double_release_and_write_after_release(self):
+        ring = renderer.OutputRing(depth=1, debug=True)
+        buf = ring.acquire((4, 4, 3))
+        stale = buf[:2]
+        ring.release(buf)
+        with self.assertRaises(RuntimeError):
+            ring.release(buf)
+        with self.assertRaises(ValueError):
+            buf[0, 0, 0] = 1
+        stale[0, 0, 0] = 1  # View taken while owned is still writable
+        with self.assertRaises(RuntimeError):
+            ring.acquire((4, 4, 3))
+        self.assertEqual(ring.get_stats()['violations'], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
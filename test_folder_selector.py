@@ -0,0 +1,40 @@
+import unittest
+
+from folder_selector import (LOCAL_CONTROLFPS, project_folder_selection, update_folder_selection,
+                             upcoming_folder_switches)
+
+
+class FolderProjectionTest(unittest.TestCase):
+    def _state(self):
+        state = {}
+        update_folder_selection(0, 5, 6, state, now=1000.0)
+        return state
+
+    def test_projection_matches_live_calls_and_leaves_state_alone(self):
+        state = self._state()
+        rng_state = state['rng'].getstate()
+        pre_main = list(state['pre_main'])
+        # Through the rest zone into several active picks
+        indices = list(range(1, 12 * LOCAL_CONTROLFPS))
+        projected = project_folder_selection(indices, 5, 6, state, now=1000.0, ips=30)
+
+        self.assertEqual(state['rng'].getstate(), rng_state)
+        self.assertEqual(list(state['pre_main']), pre_main)
+        live = [update_folder_selection(idx, 5, 6, state, now=1000.0 + step / 30)
+                for step, idx in enumerate(indices, 1)]
+        self.assertEqual(projected, live)
+
+    def test_switches_list_only_changes(self):
+        state = self._state()
+        indices = list(range(1, 12 * LOCAL_CONTROLFPS))
+        switches = upcoming_folder_switches(indices, 5, 6, state, now=1000.0, ips=30)
+        self.assertTrue(switches)
+        pairs = project_folder_selection(indices, 5, 6, state, now=1000.0, ips=30)
+        for step, idx, pair in switches:
+            self.assertEqual(pairs[step - 1], pair)
+            self.assertEqual(indices[step - 1], idx)
+        self.assertEqual(len({s[0] for s in switches}), len(switches))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+from unittest import mock
+
+import index_calculator
+import settings
+from frame_pacer import NS, CaptureGate, FramePacer
+
+
+class FakeClock:
+    """Stands in for perf_counter_ns / time_ns and sleep. Every read advances 1 us so spin-waits end."""
+
+    def __init__(self, start_ns):
+        self.now = start_ns
+
+    def __call__(self):
+        self.now += 1_000
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += int(seconds * NS)
+
+
+class FramePacerTest(unittest.TestCase):
+    def _pacer(self, fps, **kwargs):
+        self.clock = FakeClock(10 * NS)
+        return FramePacer(fps, clock=self.clock, sleep=self.clock.sleep, **kwargs)
+
+    def test_wakes_on_grid_without_drift(self):
+        pacer = self._pacer(200, spin_ns=500_000)
+        start = pacer.frame
+        for _ in range(10):
+            self.assertLess(pacer.wait(), 10_000)
+            self.assertGreaterEqual(self.clock.now, pacer.deadline(pacer.frame))
+        self.assertEqual(pacer.frame - start, 10)
+        self.assertEqual(pacer.deadline(start + 10) - pacer.deadline(start), NS // 20)
+
+    def test_late_frame_catches_up_and_long_stall_skips(self):
+        pacer = self._pacer(100, spin_ns=0)
+        pacer.wait()
+        self.clock.sleep(0.015)  # 1.5 frames of work: the next deadline has passed, but not a whole frame ago
+        self.assertGreaterEqual(pacer.wait(), 5_000_000)
+        first = pacer.frame
+        pacer.wait()  # Sleeps only to the next grid deadline, ~5 ms away
+        self.assertEqual(pacer.frame, first + 1)
+        self.assertLess(self.clock.now - pacer.deadline(pacer.frame), 10_000)
+        self.assertEqual(pacer.get_stats()['skipped'], 0)
+        self.clock.sleep(0.055)  # Wakes ~45 ms past the next deadline: deadlines 4..7 are gone
+        pacer.wait()
+        stats = pacer.get_stats()
+        self.assertEqual(stats['skipped'], 4)
+        self.assertEqual(pacer.frame, first + 6)
+        self.assertEqual(sum(stats['late_hist'].values()), stats['frames'])
+
+    def test_anchor_puts_boundaries_on_the_clock_grid(self):
+        wall = FakeClock(1_700_000_000 * NS)
+        anchor = wall.now - 1_234_567
+        pacer = self._pacer(50, anchor_ns=anchor, wall_clock=wall)
+        phase_wall = ((wall.now - anchor) * 50 % NS) // 50
+        phase_pacer = self.clock.now - pacer.deadline(pacer.frame)
+        self.assertLess(abs(phase_wall - phase_pacer), 10_000)
+
+
+class CaptureGateTest(unittest.TestCase):
+    def _captures(self, seconds, slack=True):
+        """The headless event loop on a fake clock: wake on index changes, capture when the gate is open."""
+        clock = FakeClock(0)
+        gate = CaptureGate(settings.SERVER_CAPTURE_RATE, settings.IPS, clock=clock)
+        if not slack:
+            gate.slack_ns = 0
+        captures, last_index = 0, None
+        with mock.patch.object(index_calculator, 'launch_time', 0):
+            while clock.now < seconds * NS:
+                index = clock.now * settings.IPS // NS
+                if index != last_index and gate.ready():
+                    clock.sleep(0.0002)  # Stamped a little after the wake-up
+                    gate.mark()
+                    last_index = index
+                    captures += 1
+                clock.sleep(0.002)  # Render + encode
+                wake = index_calculator.next_index_change_ns(100_000, False, max(clock.now, gate.next_slot_ns()))
+                clock.now = max(clock.now, wake) + 300_000  # Wake-up latency
+        return captures
+
+    def test_one_capture_per_index_change_at_defaults(self):
+        changes = 3 * settings.IPS
+        expected = 3 * min(settings.IPS, settings.SERVER_CAPTURE_RATE)
+        self.assertGreaterEqual(self._captures(3), expected - 2)
+        self.assertLessEqual(self._captures(3), changes)
+        self.assertLess(self._captures(3, slack=False), expected * 0.6)  # Full-interval gate skips every other change
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,345 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+
+import turbojpeg_loader
+
+try:  # pragma: no cover - exercised implicitly through image_loader import
+    turbojpeg_loader.get_turbojpeg()
+except RuntimeError:  # pragma: no cover - fallback for environments without libturbojpeg
+    turbojpeg_loader.get_turbojpeg = lambda: None
+
+import image_loader
+from image_loader import TOLERANCE, DecodedFrameCache, DecodeBufferPool, FIFOImageBuffer, ImageLoader, TranscodeCache
+
+
+def _frame(nbytes=100):
+    return np.zeros(nbytes, dtype=np.uint8)
+
+
+class DecodedFrameCacheTest(unittest.TestCase):
+    def test_hit_miss_counters(self):
+        cache = DecodedFrameCache(1000, png_paths_len=10)
+        self.assertIsNone(cache.get("a.webp"))
+        cache.put("a.webp", 0, _frame(), False)
+        img, is_sbs = cache.get("a.webp")
+        self.assertEqual(img.nbytes, 100)
+        self.assertFalse(is_sbs)
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['bytes'], 100)
+
+    def test_cached_arrays_are_read_only(self):
+        cache = DecodedFrameCache(1000, png_paths_len=10)
+        img = _frame()
+        cache.put("a.webp", 0, img, False)
+        self.assertFalse(img.flags.writeable)
+
+    def test_duplicate_put_leaves_the_array_with_the_caller(self):
+        cache = DecodedFrameCache(1000, png_paths_len=10)
+        first, dup = _frame(), _frame()
+        self.assertTrue(cache.put("a.webp", 0, first, False))
+        self.assertFalse(cache.put("a.webp", 0, dup, False))
+        self.assertIs(cache.get("a.webp")[0], first)
+        self.assertTrue(dup.flags.writeable)
+
+    def test_evicts_frame_furthest_ahead_of_playhead(self):
+        cache = DecodedFrameCache(300, png_paths_len=10, pingpong=False)
+        cache.set_playhead(0, 1)
+        cache.put("1", 1, _frame(), False)
+        cache.put("2", 2, _frame(), False)
+        cache.put("9", 9, _frame(), False)
+        cache.put("3", 3, _frame(), False)
+        self.assertIsNone(cache.get("9"))
+        self.assertIsNotNone(cache.get("3"))
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+
+    def test_pingpong_keeps_frames_behind_turnaround(self):
+        # Heading up towards N-1: the frame just behind us comes back right after the turn,
+        # while the start of the sequence is a whole half-period away.
+        cache = DecodedFrameCache(200, png_paths_len=10, pingpong=True)
+        cache.set_playhead(8, 1)
+        cache.put("7", 7, _frame(), False)
+        cache.put("0", 0, _frame(), False)
+        cache.put("9", 9, _frame(), False)
+        self.assertIsNotNone(cache.get("7"))
+        self.assertIsNotNone(cache.get("9"))
+        self.assertIsNone(cache.get("0"))
+
+    def test_rejects_frame_needed_later_than_everything_cached(self):
+        cache = DecodedFrameCache(200, png_paths_len=10, pingpong=False)
+        cache.set_playhead(0, 1)
+        cache.put("1", 1, _frame(), False)
+        cache.put("2", 2, _frame(), False)
+        self.assertFalse(cache.put("8", 8, _frame(), False))
+        self.assertEqual(cache.get_stats()['rejected'], 1)
+        self.assertIsNotNone(cache.get("1"))
+
+
+class DecodeBufferPoolTest(unittest.TestCase):
+    def test_released_buffer_is_reused(self):
+        pool = DecodeBufferPool()
+        a = pool.acquire((4, 4, 4))
+        pool.release(a)
+        b = pool.acquire((4, 4, 4))
+        self.assertIs(a, b)
+        stats = pool.get_stats()
+        self.assertEqual((stats['allocations'], stats['reuses']), (1, 1))
+
+    def test_retained_buffer_is_not_recycled_until_last_release(self):
+        pool = DecodeBufferPool()
+        a = pool.acquire((4, 4, 4))
+        pool.retain(a)
+        pool.release(a)
+        self.assertIsNot(pool.acquire((4, 4, 4)), a)
+        pool.release(a)
+        self.assertIs(pool.acquire((4, 4, 4)), a)
+
+    def test_foreign_and_detached_arrays_are_ignored(self):
+        pool = DecodeBufferPool()
+        pool.release(np.empty((4, 4, 4), dtype=np.uint8))
+        a = pool.acquire((4, 4, 4))
+        pool.detach(a)
+        pool.release(a)
+        self.assertEqual(pool.get_stats()['free'], 0)
+
+    def test_dropped_buffers_are_forgotten(self):
+        pool = DecodeBufferPool()
+        pool.acquire((4, 4, 4))
+        self.assertEqual(pool.get_stats()['outstanding'], 0)
+
+    def test_fifo_releases_what_it_drops(self):
+        dropped = []
+        fifo = FIFOImageBuffer(max_size=2, on_drop=dropped.append)
+        for i in range(3):
+            fifo.update(i, (f"m{i}", f"f{i}", False, False))
+        self.assertEqual(dropped, [("m0", "f0", False, False)])
+
+    def test_fifo_get_pins_the_frame_before_update_can_recycle_it(self):
+        loader = ImageLoader(buffer_pool=4)
+        pool = loader.buffer_pool
+        m, f = pool.acquire((4, 4, 4)), pool.acquire((4, 4, 4))
+        fifo = FIFOImageBuffer(max_size=2, on_drop=loader.release_frame, on_get=loader.retain_frame)
+        fifo.update(0, (m, f, False, False))
+        fifo.get(0)
+        fifo.update(0, (pool.acquire((4, 4, 4)), pool.acquire((4, 4, 4)), False, False))  # Replaces entry 0
+        self.assertEqual(pool.get_stats()['free'], 0)  # Still on screen
+        loader.release_frame((m, f))
+        self.assertEqual(pool.get_stats()['free'], 2)
+
+
+class FIFOImageBufferTest(unittest.TestCase):
+    def _fifo(self, indices, max_size=8):
+        dropped = []
+        fifo = FIFOImageBuffer(max_size=max_size, on_drop=dropped.append)
+        for i in indices:
+            fifo.update(i, (i, i, False, False))
+        return fifo, dropped
+
+    def test_exact_then_nearest_within_tolerance(self):
+        fifo, _ = self._fifo([100, 104])
+        self.assertEqual(fifo.get(100)[0], 100)
+        self.assertEqual(fifo.get(103)[0], 104)
+        self.assertIsNone(fifo.get(104 + TOLERANCE + 1))
+
+    def test_passed_frames_go_stale(self):
+        fifo, dropped = self._fifo([0, 1, 2, 50])
+        fifo.get(0)
+        fifo.get(2 + TOLERANCE + 1)
+        self.assertEqual(sorted(d[0] for d in dropped), [0, 1, 2])
+        self.assertEqual(fifo.get_stats()['stale_count'], 3)
+        self.assertFalse(fifo.update(1, (1, 1, False, False)))
+
+    def test_full_buffer_evicts_farthest_ahead(self):
+        fifo, dropped = self._fifo([10, 11, 12], max_size=3)
+        fifo.get(10)
+        self.assertTrue(fifo.update(13, (13, 13, False, False)) is False)
+        self.assertEqual([d[0] for d in dropped], [13])
+        self.assertTrue(fifo.update(9, (9, 9, False, False)))
+        self.assertEqual(dropped[-1][0], 12)
+
+    def test_direction_flip_keeps_frames_ahead(self):
+        fifo, dropped = self._fifo([90, 95, 99])
+        fifo.get(90)
+        fifo.get(99)
+        fifo.get(98)  # Ping-pong pivot: heading back down
+        self.assertEqual(dropped, [])
+        self.assertEqual(fifo.get(95)[0], 95)
+
+    def test_loop_wrap_is_a_forward_step(self):
+        # pingpong=False: frames for the next loop are prefetched while the playhead nears N-1
+        self.assertEqual(TOLERANCE, 10)
+        dropped = []
+        fifo = FIFOImageBuffer(max_size=10, on_drop=dropped.append, length=100, pingpong=False)
+        for i in (80, 90, 95, 99, 0, 1):
+            fifo.update(i, (i, i, False, False))
+        fifo.get(90)
+        fifo.get(99)
+        self.assertTrue(fifo.update(2, (2, 2, False, False)))  # Next loop is ahead, not stale
+        self.assertEqual(fifo.get(0)[0], 0)  # Wrap: 90 is exactly TOLERANCE behind and stays
+        self.assertEqual(fifo.direction, 1)
+        fifo.get(3)
+        self.assertEqual([d[0] for d in dropped], [80, 90])
+        self.assertEqual(sorted(fifo.entries), [0, 1, 2, 95, 99])
+        self.assertEqual(fifo.get(98)[0], 99)  # Nearest neighbour across the wrap
+
+    def test_byte_budget_evicts_and_accounts_shared_layers_once(self):
+        dropped = []
+        fifo = FIFOImageBuffer(max_size=0, on_drop=dropped.append, max_bytes=350)
+        for i in range(3):
+            layer = _frame()
+            fifo.update(i, (layer, layer, False, False))  # One array for both layers: 100 bytes
+        self.assertEqual((fifo.current_bytes(), dropped), (300, []))
+        fifo.get(3)
+        self.assertTrue(fifo.update(4, (_frame(), _frame(), False, False)))
+        self.assertEqual([d[0].nbytes for d in dropped], [100, 100])
+        stats = fifo.get_stats()
+        self.assertEqual((stats['depth'], stats['bytes'], stats['budget_drops']), (2, 300, 2))
+
+
+class DecodeScaleTest(unittest.TestCase):
+    def test_full_resolution_without_target(self):
+        self.assertEqual(ImageLoader()._decode_scale(1920, 1080), 1.0)
+
+    def test_contain_fits_inside_target(self):
+        loader = ImageLoader()
+        loader.set_target_size((480, 600), "contain")
+        self.assertAlmostEqual(loader._decode_scale(1920, 1080), 0.25)
+
+    def test_cover_fills_target(self):
+        loader = ImageLoader()
+        loader.set_target_size((60, 80), "cover")
+        self.assertAlmostEqual(loader._decode_scale(1200, 800), 0.1)
+
+    def test_never_upscales(self):
+        loader = ImageLoader()
+        loader.set_target_size((4000, 4000))
+        self.assertEqual(loader._decode_scale(640, 480), 1.0)
+
+    @unittest.skipIf(image_loader._libwebp is None, "libwebp not available")
+    def test_webp_decodes_full_size_without_scaling_api(self):
+        ok, buf = cv2.imencode(".webp", np.zeros((40, 60, 4), dtype=np.uint8))
+        self.assertTrue(ok)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "0.webp")
+            with open(path, "wb") as f:
+                f.write(buf.tobytes())
+            loader = ImageLoader()
+            loader.set_target_size((15, 10))
+            self.assertEqual(loader._read_webp(path)[0].shape, (10, 15, 4))
+            with mock.patch.object(image_loader._libwebp, 'has_scaled_decode', False):
+                self.assertEqual(loader._read_webp(path)[0].shape, (40, 60, 4))
+
+
+class SlabReadTest(unittest.TestCase):
+    def test_slab_frame_is_zero_copy_memmap_slice(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            slab_path = os.path.join(tmp, "frames.npy")
+            np.save(slab_path, np.arange(2 * 2 * 3 * 4, dtype=np.uint8).reshape(2, 2, 3, 4))
+            loader = ImageLoader()
+            img, is_sbs = loader.read_image(f"{slab_path}#1")
+            self.assertFalse(is_sbs)
+            self.assertEqual(img.shape, (2, 3, 4))
+            self.assertEqual(int(img[0, 0, 0]), 24)
+            self.assertIsInstance(img.base, np.memmap)
+            self.assertIs(loader.read_image(f"{slab_path}#0")[0].base, img.base)
+            del img, loader
+
+
+class LayerDecodeTest(unittest.TestCase):
+    def _spz(self, tmp, name, value):
+        path = os.path.join(tmp, name)
+        with open(path, "wb") as f:
+            np.savez_compressed(f, image=np.full((2, 2, 4), value, dtype=np.uint8))
+        return path
+
+    def test_layers_decode_in_parallel_and_shared_path_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            a, b = self._spz(tmp, "a.spz", 1), self._spz(tmp, "b.spz", 2)
+            loader = ImageLoader([[a, a]], [[b]], layer_threads=1)
+            main_img, float_img, _, _ = loader.load_images(0, 0, 0)
+            self.assertEqual((int(main_img[0, 0, 0]), int(float_img[0, 0, 0])), (1, 2))
+            loader.set_paths([[a]], [[a]])
+            main_img, float_img, _, _ = loader.load_images(0, 0, 0)
+            self.assertIs(main_img, float_img)
+            stats = loader.get_layer_stats()
+            self.assertEqual((stats['parallel'], stats['shared']), (1, 1))
+            loader.close()
+
+    def test_sparse_float_layer_becomes_a_tile(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            a = self._spz(tmp, "a.spz", 1)
+            path = os.path.join(tmp, "f.spz")
+            layer = np.zeros((20, 30, 4), dtype=np.uint8)
+            layer[5:8, 10:14] = 200
+            with open(path, "wb") as f:
+                np.savez_compressed(f, image=layer)
+            loader = ImageLoader([[a]], [[path]], sparse_float=0.5)
+            _, tile, _, _ = loader.load_images(0, 0, 0)
+            self.assertEqual((tile.tile_origin, tile.frame_size, tile.shape), ((4, 9), (20, 30), (5, 6, 4)))
+            np.testing.assert_array_equal(tile, layer[4:9, 9:15])
+            self.assertEqual(loader.get_layer_stats()['tiles'], 1)
+
+    def test_opacity_classes_are_cached_per_path(self):
+        loader = ImageLoader()
+        opaque = np.full((4, 4, 4), 255, dtype=np.uint8)
+        clear = np.zeros((4, 4, 4), dtype=np.uint8)
+        sbs = np.zeros((4, 8, 3), dtype=np.uint8)
+        sbs[0, 4:] = 255
+        self.assertEqual(loader.classify_layers(("m", "f"), (opaque, clear), (False, False)), ("opaque", "transparent"))
+        self.assertEqual(loader.classify_layers(("s", "f"), (sbs, clear), (True, False)), ("mixed", "transparent"))
+        self.assertEqual(loader.classify_layers(("a", "b"), ({}, "text"), (False, False)), (None, None))
+        stats = loader.get_opacity_stats()
+        self.assertEqual(stats['scans'], 3)
+        self.assertEqual(stats['float']['transparent'], 2)
+        self.assertEqual((stats['main']['opaque'], stats['main']['mixed']), (1, 1))
+
+    def test_failed_layer_fails_the_frame(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            a = self._spz(tmp, "a.spz", 1)
+            loader = ImageLoader([[a]], [[os.path.join(tmp, "missing.spz")]], layer_threads=1)
+            with self.assertRaises(OSError):
+                loader.load_images(0, 0, 0)
+            loader.close()
+
+
+class TranscodeCacheTest(unittest.TestCase):
+    def test_spz_served_from_raw_memmap_after_first_read(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "frame.spz")
+            frame = np.arange(4 * 5 * 4, dtype=np.uint8).reshape(4, 5, 4)
+            with open(src, "wb") as f:
+                np.savez_compressed(f, image=frame)
+            loader = ImageLoader(transcode_dir=os.path.join(tmp, "cache"), transcode_bytes=1 << 20)
+            first, _ = loader.read_image(src)
+            second, _ = loader.read_image(src)
+            self.assertNotIsInstance(first, np.memmap)
+            self.assertIsInstance(second, np.memmap)
+            np.testing.assert_array_equal(second, frame)
+            stats = loader.transcode_cache.get_stats()
+            self.assertEqual((stats['hits'], stats['misses'], stats['writes']), (1, 1, 1))
+            del first, second
+
+    def test_changed_source_misses_and_budget_evicts_oldest(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = TranscodeCache(os.path.join(tmp, "cache"), 2 * (100 + 128))
+            paths = []
+            for i in range(3):
+                path = os.path.join(tmp, f"{i}.npz")
+                np.savez(path, np.zeros(100, dtype=np.uint8))
+                cache.store(path, np.full(100, i, dtype=np.uint8))
+                paths.append(path)
+            self.assertEqual(cache.get_stats()['evictions'], 1)
+            self.assertIsNone(cache.lookup(paths[0]))
+            self.assertEqual(int(cache.lookup(paths[2])[0]), 2)
+            with open(paths[2], "ab") as f:
+                f.write(b"x")
+            self.assertIsNone(cache.lookup(paths[2]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+from unittest import mock
+
+import index_calculator
+from index_calculator import IPS, _free_clock_position, next_index_change_ns
+
+TICK_NS = 1_000_000_000 / IPS
+
+
+class NextIndexChangeTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(index_calculator, 'launch_time', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _index_at(self, ns, total, pingpong=True):
+        return _free_clock_position((ns * IPS) // 1_000_000_000, total, pingpong)
+
+    def test_wakes_on_the_first_nanosecond_of_the_next_index(self):
+        after = int(2.5 * TICK_NS)
+        wake = next_index_change_ns(10, after_ns=after)
+        self.assertEqual(self._index_at(wake - 1, 10), self._index_at(after, 10))
+        self.assertEqual(self._index_at(wake, 10), 3)
+
+    def test_steps_over_pingpong_pivot(self):
+        after = int(4.5 * TICK_NS)  # Index 4 of 5, the next tick repeats it
+        wake = next_index_change_ns(5, after_ns=after)
+        self.assertEqual(self._index_at(wake - 1, 5), 4)
+        self.assertEqual(self._index_at(wake, 5), 3)
+        self.assertAlmostEqual(wake / TICK_NS, 6, places=3)
+
+
+if __name__ == "__main__":
+    unittest.main()
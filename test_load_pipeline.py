@@ -0,0 +1,71 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import numpy as np
+
+import turbojpeg_loader
+
+try:  # pragma: no cover - exercised implicitly through image_loader import
+    turbojpeg_loader.get_turbojpeg()
+except RuntimeError:  # pragma: no cover - fallback for environments without libturbojpeg
+    turbojpeg_loader.get_turbojpeg = lambda: None
+
+from image_loader import ImageLoader
+from load_pipeline import DeadlinePool, LoadPipeline
+
+
+def _load(loader, index, main_folder, float_folder, raw=None):
+    return loader.load_images(index, main_folder, float_folder, raw)
+
+
+class LoadPipelineTest(unittest.TestCase):
+    def test_frames_decode_from_pre_read_bytes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for i in range(4):
+                path = os.path.join(tmp, f"{i}.spz")
+                with open(path, "wb") as f:
+                    np.savez_compressed(f, image=np.full((3, 4, 4), i, dtype=np.uint8))
+                paths.append([path])
+            loader = ImageLoader(paths, paths)
+            with LoadPipeline(io_threads=1, decode_threads=2, queue_depth=1) as pipeline:
+                futures = [pipeline.submit(_load, loader, i, 0, 0) for i in range(4)]
+                results = [f.result(timeout=5) for f in futures]
+            for i, (main_img, float_img, _, _) in enumerate(results):
+                self.assertEqual(int(main_img[0, 0, 0]), i)
+                self.assertEqual(int(float_img[0, 0, 0]), i)
+            stats = pipeline.get_stats()
+            self.assertEqual((stats['io_done'], stats['decode_done']), (4, 4))
+            self.assertGreater(stats['bytes_read'], 0)
+            self.assertGreater(loader.read_buffers.get_stats()['reuses'], 0)
+
+    def test_read_error_reaches_future(self):
+        loader = ImageLoader([["/nonexistent/0.webp"]], [["/nonexistent/0.webp"]])
+        with LoadPipeline(io_threads=1, decode_threads=1) as pipeline:
+            fut = pipeline.submit(_load, loader, 0, 0, 0)
+            with self.assertRaises(OSError):
+                fut.result(timeout=5)
+        self.assertEqual(pipeline.get_stats()['io_errors'], 1)
+
+
+class DeadlinePoolTest(unittest.TestCase):
+    def test_earliest_deadline_first_and_expired_skipped(self):
+        gate = threading.Event()
+        order = []
+        with DeadlinePool(max_workers=1) as pool:
+            pool.submit(gate.wait)  # Occupy the only worker
+            now = time.monotonic()
+            late = pool.submit_with_deadline(now - 1.0, order.append, "late")
+            pool.submit_with_deadline(now + 20.0, order.append, "second")
+            pool.submit_with_deadline(now + 10.0, order.append, "first")
+            gate.set()
+        self.assertEqual(order, ["first", "second"])
+        self.assertTrue(late.cancelled())
+        self.assertEqual(pool.get_stats()['expired'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
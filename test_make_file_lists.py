@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import make_file_lists
+
+
+class SlabListingTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self.tmp.name, "1_face")
+        os.makedirs(self.folder)
+        slab = np.lib.format.open_memmap(
+            os.path.join(self.folder, "frames.npy"), mode='w+', dtype=np.uint8, shape=(3, 4, 6, 4))
+        slab[:] = np.arange(3, dtype=np.uint8)[:, None, None, None]
+        slab.flush()
+        del slab
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_slab_folder_counts_frames(self):
+        self.assertEqual(make_file_lists.count_image_files(self.folder), 3)
+
+    def test_scan_reports_slab_geometry(self):
+        results = make_file_lists.scan_directory_recursive(self.tmp.name, self.tmp.name, 'main')
+        self.assertEqual(results, [(self.folder, "frames.npy", 6, 4, True, 3)])
+
+    def test_sorted_files_address_each_frame(self):
+        (frames,) = make_file_lists.sort_image_files({0: self.folder})
+        slab_path = os.path.join(self.folder, "frames.npy")
+        self.assertEqual(frames, [f"{slab_path}#0", f"{slab_path}#1", f"{slab_path}#2"])
+
+    def test_ascii_stack_npy_is_not_a_slab(self):
+        os.remove(os.path.join(self.folder, "frames.npy"))
+        np.save(os.path.join(self.folder, "frames.npy"), np.zeros((2, 4, 6), dtype=np.uint8))
+        self.assertIsNone(make_file_lists.slab_shape(self.folder))
+
+
+if __name__ == "__main__":
+    unittest.main()
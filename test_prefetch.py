@@ -0,0 +1,90 @@
+import unittest
+from concurrent.futures import Future
+
+import turbojpeg_loader
+
+try:  # pragma: no cover - exercised implicitly through image_loader import
+    turbojpeg_loader.get_turbojpeg()
+except RuntimeError:  # pragma: no cover - fallback for environments without libturbojpeg
+    turbojpeg_loader.get_turbojpeg = lambda: None
+
+from image_loader import FIFOImageBuffer
+from prefetch import PrefetchScheduler
+
+
+class _ManualPool:
+    """Executor stand-in whose futures complete only when the test says so."""
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, fn, *args, **kwargs):
+        fut = Future()
+        self.jobs.append((fut, fn, args, kwargs))
+        return fut
+
+    def run_all(self):
+        jobs, self.jobs = self.jobs, []
+        for fut, fn, args, kwargs in jobs:
+            fut.set_result(fn(*args, **kwargs))
+
+
+class _Loader:
+    def __init__(self):
+        self.released = []
+
+    def release_frame(self, data):
+        self.released.append(data)
+
+
+def _load(loader, index, main_folder, float_folder):
+    return (index, (main_folder, float_folder), False, False)
+
+
+class PrefetchSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = _ManualPool()
+        self.loader = _Loader()
+        self.fifo = FIFOImageBuffer(max_size=10)
+        self.prefetch = PrefetchScheduler(self.pool, self.loader, self.fifo, _load, total=100, window=4)
+
+    def test_window_is_filled_once(self):
+        self.prefetch.advance(10, 1, (0, 0))
+        self.assertEqual([job[2][1] for job in self.pool.jobs], [11, 12, 13, 14])
+        self.prefetch.advance(11, 1, (0, 0))
+        self.assertEqual(len(self.pool.jobs), 5)
+        self.assertEqual(self.prefetch.get_stats()['fill'], 3)
+        self.pool.run_all()
+        self.prefetch.advance(12, 1, (0, 0))
+        self.assertEqual([job[2][1] for job in self.pool.jobs], [16])
+        self.assertEqual(self.fifo.get(13)[0], 13)
+
+    def test_miss_causes(self):
+        self.prefetch.advance(10, 1, (0, 0))
+        self.assertEqual(self.prefetch.record_miss(11), "late")
+        self.assertEqual(self.prefetch.record_miss(50), "not_requested")
+        self.fifo.get(30)  # Playhead jumps past everything requested
+        self.pool.run_all()
+        self.assertEqual(self.prefetch.record_miss(12), "late")
+        self.assertEqual(self.prefetch.get_stats()['misses'], {'late': 2, 'not_requested': 1, 'dropped': 0})
+
+    def test_folder_switch_resubmits_and_discards_old(self):
+        self.prefetch.advance(10, 1, (0, 0))
+        self.prefetch.advance(10, 1, (1, 0))
+        self.assertEqual(len(self.pool.jobs), 8)
+        self.pool.run_all()
+        self.assertEqual(len(self.loader.released), 4)
+        self.assertEqual(self.fifo.get(11)[2], (1, 0))
+        self.assertEqual(self.prefetch.get_stats()['discarded'], 4)
+
+    def test_projected_folder_switch_is_prefetched(self):
+        schedule = lambda indices: [(0, 0) if i < 13 else (2, 1) for i in indices]
+        prefetch = PrefetchScheduler(self.pool, self.loader, self.fifo, _load, total=100, window=4,
+                                     folder_schedule=schedule)
+        prefetch.advance(10, 1, (0, 0))
+        self.assertEqual([(job[2][1], job[2][2:]) for job in self.pool.jobs],
+                         [(11, (0, 0)), (12, (0, 0)), (13, (2, 1)), (14, (2, 1))])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import tempfile
+import unittest
+from multiprocessing import resource_tracker, shared_memory
+from unittest import mock
+
+import numpy as np
+
+import turbojpeg_loader
+
+try:  # pragma: no cover - exercised implicitly through image_loader import
+    turbojpeg_loader.get_turbojpeg()
+except RuntimeError:  # pragma: no cover - fallback for environments without libturbojpeg
+    turbojpeg_loader.get_turbojpeg = lambda: None
+
+import process_loader
+from process_loader import ProcessImageLoader
+
+
+def _slab(folder, frames, h, w):
+    path = os.path.join(folder, "frames.npy")
+    np.save(path, (np.arange(frames, dtype=np.uint8)[:, None, None, None] + np.zeros((1, h, w, 4), np.uint8)))
+    return path
+
+
+@unittest.skipUnless(process_loader.supported(), "process backend needs Linux fork()")
+class ProcessImageLoaderTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        small = os.path.join(self.tmp.name, "small")
+        large = os.path.join(self.tmp.name, "large")
+        os.makedirs(small)
+        os.makedirs(large)
+        self.small = _slab(small, 3, 4, 6)
+        self.large = _slab(large, 1, 40, 60)
+        main = [[f"{self.small}#{i}"] for i in range(3)]
+        floats = [[f"{self.small}#2", f"{self.small}#{i}", f"{self.large}#0"] for i in range(3)]
+        self.loader = ProcessImageLoader(processes=1, slot_count=4, main_folder_path=main, float_folder_path=floats)
+        self.loader.start(main[0][0])
+
+    def tearDown(self):
+        self.loader.close()
+        self.tmp.cleanup()
+
+    def _free(self):
+        return self.loader.slots.free_count()
+
+    def test_layers_come_back_through_slots(self):
+        m, f, m_sbs, f_sbs = self.loader.load_images(1, 0, 0)
+        self.assertEqual((int(m[0, 0, 0]), int(f[0, 0, 0]), m.shape), (1, 2, (4, 6, 4)))
+        self.assertEqual(self._free(), 2)
+        self.loader.release_frame((m, f))
+        self.assertEqual(self._free(), 4)
+        self.assertEqual(self.loader.engine_stats()['slot_frames'], 2)
+
+    def test_frames_larger_than_a_slot_are_pickled(self):
+        m, f, _, _ = self.loader.load_images(0, 0, 2)
+        self.assertEqual(f.shape, (40, 60, 4))
+        self.assertEqual(self._free(), 3)  # Only the main layer holds a slot
+        self.loader.release_frame((m, f))
+        self.assertEqual(self._free(), 4)
+        self.assertEqual(self.loader.engine_stats()['pickled_frames'], 1)
+
+    def test_shared_layer_returns_its_slot_exactly_once(self):
+        m, f, _, _ = self.loader.load_images(1, 0, 1)
+        self.assertIs(m, f)
+        self.assertEqual(self._free(), 3)
+        self.loader.retain_frame((m, f))  # On screen
+        self.loader.release_frame((m, f))  # Dropped by the FIFO
+        self.assertEqual(self._free(), 3)
+        self.loader.release_frame((m, f))
+        self.assertEqual(self._free(), 4)
+        self.loader.release_frame((m, f))  # Already returned: no-op
+        self.assertEqual(self._free(), 4)
+
+    def test_failed_layers_give_their_slots_back(self):
+        self.loader.main_folder_path[0][0] = os.path.join(self.tmp.name, "missing.npy#0")
+        with self.assertRaises(Exception):
+            self.loader.load_images(0, 0, 0)  # Main fails, float decoded fine
+        self.assertEqual(self._free(), 4)
+        self.loader.float_folder_path[1][1] = os.path.join(self.tmp.name, "missing.npy#0")
+        with self.assertRaises(Exception):
+            self.loader.load_images(1, 0, 1)  # Float fails after main succeeded
+        self.assertEqual(self._free(), 4)
+        self.assertEqual(self.loader.engine_stats()['views_in_use'], 0)
+
+    def test_close_unlinks_slots_and_stops_workers(self):
+        names = [block.name for block in self.loader.slots.blocks]
+        pool = self.loader.pool
+        self.loader.close()
+        self.assertIsNone(self.loader.slots)
+        with self.assertRaises(RuntimeError):
+            pool.submit(os.getpid)
+        for name in names:
+            with self.assertRaises(FileNotFoundError):
+                shared_memory.SharedMemory(name=name)
+
+    def test_start_adopts_prestarted_workers(self):
+        process_loader.prestart_workers(1)
+        pool = process_loader._prestarted[0]
+        loader = ProcessImageLoader(processes=1, slot_count=2, main_folder_path=[[self.small + "#0"]])
+        try:
+            loader.start(self.small + "#0")
+            self.assertIs(loader.pool, pool)
+            self.assertIsNone(process_loader._prestarted)
+        finally:
+            loader.close()
+
+
+class AttachTest(unittest.TestCase):
+    def test_attach_does_not_register_with_resource_tracker(self):
+        block = shared_memory.SharedMemory(create=True, size=16)
+        try:
+            with mock.patch.object(resource_tracker, 'register') as register:
+                process_loader._attach(block.name).close()
+            register.assert_not_called()
+        finally:
+            block.close()
+            block.unlink()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import time
+import unittest
+
+from readahead import Readahead, upcoming_indices
+
+
+class _Loader:
+    def __init__(self, paths):
+        self.main_folder_path = [[p] for p in paths]
+        self.float_folder_path = [[p] for p in paths]
+        self.readahead = None
+
+    def file_range(self, path):
+        return path, 0, 0
+
+
+class UpcomingIndicesTest(unittest.TestCase):
+    def test_pingpong_follows_double_pivot(self):
+        self.assertEqual(upcoming_indices(2, 1, 4, 1, 6), [3, 3, 2, 1, 0])
+        self.assertEqual(upcoming_indices(1, -1, 4, 1, 5), [0, 0, 1, 2])
+
+    def test_wraps_without_pingpong(self):
+        self.assertEqual(upcoming_indices(3, -1, 4, 1, 3, pingpong=False), [0, 1])
+
+
+class ReadaheadTest(unittest.TestCase):
+    def test_reads_classified_warm_or_cold(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for i in range(6):
+                path = os.path.join(tmp, f"{i}.webp")
+                with open(path, "wb") as f:
+                    f.write(b"\0" * 64)
+                paths.append(path)
+            loader = _Loader(paths)
+            ra = Readahead(loader, ips=2, min_s=1.0, max_s=2.0)
+            ra.advance(0, 1, 0, 0)  # Steps 2..4 ahead
+            deadline = time.monotonic() + 2.0
+            while ra.get_stats()['advised'] < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            ra.note_read(paths[3])
+            ra.note_read(paths[1])
+            stats = ra.get_stats()
+            self.assertEqual(stats['advised'], 3)
+            self.assertEqual((stats['warm_reads'], stats['cold_reads']), (1, 1))
+            ra.close()
+            self.assertIsNone(loader.readahead)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import threading
+import time
+import unittest
+
+from load_pipeline import DeadlinePool
+from worker_sizing import WorkerSizer
+
+
+class _Pool:
+    """Pool stand-in whose sizing stats the test sets directly."""
+
+    def __init__(self, workers=2, max_workers=8):
+        self.stats = {'workers': workers, 'max_workers': max_workers, 'busy': 0, 'queue': 0,
+                      'done': 0, 'avg_ms': 10.0}
+
+    def set_workers(self, n):
+        self.stats['workers'] = max(1, min(self.stats['max_workers'], n))
+        return self.stats['workers']
+
+    def sizing_stats(self):
+        return dict(self.stats)
+
+
+class _Prefetcher:
+    def __init__(self):
+        self.late = 0
+
+    def get_stats(self):
+        return {'misses': {'late': self.late}}
+
+
+class WorkerSizerTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = _Pool()
+        self.prefetcher = _Prefetcher()
+        self.cpu = 30.0
+        self.sizer = WorkerSizer(self.pool, 1, 6, interval_s=1.0, prefetcher=self.prefetcher,
+                                 cpu_percent=lambda: self.cpu)
+        self.now = 0.0
+
+    def tick(self):
+        self.now += 1.0
+        return self.sizer.tick(self.now)
+
+    def test_grows_on_late_misses_and_shrinks_under_cpu_pressure(self):
+        self.pool.stats['busy'] = 2
+        self.prefetcher.late = 3
+        self.assertEqual(self.tick(), 3)
+        self.assertEqual(self.sizer.decision, "grow")
+        self.assertIsNone(self.sizer.tick(self.now + 0.5))  # Within the interval
+        self.cpu = 95.0
+        self.assertEqual(self.tick(), 2)  # Saturated CPU, no new late misses
+        self.assertEqual(self.sizer.get_stats()['shrinks'], 1)
+
+    def test_idle_pool_shrinks_to_minimum_slowly(self):
+        self.assertIsNone(self.tick())
+        self.assertIsNone(self.tick())
+        self.assertEqual(self.tick(), 1)
+        self.assertEqual(self.sizer.decision, "shrink")
+
+    def test_grow_that_slows_decodes_is_undone(self):
+        self.pool.stats['busy'] = 2
+        self.prefetcher.late = 1
+        self.assertEqual(self.tick(), 3)
+        self.pool.stats.update(busy=3, avg_ms=25.0)
+        self.prefetcher.late = 2
+        self.assertEqual(self.tick(), 2)
+
+
+class DeadlinePoolSizingTest(unittest.TestCase):
+    def test_only_active_workers_take_jobs(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def job():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+
+        with DeadlinePool(max_workers=4, workers=1) as pool:
+            futures = [pool.submit(job) for _ in range(4)]
+            for f in futures:
+                f.result(timeout=5)
+            self.assertEqual(max(peak), 1)
+            self.assertEqual(pool.set_workers(10), 4)
+            peak.clear()
+            futures = [pool.submit(job) for _ in range(8)]
+            for f in futures:
+                f.result(timeout=5)
+        self.assertGreater(max(peak), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
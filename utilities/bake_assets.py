@@ -3,6 +3,14 @@ Asset Baker
 
 Packs image folders into single .npy memory-mapped files for instant seeking.
 Resizes images to the target resolution and stores as RGBA arrays.
+
+The output tree mirrors the input (face/, float/ ...), so it can be played
+directly with `main.py --dir <output_dir>`: make_file_lists lists each slab
+frame as "frames.npy#<n>" and ImageLoader serves it as a memmap slice.
+
+Next to each slab goes frames_bbox.npy, the per-frame alpha bounding box
+(y0, y1, x0, x1), so mostly transparent float frames can be served as
+cropped tiles without scanning their alpha at play time.
 """
 import argparse
 import logging
@@ -25,6 +33,7 @@ import settings
 # Force RGBA for consistency (Main + Float compatibility)
 CHANNELS = 4
 HEADLESS_RES = getattr(settings, 'HEADLESS_RES', (640, 480))
+SLAB_BBOX_FILE_NAME = getattr(settings, 'SLAB_BBOX_FILE_NAME', "frames_bbox.npy")
 
 
 def setup_logging(log_level: str = "INFO") -> None:
@@ -40,6 +49,15 @@ def setup_logging(log_level: str = "INFO") -> None:
     )
 
 
+def alpha_bbox(alpha: np.ndarray) -> Tuple[int, int, int, int]:
+    """(y0, y1, x0, x1) of non-zero alpha, (0, 0, 0, 0) if fully transparent (as image_loader.alpha_bbox)."""
+    rows = np.flatnonzero(alpha.any(axis=1))
+    if rows.size == 0:
+        return 0, 0, 0, 0
+    cols = np.flatnonzero(alpha.any(axis=0))
+    return int(rows[0]), int(rows[-1]) + 1, int(cols[0]), int(cols[-1]) + 1
+
+
 def process_folder_to_slab(args: Tuple[Path, Path, Tuple[int, int]]) -> Optional[str]:
     """
     Reads all images in a folder, resizes them, and writes them
@@ -75,6 +93,7 @@ def process_folder_to_slab(args: Tuple[Path, Path, Tuple[int, int]]) -> Optional
         )
 
         # 3. Fill the Slab
+        boxes = np.zeros((count, 4), dtype=np.int32)
         for i, fp in enumerate(files):
             with Image.open(fp) as im:
                 # Convert & Resize
@@ -82,10 +101,13 @@ def process_folder_to_slab(args: Tuple[Path, Path, Tuple[int, int]]) -> Optional
                 im = im.resize((w, h), Image.NEAREST)  # Nearest is fastest, use BILINEAR for quality
 
                 # Write directly to disk-backed memory
-                slab[i] = np.asarray(im)
+                frame = np.asarray(im)
+                slab[i] = frame
+                boxes[i] = alpha_bbox(frame[..., 3])
 
         # Flush changes to disk
         slab.flush()
+        np.save(Path(dest_file).with_name(SLAB_BBOX_FILE_NAME), boxes)
         return None  # Success
 
     except Exception as e:
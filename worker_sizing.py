@@ -0,0 +1,120 @@
+"""
+worker_sizing.py – Grow or shrink the loader pool from what it measures.
+
+A fixed worker count can't suit a Pi 3, a Pi 5 and a VPS alike (tiered
+formulas were tried and reverted, see PERFORMANCE_OPTIMIZATIONS.md 1.2), so
+the pool starts every thread it may need and WorkerSizer moves how many of
+them take work, once per interval, within [min_workers, max_workers]:
+
+  grow    - late misses (the prefetcher asked in time but the frame wasn't
+            ready) or a backlog deeper than the active workers, while every
+            active worker is busy and the CPU has headroom
+  shrink  - the CPU is saturated with no late misses (extra threads are only
+            contending), a grow made decodes clearly slower without fixing
+            the misses, or the pool has sat mostly idle for a few intervals
+  hold    - anything else
+
+Pools expose set_workers(n) and sizing_stats() (see load_pipeline.py). Each
+decision and its reason are kept for the monitor.
+"""
+import time
+from collections import deque
+
+import psutil
+
+CALM_INTERVALS = 3  # Idle intervals in a row before shrinking
+SLOWDOWN = 1.5      # Decode time growth after a grow that counts as contention
+
+
+class WorkerSizer:
+    def __init__(self, pool, min_workers, max_workers, interval_s=2.0, cpu_high=85.0,
+                 prefetcher=None, cpu_percent=None):
+        self.pool = pool
+        self.prefetcher = prefetcher
+        self.interval_s = interval_s
+        self.cpu_high = cpu_high
+        self._cpu_percent = cpu_percent or (lambda: psutil.cpu_percent(interval=None))
+        s = pool.sizing_stats()
+        self.max_workers = max(1, min(max_workers, s['max_workers']))
+        self.min_workers = max(1, min(min_workers, self.max_workers))
+        self.workers = pool.set_workers(max(self.min_workers, min(self.max_workers, s['workers'])))
+        self._last_tick = None
+        self._last_late = self._late_misses()
+        self._calm = 0
+        self._ms_before_grow = None  # Decode time when the last grow happened
+        self.grows = 0
+        self.shrinks = 0
+        self.decision = "hold"
+        self.reason = "starting"
+        self.cpu = 0.0
+        self.history = deque(maxlen=10)  # (time, from, to, reason) of recent changes
+        self._cpu_percent()  # Prime psutil's interval counter
+
+    def _late_misses(self):
+        if self.prefetcher is None:
+            return 0
+        return self.prefetcher.get_stats()['misses']['late']
+
+    def tick(self, now=None):
+        """Re-evaluate once per interval; returns the new worker count when it changes, else None."""
+        now = time.monotonic() if now is None else now
+        if self._last_tick is not None and now - self._last_tick < self.interval_s:
+            return None
+        self._last_tick = now
+        s = self.pool.sizing_stats()
+        late_total = self._late_misses()
+        late = late_total - self._last_late
+        self._last_late = late_total
+        self.cpu = cpu = self._cpu_percent()
+        decision, target, reason = self._decide(s, late, cpu)
+        self.decision, self.reason = decision, reason
+        if target == self.workers:
+            return None
+        if decision == "grow":
+            self.grows += 1
+            self._ms_before_grow = s['avg_ms']
+        else:
+            self.shrinks += 1
+            self._ms_before_grow = None
+        previous, self.workers = self.workers, self.pool.set_workers(target)
+        self.history.append((time.time(), previous, self.workers, reason))
+        print(f"[DISPLAY] Loader workers {previous} -> {self.workers} ({reason})")
+        return self.workers
+
+    def _decide(self, s, late, cpu):
+        n = self.workers
+        busy, queue, avg_ms = s['busy'], s['queue'], s['avg_ms']
+        saturated = busy >= n
+        backlog = queue > n
+        if saturated or backlog or late:
+            self._calm = 0
+        elif busy < n / 2:
+            self._calm += 1
+
+        if (self._ms_before_grow and avg_ms > self._ms_before_grow * SLOWDOWN
+                and late and n > self.min_workers):
+            return "shrink", n - 1, f"decode {self._ms_before_grow:.0f}->{avg_ms:.0f} ms after grow"
+        if cpu >= self.cpu_high:
+            if not late and n > self.min_workers:
+                return "shrink", n - 1, f"cpu {cpu:.0f}%"
+            return "hold", n, f"cpu {cpu:.0f}%, no headroom"
+        if (late or backlog) and saturated and n < self.max_workers:
+            return "grow", n + 1, f"late +{late}, queue {queue}, cpu {cpu:.0f}%"
+        if self._calm >= CALM_INTERVALS and n > self.min_workers:
+            self._calm = 0
+            return "shrink", n - 1, f"idle, {busy}/{n} busy"
+        return "hold", n, f"{busy}/{n} busy, queue {queue}, {avg_ms:.0f} ms"
+
+    def get_stats(self):
+        """Current size, bounds and the latest decision."""
+        return {
+            'workers': self.workers,
+            'min_workers': self.min_workers,
+            'max_workers': self.max_workers,
+            'grows': self.grows,
+            'shrinks': self.shrinks,
+            'decision': self.decision,
+            'reason': self.reason,
+            'cpu': self.cpu,
+            'history': list(self.history),
+        }